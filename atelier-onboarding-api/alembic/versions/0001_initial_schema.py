@@ -0,0 +1,83 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+
+Databases created by the old Base.metadata.create_all() call already have
+these tables; mark them with `alembic stamp 0001` before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+registration_status = sa.Enum("PENDING", "TEACHER_ASSIGNED", "LINK_SENT", "COMPLETED", name="registrationstatus")
+experience_level = sa.Enum("BEGINNER", "INTERMEDIATE", "ADVANCED", name="experiencelevel")
+
+
+def upgrade():
+    op.create_table(
+        "teachers",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone", sa.String()),
+        sa.Column("specialization", sa.String()),
+        sa.Column("bio", sa.Text()),
+        sa.Column("experience_years", sa.Integer()),
+        sa.Column("availability", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_teachers_id", "teachers", ["id"])
+    op.create_index("ix_teachers_email", "teachers", ["email"], unique=True)
+    
+    op.create_table(
+        "registrations",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("student_name", sa.String(), nullable=False),
+        sa.Column("student_age", sa.Integer(), nullable=False),
+        sa.Column("grade", sa.String(), nullable=False),
+        sa.Column("parent_name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=False),
+        sa.Column("preferred_time", sa.String()),
+        sa.Column("experience_level", experience_level, nullable=True),
+        sa.Column("interests", postgresql.ARRAY(sa.String()).with_variant(sa.JSON(), "sqlite")),
+        sa.Column("additional_notes", sa.Text()),
+        sa.Column("status", registration_status, nullable=False),
+        sa.Column("teacher_id", sa.String(), sa.ForeignKey("teachers.id"), nullable=True),
+        sa.Column("demo_link", sa.String()),
+        sa.Column("demo_scheduled_at", sa.DateTime(timezone=True)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_registrations_id", "registrations", ["id"])
+    op.create_index("ix_registrations_email", "registrations", ["email"])
+    
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("registration_id", sa.String(), sa.ForeignKey("registrations.id")),
+        sa.Column("recipient_email", sa.String(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(timezone=True)),
+        sa.Column("status", sa.String()),
+        sa.Column("error_message", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_notifications_id", "notifications", ["id"])
+
+
+def downgrade():
+    op.drop_table("notifications")
+    op.drop_table("registrations")
+    op.drop_table("teachers")
+    registration_status.drop(op.get_bind(), checkfirst=True)
+    experience_level.drop(op.get_bind(), checkfirst=True)
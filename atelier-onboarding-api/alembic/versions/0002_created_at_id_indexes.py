@@ -0,0 +1,22 @@
+"""composite (created_at, id) indexes for keyset pagination
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_registrations_created_at_id", "registrations", ["created_at", "id"])
+    op.create_index("ix_teachers_created_at_id", "teachers", ["created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_teachers_created_at_id", table_name="teachers")
+    op.drop_index("ix_registrations_created_at_id", table_name="registrations")
@@ -0,0 +1,40 @@
+"""pg_trgm GIN indexes for registration search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+
+Indexes are built CONCURRENTLY on Postgres so the registrations table stays
+writable during the upgrade. Other backends get plain indexes.
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = ("student_name", "parent_name", "email")
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+    if is_postgres:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.create_index(
+                f"ix_registrations_{column}_trgm",
+                "registrations",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.drop_index(f"ix_registrations_{column}_trgm", table_name="registrations", postgresql_concurrently=True)
@@ -0,0 +1,27 @@
+"""notification outbox columns
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("notifications", sa.Column("text_body", sa.Text()))
+    op.add_column("notifications", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("notifications", sa.Column("next_attempt_at", sa.DateTime(timezone=True)))
+    op.create_index("ix_notifications_status_next_attempt_at", "notifications", ["status", "next_attempt_at"])
+
+
+def downgrade():
+    op.drop_index("ix_notifications_status_next_attempt_at", table_name="notifications")
+    op.drop_column("notifications", "next_attempt_at")
+    op.drop_column("notifications", "attempts")
+    op.drop_column("notifications", "text_body")
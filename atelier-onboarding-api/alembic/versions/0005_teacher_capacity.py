@@ -0,0 +1,21 @@
+"""teacher capacity for automatic assignment
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("teachers", sa.Column("capacity", sa.Integer()))
+
+
+def downgrade():
+    op.drop_column("teachers", "capacity")
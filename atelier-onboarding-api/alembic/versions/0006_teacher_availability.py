@@ -0,0 +1,38 @@
+"""structured teacher availability
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "teacher_availability",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("teacher_id", sa.String(), sa.ForeignKey("teachers.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("weekday", sa.Integer()),
+        sa.Column("start_minute", sa.Integer()),
+        sa.Column("end_minute", sa.Integer()),
+        sa.Column("starts_at", sa.DateTime(timezone=True)),
+        sa.Column("ends_at", sa.DateTime(timezone=True)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_teacher_availability_teacher_id", "teacher_availability", ["teacher_id"])
+    op.create_index(
+        "ix_registrations_teacher_id_demo_scheduled_at", "registrations", ["teacher_id", "demo_scheduled_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_registrations_teacher_id_demo_scheduled_at", table_name="registrations")
+    op.drop_index("ix_teacher_availability_teacher_id", table_name="teacher_availability")
+    op.drop_table("teacher_availability")
@@ -0,0 +1,39 @@
+"""per-teacher workload counters
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Counter column -> registrationstatus enum label
+COUNTERS = {
+    "assigned_count": "TEACHER_ASSIGNED",
+    "link_sent_count": "LINK_SENT",
+    "completed_count": "COMPLETED",
+}
+
+
+def upgrade():
+    for column in COUNTERS:
+        op.add_column("teachers", sa.Column(column, sa.Integer(), nullable=False, server_default="0"))
+    
+    # Backfill from registrations (the same rebuild as services/workload.reconcile)
+    op.execute(
+        "UPDATE teachers SET " + ", ".join(
+            f"{column} = (SELECT count(*) FROM registrations "
+            f"WHERE registrations.teacher_id = teachers.id AND registrations.status = '{status}')"
+            for column, status in COUNTERS.items()
+        )
+    )
+
+
+def downgrade():
+    for column in reversed(list(COUNTERS)):
+        op.drop_column("teachers", column)
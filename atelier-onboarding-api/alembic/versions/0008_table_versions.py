@@ -0,0 +1,29 @@
+"""per-table write counters for ETags
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_versions = op.create_table(
+        "table_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+    op.bulk_insert(table_versions, [
+        {"name": "registrations", "version": 1},
+        {"name": "teachers", "version": 1},
+    ])
+
+
+def downgrade():
+    op.drop_table("table_versions")
@@ -0,0 +1,39 @@
+"""registration change feed: change_seq, tombstones, updated_at on insert
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("registrations", sa.Column("change_seq", sa.BigInteger(), nullable=False, server_default="0"))
+    op.create_index("ix_registrations_change_seq_id", "registrations", ["change_seq", "id"])
+    
+    op.execute("UPDATE registrations SET updated_at = created_at WHERE updated_at IS NULL")
+    op.alter_column("registrations", "updated_at", server_default=sa.func.now())
+    
+    op.create_table(
+        "registration_tombstones",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("change_seq", sa.BigInteger(), primary_key=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_registration_tombstones_change_seq_id", "registration_tombstones", ["change_seq", "id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_registration_tombstones_change_seq_id", table_name="registration_tombstones")
+    op.drop_table("registration_tombstones")
+    op.alter_column("registrations", "updated_at", server_default=None)
+    op.drop_index("ix_registrations_change_seq_id", table_name="registrations")
+    op.drop_column("registrations", "change_seq")
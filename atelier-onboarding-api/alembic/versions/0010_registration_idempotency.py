@@ -0,0 +1,34 @@
+"""registration idempotency: idempotency_keys, registrations.dedup_key
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows keep a NULL dedup_key, which the unique index ignores
+    op.add_column("registrations", sa.Column("dedup_key", sa.String(64), nullable=True))
+    op.create_index("ux_registrations_dedup_key", "registrations", ["dedup_key"], unique=True)
+    
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key_hash", sa.String(64), primary_key=True),
+        sa.Column("request_hash", sa.String(64), nullable=False),
+        sa.Column("registration_id", sa.String(), sa.ForeignKey("registrations.id", ondelete="CASCADE")),
+        sa.Column("response", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("idempotency_keys")
+    op.drop_index("ux_registrations_dedup_key", table_name="registrations")
+    op.drop_column("registrations", "dedup_key")
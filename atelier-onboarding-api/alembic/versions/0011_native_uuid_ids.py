@@ -0,0 +1,199 @@
+"""native uuid ids for teachers, availability, registrations and notifications
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-16
+
+On Postgres every id and id reference moves from varchar (36 bytes of text
+plus a header) to uuid (16 bytes) while the tables stay writable:
+
+1. a uuid shadow column is added next to each converted column, and a
+   trigger keeps it in step with inserts and updates;
+2. existing rows are backfilled in primary key order, BATCH_SIZE rows per
+   transaction;
+3. the primary key and secondary indexes are built on the shadows
+   CONCURRENTLY, and NOT NULL is proven with CHECK constraints validated
+   without blocking writes;
+4. one short transaction (lock_timeout SWAP_LOCK_TIMEOUT, so it gives up
+   rather than queue behind long queries) drops the text columns with their
+   indexes and foreign keys, renames the shadows into place and attaches the
+   prebuilt indexes as the primary keys;
+5. the foreign keys come back NOT VALID and are validated afterwards.
+
+Deploy the release carrying this migration straight after it. The
+ix_<table>_id indexes, duplicates of the primary keys, are not rebuilt.
+
+Other backends store these columns as CHAR(32) hex (sqlalchemy.Uuid), so the
+ids are rewritten in place. The downgrade converts back with ALTER COLUMN ...
+TYPE, which rewrites the tables under an exclusive lock.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+SWAP_LOCK_TIMEOUT = "5s"
+
+# Converted columns per table, with the primary key the backfill walks
+TABLES = {
+    "teachers": {"columns": ["id"], "key": ["id"]},
+    "teacher_availability": {"columns": ["id", "teacher_id"], "key": ["id"]},
+    "registrations": {"columns": ["id", "teacher_id"], "key": ["id"]},
+    "registration_tombstones": {"columns": ["id"], "key": ["id", "change_seq"]},
+    "notifications": {"columns": ["id", "registration_id"], "key": ["id"]},
+    "idempotency_keys": {"columns": ["registration_id"], "key": ["key_hash"]},
+}
+NULLABLE = {("registrations", "teacher_id"), ("notifications", "registration_id"), ("idempotency_keys", "registration_id")}
+# Primary keys rebuilt on the uuid columns (idempotency_keys keeps key_hash)
+PRIMARY_KEYS = {table: spec["key"] for table, spec in TABLES.items() if table != "idempotency_keys"}
+INDEXES = {
+    "ix_teachers_created_at_id": ("teachers", ["created_at", "id"]),
+    "ix_teacher_availability_teacher_id": ("teacher_availability", ["teacher_id"]),
+    "ix_registrations_created_at_id": ("registrations", ["created_at", "id"]),
+    "ix_registrations_change_seq_id": ("registrations", ["change_seq", "id"]),
+    "ix_registrations_teacher_id_demo_scheduled_at": ("registrations", ["teacher_id", "demo_scheduled_at"]),
+    "ix_registration_tombstones_change_seq_id": ("registration_tombstones", ["change_seq", "id"]),
+}
+REDUNDANT_INDEXES = {"ix_teachers_id": "teachers", "ix_registrations_id": "registrations", "ix_notifications_id": "notifications"}
+# (constraint, table, column, referred table, ON DELETE)
+FOREIGN_KEYS = [
+    ("teacher_availability_teacher_id_fkey", "teacher_availability", "teacher_id", "teachers", "CASCADE"),
+    ("registrations_teacher_id_fkey", "registrations", "teacher_id", "teachers", None),
+    ("notifications_registration_id_fkey", "notifications", "registration_id", "registrations", None),
+    ("idempotency_keys_registration_id_fkey", "idempotency_keys", "registration_id", "registrations", "CASCADE"),
+]
+
+
+def shadow(column):
+    return f"{column}_uuid"
+
+
+def converted(table, columns):
+    """columns with the converted ones swapped for their shadows"""
+    return [shadow(c) if c in TABLES[table]["columns"] else c for c in columns]
+
+
+def add_shadows():
+    for table, spec in TABLES.items():
+        for column in spec["columns"]:
+            op.add_column(table, sa.Column(shadow(column), sa.Uuid()))
+        assignments = "".join(f"NEW.{shadow(c)} := NEW.{c}::uuid; " for c in spec["columns"])
+        op.execute(
+            f"CREATE FUNCTION {table}_uuid_shadow() RETURNS trigger LANGUAGE plpgsql AS "
+            f"$$ BEGIN {assignments}RETURN NEW; END $$"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_uuid_shadow BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_uuid_shadow()"
+        )
+
+
+def backfill(connection, table):
+    spec = TABLES[table]
+    key = ", ".join(spec["key"])
+    assignments = ", ".join(f"{shadow(c)} = t.{c}::uuid" for c in spec["columns"])
+    joined = " AND ".join(f"t.{k} = batch.{k}" for k in spec["key"])
+    returned = ", ".join(f"t.{k}" for k in spec["key"])
+
+    def batch(where):
+        return sa.text(
+            f"WITH batch AS (SELECT {key} FROM {table} {where} ORDER BY {key} LIMIT :batch_size) "
+            f"UPDATE {table} t SET {assignments} FROM batch WHERE {joined} RETURNING {returned}"
+        )
+
+    first = batch("")
+    following = batch(f"WHERE ({key}) > ({', '.join(f':k{i}' for i in range(len(spec['key'])))})")
+    rows = connection.execute(first, {"batch_size": BATCH_SIZE}).all()
+    while rows:
+        position = max(tuple(row) for row in rows)
+        params = {f"k{i}": value for i, value in enumerate(position)}
+        rows = connection.execute(following, {"batch_size": BATCH_SIZE, **params}).all()
+
+
+def build_indexes():
+    for table, key in PRIMARY_KEYS.items():
+        op.create_index(f"{table}_pkey_uuid", table, converted(table, key), unique=True, postgresql_concurrently=True)
+    for name, (table, columns) in INDEXES.items():
+        op.create_index(f"{name}_uuid", table, converted(table, columns), postgresql_concurrently=True)
+    for table, spec in TABLES.items():
+        for column in spec["columns"]:
+            if (table, column) not in NULLABLE:
+                op.execute(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {table}_{shadow(column)}_not_null "
+                    f"CHECK ({shadow(column)} IS NOT NULL) NOT VALID"
+                )
+                op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{shadow(column)}_not_null")
+
+
+def swap():
+    op.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    op.execute(f"LOCK TABLE {', '.join(TABLES)} IN ACCESS EXCLUSIVE MODE")
+    for name, table, *_ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_="foreignkey")
+    for table, spec in TABLES.items():
+        op.execute(f"DROP TRIGGER {table}_uuid_shadow ON {table}")
+        op.execute(f"DROP FUNCTION {table}_uuid_shadow()")
+        for column in spec["columns"]:
+            # Takes the column's primary key and text indexes with it
+            op.drop_column(table, column)
+            op.alter_column(table, shadow(column), new_column_name=column)
+            if (table, column) not in NULLABLE:
+                # Proven by the validated CHECK, so no table scan
+                op.alter_column(table, column, nullable=False)
+                op.drop_constraint(f"{table}_{shadow(column)}_not_null", table, type_="check")
+    for table in PRIMARY_KEYS:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {table}_pkey_uuid")
+    for name in INDEXES:
+        op.execute(f"ALTER INDEX {name}_uuid RENAME TO {name}")
+    for name, table, column, referred, ondelete in FOREIGN_KEYS:
+        on_delete = f" ON DELETE {ondelete}" if ondelete else ""
+        op.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+            f"REFERENCES {referred} (id){on_delete} NOT VALID"
+        )
+
+
+def rewrite_text_ids(expression):
+    """Non-Postgres backends: rewrite every id in place with a SQL expression of it"""
+    for table, spec in TABLES.items():
+        op.execute(f"UPDATE {table} SET " + ", ".join(f"{c} = {expression.format(c=c)}" for c in spec["columns"]))
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        rewrite_text_ids("lower(replace({c}, '-', ''))")
+        for name, table in REDUNDANT_INDEXES.items():
+            op.drop_index(name, table_name=table, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        add_shadows()
+        for table in TABLES:
+            backfill(op.get_bind(), table)
+        build_indexes()
+    swap()
+    with op.get_context().autocommit_block():
+        for name, table, *_ in FOREIGN_KEYS:
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        rewrite_text_ids(
+            "substr({c}, 1, 8) || '-' || substr({c}, 9, 4) || '-' || substr({c}, 13, 4) || '-' || "
+            "substr({c}, 17, 4) || '-' || substr({c}, 21)"
+        )
+    else:
+        for name, table, *_ in FOREIGN_KEYS:
+            op.drop_constraint(name, table, type_="foreignkey")
+        for table, spec in TABLES.items():
+            for column in spec["columns"]:
+                op.alter_column(table, column, type_=sa.String(), postgresql_using=f"{column}::text")
+        for name, table, column, referred, ondelete in FOREIGN_KEYS:
+            op.create_foreign_key(name, table, referred, [column], ["id"], ondelete=ondelete)
+    for name, table in REDUNDANT_INDEXES.items():
+        op.create_index(name, table, ["id"])
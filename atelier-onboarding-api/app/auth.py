@@ -1,19 +1,189 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt, jwk
 from .config import settings
-import requests
+from .instrumentation import span
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
 
+def get_jwks_url():
+    """URL of the Cognito user pool JWKS document (or the configured override)"""
+    if settings.COGNITO_JWKS_URL:
+        return settings.COGNITO_JWKS_URL
+    return f'https://cognito-idp.{settings.AWS_COGNITO_REGION}.amazonaws.com/{settings.AWS_COGNITO_USER_POOL_ID}/.well-known/jwks.json'
+
+
 def get_cognito_public_keys():
     """Fetch Cognito public keys for JWT verification"""
-    keys_url = f'https://cognito-idp.{settings.AWS_COGNITO_REGION}.amazonaws.com/{settings.AWS_COGNITO_USER_POOL_ID}/.well-known/jwks.json'
-    response = requests.get(keys_url)
+    keys_url = get_jwks_url()
+    if keys_url.startswith("file://"):
+        with open(keys_url[len("file://"):]) as f:
+            return json.load(f)['keys']
+    
+    # Imported on first fetch; public endpoints never need requests
+    import requests
+    response = requests.get(keys_url, timeout=5)
+    response.raise_for_status()
     return response.json()['keys']
 
 
+class JWKSCache:
+    """
+    Process-wide store of JWT signing keys, indexed by kid.
+
+    Keys are fetched once per container and kept as constructed public key
+    objects. The set is refreshed when the TTL expires, and once when a token
+    arrives with an unknown kid (Cognito key rotation). Refresh attempts are
+    rate-limited so tokens with bogus kids cannot trigger a fetch per request,
+    and a failed refresh keeps the previously fetched keys in use.
+    """
+
+    def __init__(self, fetch_keys, ttl_seconds: int, min_refresh_interval: int, clock=time.monotonic):
+        self._fetch_keys = fetch_keys
+        self._ttl = ttl_seconds
+        self._min_refresh_interval = min_refresh_interval
+        self._clock = clock
+        self._keys = {}
+        self._fetched_at = None
+        self._last_attempt = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, now: float) -> bool:
+        return self._fetched_at is not None and now - self._fetched_at < self._ttl
+
+    def lookup(self, kid: str):
+        """Return the cached key for kid if the key set is fresh, without any I/O"""
+        if self._is_fresh(self._clock()):
+            return self._keys.get(kid)
+        return None
+
+    def get_key(self, kid: str):
+        """Return the key for kid, refreshing the key set if it is stale or the kid is unknown"""
+        key = self.lookup(kid)
+        if key is not None:
+            return key
+        
+        with self._lock:
+            now = self._clock()
+            key = self._keys.get(kid)
+            if key is not None and self._is_fresh(now):
+                # Another request refreshed the keys while we waited for the lock
+                return key
+            
+            if self._last_attempt is None or now - self._last_attempt >= self._min_refresh_interval:
+                self._refresh(now)
+            
+            # May be a stale key if the refresh failed or was rate-limited
+            return self._keys.get(kid)
+
+    def _refresh(self, now: float):
+        from jose import jwk
+        
+        self._last_attempt = now
+        try:
+            with span("jwks_fetch"):
+                keys = {k['kid']: jwk.construct(k) for k in self._fetch_keys() if 'kid' in k}
+        except Exception as e:
+            logger.warning(f"JWKS refresh failed, keeping {len(self._keys)} cached keys: {str(e)}")
+            return
+        
+        self._keys = keys
+        self._fetched_at = now
+
+    def clear(self):
+        """Drop all cached keys (next lookup fetches again)"""
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = None
+            self._last_attempt = None
+
+
+jwks_cache = JWKSCache(
+    get_cognito_public_keys,
+    ttl_seconds=settings.JWKS_CACHE_TTL_SECONDS,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL_SECONDS
+)
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified tokens to the user_info derived from them.
+
+    Entries are keyed by a SHA-256 of the token, so raw bearer tokens are
+    never held in memory, and each entry is dropped once the token's exp
+    claim passes.
+    """
+
+    def __init__(self, max_size: int, clock=time.time):
+        self._max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        """Return a copy of the cached user_info for token, or None"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            user_info, exp = entry
+            if exp <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(user_info)
+
+    def put(self, token: str, user_info: dict, exp: float):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(user_info), exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+token_cache = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Validates Cognito JWT token and returns user information.
@@ -21,12 +191,19 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     Validation steps:
     1. Extract token from Authorization header
     2. Decode JWT header to get key ID (kid)
-    3. Fetch Cognito public keys
-    4. Find matching public key
+    3. Look up the matching public key in the process-wide JWKS cache
+    4. Fetch Cognito public keys only if the cache is stale or the kid is unknown
     5. Verify JWT signature using public key
     6. Validate token claims (expiration, issuer)
     7. Extract and return user information
+
+    Verified tokens are cached until they expire, so repeat calls with the same
+    token skip steps 2-7. Within a request, FastAPI resolves this dependency
+    once and shares the result with require_admin/require_role/etc.
     """
+    # jose (and its crypto backend) is loaded on the first authenticated request, not at import
+    from jose import JWTError, jwt
+    
     token = credentials.credentials
     
     # For development: Skip validation
@@ -40,6 +217,11 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             # Allow any token in dev mode
             return {"username": "dev_admin", "user_id": "dev-123"}
     
+    # Production: Reuse a previous verification of this exact token
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+    
     # Production: Full signature verification
     try:
         # Step 1: Decode header without verification to get key ID
@@ -52,34 +234,27 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 detail="Token missing key ID"
             )
         
-        # Step 2: Get Cognito public keys
-        public_keys = get_cognito_public_keys()
+        # Step 2: Get the public key from the cache (fetches JWKS off the event loop if needed)
+        public_key = jwks_cache.lookup(kid)
+        if public_key is None:
+            public_key = await run_in_threadpool(jwks_cache.get_key, kid)
         
-        # Step 3: Find the matching public key
-        key = None
-        for k in public_keys:
-            if k['kid'] == kid:
-                key = k
-                break
-        
-        if not key:
+        if public_key is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Public key not found"
             )
         
-        # Step 4: Construct the public key for verification
-        public_key = jwk.construct(key)
-        
-        # Step 5: Decode and verify the token
-        payload = jwt.decode(
-            token,
-            public_key,
-            algorithms=['RS256'],
-            options={"verify_signature": True, "verify_exp": True}
-        )
+        # Step 3: Decode and verify the token
+        with span("token_verify"):
+            payload = jwt.decode(
+                token,
+                public_key,
+                algorithms=['RS256'],
+                options={"verify_signature": True, "verify_exp": True}
+            )
         
-        # Step 6: Validate issuer
+        # Step 4: Validate issuer
         expected_issuer = f'https://cognito-idp.{settings.AWS_COGNITO_REGION}.amazonaws.com/{settings.AWS_COGNITO_USER_POOL_ID}'
         if payload.get('iss') != expected_issuer:
             raise HTTPException(
@@ -87,14 +262,14 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 detail="Invalid token issuer"
             )
         
-        # Step 7: Validate token use
+        # Step 5: Validate token use
         if payload.get('token_use') not in ['access', 'id']:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token use"
             )
         
-        # Step 8: Extract user information
+        # Step 6: Extract user information
         username = payload.get("cognito:username") or payload.get("username") or payload.get("sub")
         if not username:
             raise HTTPException(
@@ -116,6 +291,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             "permissions": payload.get("custom:permissions", "").split(",") if payload.get("custom:permissions") else []
         }
         
+        if payload.get("exp") is not None:
+            token_cache.put(token, user_info, payload["exp"])
+        
         return user_info
     
     except JWTError as e:
@@ -0,0 +1,46 @@
+"""
+Small in-process caches.
+
+These live per process (per Lambda container), so invalidation only reaches
+the container that handled the write; the TTL bounds staleness elsewhere.
+"""
+import threading
+import time
+
+from .config import settings
+
+
+class TTLCache:
+    """Dict-like cache whose entries expire ttl_seconds after being set"""
+
+    def __init__(self, ttl_seconds: float, clock=time.monotonic):
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self._ttl)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Dashboard statistics; cleared by every write that changes registration counts
+stats_cache = TTLCache(ttl_seconds=settings.STATS_CACHE_TTL_SECONDS)
+
+# Teacher availability index (services/scheduling.py); cleared by availability writes
+availability_cache = TTLCache(ttl_seconds=settings.AVAILABILITY_CACHE_TTL_SECONDS)
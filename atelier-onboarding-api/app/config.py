@@ -1,16 +1,33 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    # Use an AsyncEngine (asyncpg / aiosqlite) instead of the sync engine in a threadpool
+    DATABASE_ASYNC: bool = False
+    # Connection pool strategy (see app/db_pool.py): "queue" for uvicorn, "single"
+    # reused connection per Lambda container, "null" behind RDS Proxy / PgBouncer,
+    # "auto" = single on Lambda, queue elsewhere
+    DATABASE_POOL_MODE: Literal["auto", "queue", "single", "null"] = "auto"
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_TIMEOUT_SECONDS: int = 30
+    # Ping pooled connections idle longer than this before reuse (0 = every checkout)
+    DATABASE_PING_AFTER_SECONDS: int = 30
     
     # AWS Cognito (handles JWT generation and validation)
     AWS_REGION: str = "us-east-1"
     AWS_COGNITO_USER_POOL_ID: str
     AWS_COGNITO_CLIENT_ID: str
     AWS_COGNITO_REGION: str = "us-east-1"
+    # Override for the JWKS location (accepts file:// URLs for local testing)
+    COGNITO_JWKS_URL: Optional[str] = None
+    JWKS_CACHE_TTL_SECONDS: int = 3600
+    JWKS_MIN_REFRESH_INTERVAL_SECONDS: int = 30
+    # Verified token cache (entries also expire at the token's exp claim)
+    TOKEN_CACHE_MAX_SIZE: int = 1024
     
     # Email
     SMTP_HOST: str = "smtp.gmail.com"
@@ -18,12 +35,79 @@ class Settings(BaseSettings):
     SMTP_USER: str
     SMTP_PASSWORD: str
     FROM_EMAIL: str
+    # Disable for local SMTP stand-ins; an empty SMTP_USER skips login
+    SMTP_USE_TLS: bool = True
+    SMTP_TIMEOUT_SECONDS: int = 30
+    # Reused SMTP sessions per process and how long an idle one is kept
+    SMTP_POOL_SIZE: int = 2
+    SMTP_POOL_IDLE_TIMEOUT_SECONDS: int = 60
+    
+    # Notification outbox dispatcher
+    NOTIFICATION_BATCH_SIZE: int = 50
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_LEASE_SECONDS: int = 300
+    NOTIFICATION_RETRY_BASE_SECONDS: int = 30
+    
+    # How long an Idempotency-Key is remembered for POST /api/registrations
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    
+    # Bulk registration import: rows validated and written per transaction
+    IMPORT_CHUNK_SIZE: int = 500
+    # Registration export: rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Automatic teacher assignment (app/services/teacher_matching.py): default
+    # per-teacher capacity, and the fit points each band of existing load costs
+    ASSIGNMENT_DEFAULT_CAPACITY: int = 50
+    ASSIGNMENT_LOAD_BAND: int = 5
+    ASSIGNMENT_LOAD_WEIGHT: int = 5
+    
+    # Demo scheduling: demo length, slot grid and availability index cache
+    DEMO_DURATION_MINUTES: int = 60
+    DEMO_SLOT_MINUTES: int = 30
+    AVAILABILITY_CACHE_TTL_SECONDS: int = 60
+    SLOT_SEARCH_MAX_DAYS: int = 31
+    
+    # Conditional GETs (app/http_cache.py): clients and CloudFront revalidate with If-None-Match
+    HTTP_CACHE_CONTROL: str = "private, no-cache"
+    
+    # Request metrics (app/instrumentation.py): Server-Timing headers, per-route
+    # histograms at /api/admin/metrics and CloudWatch EMF log lines
+    # (EMF unset = on only under Lambda, where stdout goes to CloudWatch)
+    METRICS_ENABLED: bool = True
+    METRICS_EMF_ENABLED: Optional[bool] = None
+    METRICS_NAMESPACE: str = "Atelier/API"
+    
+    # Admin dashboard stats cache
+    STATS_CACHE_TTL_SECONDS: int = 10
     
     # Application
+    # Set by the Lambda runtime; selects the "single" pool mode under "auto"
+    AWS_LAMBDA_FUNCTION_NAME: Optional[str] = None
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
     CORS_ORIGINS: str = "http://localhost:3000"
     
+    @property
+    def async_database_url(self) -> str:
+        """DATABASE_URL rewritten for the asyncio driver of the same backend"""
+        url = self.DATABASE_URL
+        for prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("postgres://", "postgresql+asyncpg://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if url.startswith(prefix):
+                return async_prefix + url[len(prefix):]
+        return url
+    
+    @property
+    def metrics_emf_enabled(self) -> bool:
+        if self.METRICS_EMF_ENABLED is not None:
+            return self.METRICS_ENABLED and self.METRICS_EMF_ENABLED
+        return self.METRICS_ENABLED and self.AWS_LAMBDA_FUNCTION_NAME is not None
+    
     @property
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
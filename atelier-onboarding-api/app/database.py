@@ -1,23 +1,162 @@
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import declarative_base, sessionmaker
 from .config import settings
+from .db_pool import instrument_engine, pool_options
+from .instrumentation import track_statements
+import threading
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
+# Engines are created on first use rather than at import, so a cold Lambda
+# container doesn't load the database driver before its first query.
+# `engine` and `async_engine` remain importable as module attributes.
+_engine = None
+_async_engine = None
+_async_session_factory = None
+_engine_lock = threading.Lock()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_engine():
+    """The process-wide sync Engine, created on first call"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
+                instrument_engine(engine)
+                track_statements(engine)
+                _engine = engine
+    return _engine
+
+
+def get_async_engine():
+    """The process-wide AsyncEngine, created on first call (None unless DATABASE_ASYNC is set)"""
+    global _async_engine, _async_session_factory
+    if not settings.DATABASE_ASYNC:
+        return None
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+                
+                engine = create_async_engine(
+                    settings.async_database_url,
+                    **pool_options(settings.async_database_url, is_async=True)
+                )
+                instrument_engine(engine)
+                track_statements(engine)
+                _async_session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+                _async_engine = engine
+    return _async_engine
+
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazySessionMaker(sessionmaker):
+    """sessionmaker that binds itself to get_engine() when the first session is made"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+# Objects stay readable after commit; reloading them would mean blocking I/O
+# on the event loop (or a MissingGreenlet error under AsyncSession)
+SessionLocal = LazySessionMaker(autocommit=False, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
+def database_backend() -> str:
+    """Backend name of DATABASE_URL ("postgresql", "sqlite", ...)"""
+    return make_url(settings.DATABASE_URL).get_backend_name()
+
+
+def upsert(model):
+    """INSERT construct with on_conflict_do_nothing/do_update for the configured backend"""
+    backend = database_backend()
+    if backend == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif backend == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"No INSERT ... ON CONFLICT support for {backend}")
+    return insert(model)
+
+
+class ThreadedSession:
+    """
+    Awaitable facade over a sync Session.
+
+    Exposes the subset of the AsyncSession API used by the routers and runs
+    every database call in the threadpool, so handlers can await their
+    queries the same way whichever engine is configured.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, execution_options=None, **kwargs):
+        # Same as AsyncSession: rows are fetched in the worker thread, not on the event loop
+        options = dict(execution_options or {}, prebuffer_rows=True)
+        return await run_in_threadpool(
+            self.sync_session.execute, statement, params, execution_options=options, **kwargs
+        )
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """Call fn(sync_session, *args, **kwargs) in the threadpool (mirrors AsyncSession.run_sync)"""
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+async def get_db():
+    if get_async_engine() is not None:
+        async with _async_session_factory() as db:
+            yield db
+        return
+    
+    db = ThreadedSession(SessionLocal())
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
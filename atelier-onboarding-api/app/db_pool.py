@@ -0,0 +1,191 @@
+"""
+Connection pool strategies and metrics.
+
+DATABASE_POOL_MODE picks how each process holds database connections:
+
+queue   QueuePool of DATABASE_POOL_SIZE (+ DATABASE_MAX_OVERFLOW), for
+        long-lived servers (uvicorn) handling concurrent requests
+single  one connection per process, reused across Lambda invocations and
+        reconnected lazily when it turns out to be dead
+null    no pooling: connect per checkout, for use behind RDS Proxy or
+        PgBouncer, which do the pooling themselves
+auto    single on Lambda, queue everywhere else
+
+Instead of pool_pre_ping on every checkout, pooled connections are pinged
+only when they have sat idle for DATABASE_PING_AFTER_SECONDS (a frozen
+Lambda container may come back to a connection the server already closed).
+A failed ping makes the pool discard the connection and open a new one.
+"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from .config import settings
+
+
+class PoolMetrics:
+    """Checkout wait times and connection churn for the pools of this process"""
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=max_samples)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._waits.clear()
+            self.checkouts = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.connects = 0
+            self.closes = 0
+            self.peak_open_connections = 0
+            self.invalidations = 0
+            self.pings = 0
+            self.ping_failures = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds)
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checked_out -= 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+            self.peak_open_connections = max(self.peak_open_connections, self.connects - self.closes)
+
+    def record(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts = self.checkouts
+        
+            def percentile(q):
+                return waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+        
+            return {
+                "mode": resolve_pool_mode(),
+                "checkouts": checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "open_connections": self.connects - self.closes,
+                "peak_open_connections": self.peak_open_connections,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+                "pings": self.pings,
+                "ping_failures": self.ping_failures,
+                "checkout_wait_avg_ms": self.wait_total / checkouts * 1000 if checkouts else 0.0,
+                "checkout_wait_p50_ms": percentile(0.50),
+                "checkout_wait_p95_ms": percentile(0.95),
+                "checkout_wait_max_ms": self.wait_max * 1000
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredPoolMixin:
+    """Times every checkout, including the connect when the pool has to open one"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+
+class MeteredQueuePool(MeteredPoolMixin, QueuePool):
+    pass
+
+
+class MeteredAsyncAdaptedQueuePool(MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class MeteredNullPool(MeteredPoolMixin, NullPool):
+    pass
+
+
+def resolve_pool_mode() -> str:
+    if settings.DATABASE_POOL_MODE != "auto":
+        return settings.DATABASE_POOL_MODE
+    return "single" if settings.AWS_LAMBDA_FUNCTION_NAME else "queue"
+
+
+def pool_options(url: str, is_async: bool = False) -> dict:
+    """create_engine()/create_async_engine() pool arguments for the configured mode"""
+    mode = resolve_pool_mode()
+    # aiosqlite runs each connection on its own thread, so keep SQLAlchemy's NullPool default there
+    if mode == "null" or (is_async and url.startswith("sqlite")):
+        return {"poolclass": MeteredNullPool}
+    
+    size, overflow = (1, 0) if mode == "single" else (settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW)
+    return {
+        "poolclass": MeteredAsyncAdaptedQueuePool if is_async else MeteredQueuePool,
+        "pool_size": size,
+        "max_overflow": overflow,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS
+    }
+
+
+def instrument_engine(engine):
+    """Attach metrics and idle-connection pings to engine's pool (sync or async engine)"""
+    engine = getattr(engine, "sync_engine", engine)
+    ping_after = settings.DATABASE_PING_AFTER_SECONDS
+    pooled = resolve_pool_mode() != "null"
+    
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        pool_metrics.record_connect()
+        connection_record.info["checked_in_at"] = time.monotonic()
+    
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        pool_metrics.record("closes")
+    
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.record("invalidations")
+    
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        pool_metrics.record_checkin()
+        connection_record.info["checked_in_at"] = time.monotonic()
+    
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        idle_for = time.monotonic() - connection_record.info.get("checked_in_at", 0.0)
+        if pooled and idle_for > ping_after:
+            pool_metrics.record("pings")
+            try:
+                alive = engine.dialect.do_ping(dbapi_connection)
+            except Exception:
+                alive = False
+            if not alive:
+                pool_metrics.record("ping_failures")
+                # The pool invalidates this connection and retries the checkout with a new one
+                raise exc.DisconnectionError("connection was closed while idle")
+        pool_metrics.record_checkout()
+    
+    return engine
@@ -0,0 +1,62 @@
+"""
+ETags and conditional GETs backed by the per-table counters in app/versioning.py.
+
+A cached GET route declares the tables its response is built from:
+
+    @router.get("/{teacher_id}", dependencies=[Depends(conditional("teachers"))])
+
+The dependency reads those counters in one query (before the route loads
+anything, so a write landing in between can only cost an extra 200),
+answers a matching If-None-Match with 304 straight away, and otherwise sets
+ETag and Cache-Control on the response. Counters are bumped just after the
+writing transaction commits, so a GET in that gap may still see the old tag.
+"""
+from typing import Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import select
+
+from .config import settings
+from .database import get_db
+from .models import TableVersion
+from .versioning import VERSIONED_TABLES
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str, cache_control: str):
+        self.etag = etag
+        self.cache_control = cache_control
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": exc.cache_control})
+
+
+def conditional(*tables: str, cache_control: Optional[str] = None):
+    """Dependency adding ETag/Cache-Control to a GET and answering If-None-Match with 304"""
+    unknown = set(tables) - VERSIONED_TABLES
+    if unknown:
+        raise ValueError(f"Tables without a version counter: {sorted(unknown)}")
+
+    async def dependency(request: Request, response: Response, db=Depends(get_db)):
+        rows = await db.execute(select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables)))
+        versions = dict(rows.all())
+        etag = 'W/"' + "-".join(f"{table}.{versions.get(table, 0)}" for table in tables) + '"'
+        policy = cache_control or settings.HTTP_CACHE_CONTROL
+
+        tags = _if_none_match(request)
+        if "*" in tags or etag in tags:
+            raise NotModified(etag, policy)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = policy
+
+    return dependency
+
+
+def _if_none_match(request: Request) -> set:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return set()
+    tags = {tag.strip() for tag in header.split(",")}
+    # Weak comparison: an intermediary may have turned our weak tag strong or vice versa
+    return tags | {tag[2:] if tag.startswith("W/") else "W/" + tag for tag in tags}
@@ -0,0 +1,286 @@
+"""
+Request-level performance metrics.
+
+RequestMetricsMiddleware times every request. The statement hooks that
+track_statements() installs on each engine count the SQL the request ran and
+the time spent waiting on it, and code around slow I/O (JWKS fetch, token
+verification, SMTP) wraps it in span("name"). Each request then:
+
+- answers with a Server-Timing header (total, app, db and every span), shown
+  per request in the browser's network panel;
+- logs one CloudWatch Embedded Metric Format line to stdout, which
+  CloudWatch turns into Latency / SqlCount / SqlTime metrics per route
+  without any PutMetricData calls (METRICS_EMF_ENABLED, on by default on
+  Lambda);
+- feeds per-route histograms kept by this process, served in Prometheus
+  text format at GET /api/admin/metrics.
+
+Routes are labelled with their template (/api/registrations/{registration_id})
+rather than the raw path, so the number of series stays bounded.
+"""
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from .config import settings
+
+# Upper bounds (seconds) of the latency and span histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+STARTED_KEY = "instrumentation.started"
+
+
+class RequestStats:
+    """What one request spent on SQL and in each span"""
+
+    __slots__ = ("sql_count", "sql_seconds", "spans")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.spans: Dict[str, float] = {}
+
+
+# The request being served; threadpool calls run in a copy of the context, so
+# they add to the same RequestStats
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    """Bucket counts and sum of observations (guarded by MetricsRegistry's lock)"""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+
+
+class MetricsRegistry:
+    """Request, SQL and span metrics for this process, rendered for Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests: Dict[Tuple[str, str, int], Histogram] = {}
+            self.sql: Dict[Tuple[str, str], list] = {}
+            self.spans: Dict[str, Histogram] = {}
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            histogram = self.requests.get((method, route, status))
+            if histogram is None:
+                histogram = self.requests[(method, route, status)] = Histogram()
+            histogram.observe(seconds)
+            totals = self.sql.get((method, route))
+            if totals is None:
+                totals = self.sql[(method, route)] = [0, 0.0]
+            totals[0] += stats.sql_count
+            totals[1] += stats.sql_seconds
+
+    def record_span(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = Histogram()
+            histogram.observe(seconds)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        with self._lock:
+            lines += _histogram_lines(
+                "http_request_duration_seconds", "Time to the last response byte, by route template",
+                {_labels(method=m, route=r, status=s): h for (m, r, s), h in sorted(self.requests.items())}
+            )
+            for name, index, help_text in (
+                ("http_request_sql_statements_total", 0, "SQL statements executed while serving the route"),
+                ("http_request_sql_seconds_total", 1, "Time spent executing SQL while serving the route"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                lines += [
+                    f"{name}{{{_labels(method=m, route=r)}}} {_number(totals[index])}"
+                    for (m, r), totals in sorted(self.sql.items())
+                ]
+            lines += _histogram_lines(
+                "span_duration_seconds", "Time spent in JWKS fetches, token verification and SMTP",
+                {_labels(span=name): h for name, h in sorted(self.spans.items())}
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def _number(value) -> str:
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name: str, help_text: str, series: Dict[str, Histogram]) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series.items():
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {_number(histogram.total)}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time the block into the current request's Server-Timing and the span
+    histogram. Also works as a decorator: @span("smtp").
+    """
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.spans[name] = stats.spans.get(name, 0.0) + elapsed
+        registry.record_span(name, elapsed)
+
+
+def track_statements(engine):
+    """Count and time every statement against the request running it (sync or async engine)"""
+    if not settings.METRICS_ENABLED:
+        return engine
+    from sqlalchemy import event
+
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info[STARTED_KEY] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is not None:
+            stats.sql_count += 1
+            now = time.perf_counter()
+            stats.sql_seconds += now - conn.info.get(STARTED_KEY, now)
+
+    return engine
+
+
+def route_template(scope) -> str:
+    """The matched route's path template, including its router's prefix"""
+    # FastAPI keeps included routes unprefixed and records the prefixed
+    # template of the one it picked in its own scope entry
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    template = getattr(context, "path_format", None) or getattr(scope.get("route"), "path_format", None)
+    return template or UNMATCHED_ROUTE
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    entries = [
+        f"total;dur={total * 1000:.2f}",
+        # Time outside SQL: handler code, serialization, and spans such as token_verify
+        f"app;dur={max(total - stats.sql_seconds, 0.0) * 1000:.2f}",
+        f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.sql_count} queries"'
+    ]
+    entries += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stats.spans.items()]
+    return ", ".join(entries)
+
+
+@lru_cache(maxsize=64)
+def _emf_directive(span_names: Tuple[str, ...]) -> str:
+    """The EMF CloudWatchMetrics array, which only varies with the spans a request had"""
+    metrics = [
+        {"Name": "Latency", "Unit": "Milliseconds"},
+        {"Name": "SqlCount", "Unit": "Count"},
+        {"Name": "SqlTime", "Unit": "Milliseconds"},
+    ] + [{"Name": name, "Unit": "Milliseconds"} for name in span_names]
+    return json.dumps(
+        [{"Namespace": settings.METRICS_NAMESPACE, "Dimensions": [["Route", "Method"]], "Metrics": metrics}],
+        separators=(",", ":")
+    )
+
+
+def emf_line(method: str, route: str, status: int, total: float, stats: RequestStats) -> str:
+    """One request as a CloudWatch Embedded Metric Format log event (a JSON line)"""
+    values = {
+        "Route": route,
+        "Method": method,
+        "Status": status,
+        "Latency": round(total * 1000, 3),
+        "SqlCount": stats.sql_count,
+        "SqlTime": round(stats.sql_seconds * 1000, 3),
+    }
+    for name, seconds in stats.spans.items():
+        values[name] = round(seconds * 1000, 3)
+    # Splice in the cached metric directive rather than re-encoding it per request
+    return '{"_aws":{"Timestamp":%d,"CloudWatchMetrics":%s},%s\n' % (
+        time.time() * 1000, _emf_directive(tuple(stats.spans)), json.dumps(values, separators=(",", ":"))[1:]
+    )
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware (no per-request task, streamed bodies pass straight
+    through). Server-Timing goes out with the response headers; latency is
+    recorded at the last body chunk, so a streamed export counts in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.emf = settings.metrics_emf_enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+        finished = None
+
+        async def send_with_timing(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(stats, time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", header.encode("latin-1"))]}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total = (finished or time.perf_counter()) - started
+            route = route_template(scope)
+            registry.record_request(scope["method"], route, status, total, stats)
+            if self.emf:
+                # Straight to stdout: the Lambda log handler's prefix would stop CloudWatch parsing it as EMF
+                sys.stdout.write(emf_line(scope["method"], route, status, total, stats))
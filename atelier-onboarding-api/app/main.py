@@ -2,11 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
 from .config import settings
-from .database import Base, engine
+from .pagination import NEXT_CURSOR_HEADER
+from .http_cache import NotModified, not_modified_handler
+from .instrumentation import RequestMetricsMiddleware
+from .services.idempotency import REPLAYED_HEADER
 from .routers import registrations, teachers, admin
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Tables are not created here: importing the app must not touch the database
+# on a cold start. Use `alembic upgrade head` (or `python -m app.schema` locally).
 
 app = FastAPI(
     title="Atelier Registration API",
@@ -23,8 +26,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing", REPLAYED_HEADER],
 )
 
+# Per-route latency, SQL and span metrics (see app/instrumentation.py); added
+# last so it is outermost and times CORS handling too
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+
+# Conditional GETs short-circuit with 304 (see app/http_cache.py)
+app.add_exception_handler(NotModified, not_modified_handler)
+
 # Include routers
 app.include_router(registrations.router, prefix="/api/registrations", tags=["Registrations"])
 app.include_router(teachers.router, prefix="/api/teachers", tags=["Teachers"])
@@ -1,10 +1,53 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum as SQLEnum, ARRAY
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Text, ForeignKey, Index, DDL, event, Enum as SQLEnum, ARRAY, JSON, TypeDecorator, Uuid, select, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.sql.functions import FunctionElement
 from datetime import datetime
 import enum
+import os
+import time
+import uuid
 from .database import Base
 
+class UUIDString(TypeDecorator):
+    """
+    Ids are native uuid on Postgres (16 bytes) and CHAR(32) hex elsewhere; they
+    stay str in Python, so the API serialises them as before. They are bound
+    as uuid.UUID, the type the Postgres drivers return, so an ORM flush of
+    several rows can match the RETURNING rows back to its parameters.
+    """
+    impl = Uuid
+    cache_ok = True
+
+    def __init__(self):
+        super().__init__(as_uuid=True)
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(value)
+
+
+UUIDText = UUIDString()
+
+
+def new_id() -> str:
+    """
+    A UUIDv7 (RFC 9562): 48 bits of Unix milliseconds, then random bits.
+    Ids generated later sort later, so inserts land at the right-hand edge of
+    the primary key b-tree instead of splitting pages all over it.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    # Version 7 in bits 48-51 and the RFC 4122 variant in bits 64-65, over the random bits
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return str(uuid.UUID(int=value))
+
 
 class RegistrationStatus(str, enum.Enum):
     PENDING = "pending"
@@ -13,6 +56,18 @@ class RegistrationStatus(str, enum.Enum):
     COMPLETED = "completed"
 
 
+class NotificationStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class AvailabilityKind(str, enum.Enum):
+    WEEKLY = "weekly"
+    AVAILABLE = "available"
+    UNAVAILABLE = "unavailable"
+
+
 class ExperienceLevel(str, enum.Enum):
     BEGINNER = "beginner"
     INTERMEDIATE = "intermediate"
@@ -22,7 +77,7 @@ class ExperienceLevel(str, enum.Enum):
 class Teacher(Base):
     __tablename__ = "teachers"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(UUIDText, primary_key=True)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False, index=True)
     phone = Column(String)
@@ -30,16 +85,88 @@ class Teacher(Base):
     bio = Column(Text)
     experience_years = Column(Integer)
     availability = Column(String)
+    # Most active students for automatic assignment; NULL = ASSIGNMENT_DEFAULT_CAPACITY
+    capacity = Column(Integer)
+    # Registrations per status, kept in step by services/workload.py
+    assigned_count = Column(Integer, nullable=False, default=0, server_default="0")
+    link_sent_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     registrations = relationship("Registration", back_populates="teacher")
+    # Rows go with the teacher (ON DELETE CASCADE)
+    availability_windows = relationship("TeacherAvailability", passive_deletes=True)
+    
+    __table_args__ = (
+        # Keyset pagination order (see app/pagination.py)
+        Index("ix_teachers_created_at_id", "created_at", "id"),
+    )
+    
+    @hybrid_property
+    def active_load(self):
+        """Students with a teacher assigned or a demo link sent"""
+        return self.assigned_count + self.link_sent_count
+
+
+class TeacherAvailability(Base):
+    """A recurring weekly window (UTC) or a dated exception; see services/scheduling.py"""
+    __tablename__ = "teacher_availability"
+    
+    id = Column(UUIDText, primary_key=True)
+    teacher_id = Column(UUIDText, ForeignKey("teachers.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String, nullable=False)
+    # Weekly windows: 0 = Monday, minutes after midnight UTC (end_minute up to 1440)
+    weekday = Column(Integer)
+    start_minute = Column(Integer)
+    end_minute = Column(Integer)
+    # Exceptions: time off (unavailable) or extra hours (available)
+    starts_at = Column(DateTime(timezone=True))
+    ends_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TableVersion(Base):
+    """Write counter per table, bumped after each writing transaction commits (see app/versioning.py)"""
+    __tablename__ = "table_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class current_change_seq(FunctionElement):
+    """
+    Change feed position of the writing transaction (see services/change_feed.py).
+
+    On Postgres it is the transaction id, taken without any lock: concurrent
+    writers never wait on each other for it, and the feed's watermark (the
+    oldest transaction still running) keeps readers behind the ones that have
+    not committed. Other backends take one past the highest position stamped
+    so far, which is only safe because SQLite runs one writer at a time.
+    """
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(current_change_seq)
+def _next_change_seq(element, compiler, **kw):
+    stamped = union_all(
+        select(func.max(Registration.change_seq)).correlate(None),
+        select(func.max(RegistrationTombstone.change_seq)).correlate(None),
+    ).subquery()
+    return compiler.process(select(func.coalesce(func.max(stamped.c[0]), 0) + 1).scalar_subquery(), **kw)
+
+
+@compiles(current_change_seq, "postgresql")
+def _transaction_id(element, compiler, **kw):
+    # xid8: 64 bits with the epoch, so it never wraps around
+    return "pg_current_xact_id()::text::bigint"
 
 
 class Registration(Base):
     __tablename__ = "registrations"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(UUIDText, primary_key=True)
     student_name = Column(String, nullable=False)
     student_age = Column(Integer, nullable=False)
     grade = Column(String, nullable=False)
@@ -48,27 +175,102 @@ class Registration(Base):
     phone = Column(String, nullable=False)
     preferred_time = Column(String)
     experience_level = Column(SQLEnum(ExperienceLevel), nullable=True)
-    interests = Column(ARRAY(String))
+    # JSON on SQLite so the models also work against the aiosqlite/sqlite test databases
+    interests = Column(ARRAY(String).with_variant(JSON(), "sqlite"))
     additional_notes = Column(Text)
     status = Column(SQLEnum(RegistrationStatus), default=RegistrationStatus.PENDING, nullable=False)
-    teacher_id = Column(String, ForeignKey("teachers.id"), nullable=True)
+    teacher_id = Column(UUIDText, ForeignKey("teachers.id"), nullable=True)
     demo_link = Column(String)
     demo_scheduled_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set on insert too, so new rows are not NULL until first updated
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Change feed position of the transaction that last wrote the row
+    change_seq = Column(
+        BigInteger, nullable=False, server_default="0",
+        default=current_change_seq(), onupdate=current_change_seq()
+    )
+    # Hash of email, student name and day for public submissions (services/idempotency.py)
+    dedup_key = Column(String(64))
     
     teacher = relationship("Teacher", back_populates="registrations")
+    
+    __table_args__ = (
+        # Keyset pagination order (see app/pagination.py)
+        Index("ix_registrations_created_at_id", "created_at", "id"),
+        # Change feed order (see GET /api/registrations/changes)
+        Index("ix_registrations_change_seq_id", "change_seq", "id"),
+        # Demo bookings per teacher for the scheduling conflict check
+        Index("ix_registrations_teacher_id_demo_scheduled_at", "teacher_id", "demo_scheduled_at"),
+        # One registration per natural key; NULLs (imported and older rows) never clash
+        Index("ux_registrations_dedup_key", "dedup_key", unique=True),
+        # Trigram indexes serving the ILIKE search (plain b-trees on non-Postgres backends)
+        Index("ix_registrations_student_name_trgm", "student_name",
+              postgresql_using="gin", postgresql_ops={"student_name": "gin_trgm_ops"}),
+        Index("ix_registrations_parent_name_trgm", "parent_name",
+              postgresql_using="gin", postgresql_ops={"parent_name": "gin_trgm_ops"}),
+        Index("ix_registrations_email_trgm", "email",
+              postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
+
+
+class RegistrationTombstone(Base):
+    """A deleted registration, reported by the change feed"""
+    __tablename__ = "registration_tombstones"
+    
+    id = Column(UUIDText, primary_key=True)
+    change_seq = Column(BigInteger, primary_key=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_registration_tombstones_change_seq_id", "change_seq", "id"),
+    )
+
+
+class IdempotencyKey(Base):
+    """The response to a POST /api/registrations sent with an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+    
+    # SHA-256 of the header value
+    key_hash = Column(String(64), primary_key=True)
+    # SHA-256 of the request body, so a key reused for another request is refused
+    request_hash = Column(String(64), nullable=False)
+    registration_id = Column(UUIDText, ForeignKey("registrations.id", ondelete="CASCADE"))
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+event.listen(
+    Registration.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
 
 
 class Notification(Base):
     __tablename__ = "notifications"
     
-    id = Column(String, primary_key=True, index=True)
-    registration_id = Column(String, ForeignKey("registrations.id"))
+    id = Column(UUIDText, primary_key=True)
+    registration_id = Column(UUIDText, ForeignKey("registrations.id"))
     recipient_email = Column(String, nullable=False)
     subject = Column(String, nullable=False)
     body = Column(Text, nullable=False)
+    text_body = Column(Text)
     sent_at = Column(DateTime(timezone=True))
-    status = Column(String, default="pending")
+    status = Column(String, default=NotificationStatus.PENDING.value)
     error_message = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Earliest time the dispatcher may (re)try; also used as the claim lease
+    next_attempt_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Lets the unit of work insert a new registration before its queued emails
+    registration = relationship("Registration")
+    
+    __table_args__ = (
+        Index("ix_notifications_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+# Registers the session events that bump table_versions on writes
+from . import versioning  # noqa: E402,F401
@@ -0,0 +1,59 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first.
+
+The cursor is an opaque base64 token of the last row's sort key; the next
+page is everything strictly after it, served from the (created_at, id)
+index instead of counting past OFFSET rows.
+"""
+import base64
+import json
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.types import NullType
+
+from .schemas import canonical_id
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), canonical_id(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, model, cursor: Optional[str], skip: int, limit: int):
+    """Apply a stable (created_at, id) ordering plus either the cursor or skip/limit"""
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # The id binds as the column stores it (hex on SQLite, not the dashed form);
+        # created_at keeps the driver's own rendering, which matches CURRENT_TIMESTAMP there
+        position = tuple_(created_at, row_id, types=(NullType(), model.id.type))
+        query = query.where(tuple_(model.created_at, model.id) < position)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, rows, limit: int):
+    """Expose the cursor for the page after rows, if the page was full"""
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        if isinstance(last, Mapping):
+            created_at, row_id = last["created_at"], last["id"]
+        else:
+            created_at, row_id = last.created_at, last.id
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(created_at, row_id)
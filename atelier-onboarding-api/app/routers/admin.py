@@ -1,40 +1,209 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import func, select, case, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import Counter
+from typing import Optional
+from datetime import date, datetime, time, timedelta, timezone
 
-from ..database import get_db
+from ..database import get_db, get_async_engine
 from ..models import Registration, Teacher, RegistrationStatus
-from ..schemas import StatsResponse
+from ..schemas import (
+    StatsResponse, TeacherCount, DailyCount, PoolStatsResponse, AutoAssignResponse, ReconcileWorkloadResponse
+)
 from ..auth import require_admin
+from ..cache import stats_cache
+from ..db_pool import pool_metrics
+from ..instrumentation import registry
+from ..services.registration_export import aiter_export, export_filename, iter_export, media_type
+from ..services.teacher_matching import load_backlog, save_assignments, solve, summarize
+from ..services.workload import reconcile
+from .registrations import filtered_registrations_query
 
 router = APIRouter()
 
 
+def stats_query(since: datetime):
+    """
+    One scan of registrations grouped by (teacher, day), with one
+    COUNT(*) FILTER (WHERE status = ...) column per status.
+
+    Days before `since` collapse into a NULL day, so the number of groups is
+    bounded by teachers x days rather than by table size; every counter and
+    breakdown in StatsResponse is a roll-up of these groups.
+    """
+    day = case((Registration.created_at >= since, func.date(Registration.created_at)), else_=None)
+    # Group by the output alias: repeating the CASE would bind `since` twice,
+    # which Postgres rejects as a different expression under server-side params
+    return (
+        select(
+            Registration.teacher_id,
+            Teacher.name.label("teacher_name"),
+            day.label("created_day"),
+            *(func.count().filter(Registration.status == s).label(s.value) for s in RegistrationStatus)
+        )
+        .outerjoin(Teacher, Registration.teacher_id == Teacher.id)
+        .group_by(Registration.teacher_id, Teacher.name, literal_column("created_day"))
+    )
+
+
+def build_stats(rows) -> StatsResponse:
+    by_status = Counter({s.value: 0 for s in RegistrationStatus})
+    by_teacher = {}
+    by_day = Counter()
+    
+    for row in rows:
+        counts = row._mapping
+        count = 0
+        for s in RegistrationStatus:
+            by_status[s.value] += counts[s.value]
+            count += counts[s.value]
+        if row.teacher_id is not None:
+            name, total = by_teacher.get(row.teacher_id, (row.teacher_name, 0))
+            by_teacher[row.teacher_id] = (name, total + count)
+        if row.created_day is not None:
+            # date on Postgres, ISO string on SQLite
+            day = row.created_day if isinstance(row.created_day, date) else date.fromisoformat(row.created_day)
+            by_day[day] += count
+    
+    return StatsResponse(
+        total_registrations=sum(by_status.values()),
+        pending_assignments=by_status[RegistrationStatus.PENDING.value],
+        # Registrations that have a teacher assigned (any status after assignment)
+        teachers_assigned=sum(count for _, count in by_teacher.values()),
+        completed_demos=by_status[RegistrationStatus.COMPLETED.value],
+        by_status=dict(by_status),
+        by_teacher=sorted(
+            (TeacherCount(teacher_id=tid, teacher_name=name, count=count)
+             for tid, (name, count) in by_teacher.items()),
+            key=lambda t: t.count,
+            reverse=True
+        ),
+        by_day=[DailyCount(day=day, count=by_day[day]) for day in sorted(by_day)]
+    )
+
+
 @router.get("/stats", response_model=StatsResponse)
 async def get_stats(
-    db: Session = Depends(get_db),
+    days: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_admin)
 ):
-    """Get dashboard statistics (Admin only)"""
+    """
+    Get dashboard statistics (Admin only)
+
+    Includes breakdowns by status, by teacher and by day (last `days` days).
+    Served from a short-lived cache that registration writes invalidate.
+    """
     
-    total_registrations = db.query(func.count(Registration.id)).scalar()
+    cached = stats_cache.get(days)
+    if cached is not None:
+        return cached
     
-    pending_assignments = db.query(func.count(Registration.id)).filter(
-        Registration.status == RegistrationStatus.PENDING
-    ).scalar()
+    # Midnight UTC at the start of the window, whatever the server's local time zone
+    since = datetime.combine(datetime.now(timezone.utc).date() - timedelta(days=days - 1), time.min, tzinfo=timezone.utc)
+    result = await db.execute(stats_query(since))
+    stats = build_stats(result.all())
     
-    # Count registrations that have a teacher assigned (any status after assignment)
-    teachers_assigned = db.query(func.count(Registration.id)).filter(
-        Registration.teacher_id.isnot(None)
-    ).scalar()
+    stats_cache.set(days, stats)
+    return stats
+
+
+@router.get("/db-pool", response_model=PoolStatsResponse)
+async def get_db_pool_stats(current_user: dict = Depends(require_admin)):
+    """
+    Connection pool metrics for the process serving this request (Admin only)
+
+    Checkout wait times and connection churn since the process started; on
+    Lambda that is one container, not the whole fleet.
+    """
+    return pool_metrics.snapshot()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(current_user: dict = Depends(require_admin)):
+    """
+    Per-route latency histograms, SQL totals and span timings in Prometheus
+    text format (Admin only)
+
+    Covers the process serving this request since it started; on Lambda use
+    the CloudWatch EMF metrics for fleet-wide numbers.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/registrations/export")
+async def export_registrations(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    gzip: bool = False,
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Stream every matching registration as CSV or NDJSON (Admin only)
+
+    Takes the same status/search filters as GET /api/registrations, newest
+    first, read through a server-side cursor. gzip=true returns a .gz file.
+    """
+    query = filtered_registrations_query(status, search).order_by(
+        Registration.created_at.desc(), Registration.id.desc()
+    )
     
-    completed_demos = db.query(func.count(Registration.id)).filter(
-        Registration.status == RegistrationStatus.COMPLETED
-    ).scalar()
+    if get_async_engine() is not None:
+        body = aiter_export(query, format, compress=gzip)
+    else:
+        body = iter_export(query, format, compress=gzip)
     
-    return StatsResponse(
-        total_registrations=total_registrations,
-        pending_assignments=pending_assignments,
-        teachers_assigned=teachers_assigned,
-        completed_demos=completed_demos
+    return StreamingResponse(
+        body,
+        media_type=media_type(format, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(format, gzip)}"'}
     )
+
+
+@router.post("/auto-assign", response_model=AutoAssignResponse)
+async def auto_assign_teachers(
+    dry_run: bool = False,
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Assign teachers to the pending backlog in one optimised batch (Admin only)
+
+    Scores teacher/student fit, balances load and respects each teacher's
+    capacity (see services/teacher_matching.py). With dry_run=true the
+    proposed assignments are returned without being saved.
+    """
+    registrations, teachers, loads = await db.run_sync(load_backlog, dry_run, limit)
+    # The solver is CPU-bound; keep it off the event loop
+    placed = await run_in_threadpool(solve, registrations, teachers, loads)
+    
+    if dry_run:
+        await db.rollback()
+    else:
+        await db.run_sync(save_assignments, placed)
+        if placed:
+            stats_cache.invalidate()
+    
+    return summarize(registrations, teachers, loads, placed, dry_run)
+
+
+@router.post("/workload/reconcile", response_model=ReconcileWorkloadResponse)
+async def reconcile_workload(
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Rebuild the per-teacher workload counters from registrations (Admin only)
+
+    Lists the teachers whose counters had drifted; unless dry_run they are
+    corrected.
+    """
+    drift = await db.run_sync(reconcile, dry_run)
+    if dry_run:
+        await db.rollback()
+    return ReconcileWorkloadResponse(dry_run=dry_run, drifted=len(drift), teachers=drift)
@@ -1,190 +1,503 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
-import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
-from ..database import get_db
-from ..models import Registration, Teacher, RegistrationStatus
+from ..database import get_db, database_backend
+from ..models import Notification, Registration, Teacher, RegistrationStatus, new_id
 from ..schemas import (
     RegistrationCreate,
     RegistrationResponse,
     RegistrationUpdate,
     MessageResponse,
-    AssignTeacherRequest
+    AssignTeacherRequest,
+    ImportResult,
+    BulkRegistrationRequest,
+    BulkAssignTeacherRequest,
+    BulkItemResult,
+    BulkOperationResponse,
+    SendDemoLinkRequest,
+    RegistrationChanges,
+    EntityId
 )
-from ..services.email_service import email_service
+from ..services.outbox import enqueue_teacher_assignment_notification
+from ..services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, create_once, natural_key
+from ..services.change_feed import after, decode_token, merge_page, tombstones_query, watermark_query
+from ..services.registration_import import ImportRun, LineDecoder, format_for
+from ..services.scheduling import as_utc, schedule_conflict
+from ..services.workload import WorkloadDelta, apply_delta
+from ..auth import require_admin
+from ..pagination import paginate, set_next_cursor
+from ..cache import stats_cache
+from ..http_cache import conditional
+from ..search import search_filter, prefix_filter, search_rank
 
 router = APIRouter()
 
+# Demo class links (in production, these would be real video conference links)
+DEMO_LINK_BASE = "https://meet.ashishpatelatelier.com/demo/"
+
+
+def demo_link_for(registration_id: str) -> str:
+    return f"{DEMO_LINK_BASE}{registration_id}"
+
 
 @router.post("", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
 async def create_registration(
     registration: RegistrationCreate,
-    db: Session = Depends(get_db)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, min_length=1, max_length=255),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Create a new student registration"""
+    """
+    Create a new student registration
+
+    Safe to retry: a repeat with the same Idempotency-Key, or the same email
+    and student name on the same day, returns the original response (with
+    Idempotent-Replayed: true) without creating anything.
+    """
     
-    # Create registration
-    db_registration = Registration(
-        id=str(uuid.uuid4()),
-        student_name=registration.student_name,
-        student_age=registration.student_age,
-        grade=registration.grade,
-        parent_name=registration.parent_name,
-        email=registration.email,
-        phone=registration.phone,
-        preferred_time=registration.preferred_time,
-        experience_level=registration.experience_level,
-        interests=registration.interests,
-        additional_notes=registration.additional_notes,
-        status=RegistrationStatus.PENDING
-    )
+    values = {
+        "id": new_id(),
+        "student_name": registration.student_name,
+        "student_age": registration.student_age,
+        "grade": registration.grade,
+        "parent_name": registration.parent_name,
+        "email": registration.email,
+        "phone": registration.phone,
+        "preferred_time": registration.preferred_time,
+        "experience_level": registration.experience_level,
+        "interests": registration.interests,
+        "additional_notes": registration.additional_notes,
+        "status": RegistrationStatus.PENDING,
+        "dedup_key": natural_key(registration.email, registration.student_name, datetime.now(timezone.utc).date()),
+    }
     
-    db.add(db_registration)
-    db.commit()
-    db.refresh(db_registration)
+    def respond(registration_id: str) -> dict:
+        return MessageResponse(message="Registration created successfully", id=registration_id).model_dump()
     
-    # Send confirmation email
-    email_service.send_registration_confirmation(
-        to_email=registration.email,
-        student_name=registration.student_name,
-        parent_name=registration.parent_name
+    # One threadpool hop for the key lookup, insert and outbox row (see services/idempotency.py)
+    body, replayed = await db.run_sync(
+        create_once, values, registration.model_dump(mode="json"), idempotency_key, respond
     )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    else:
+        stats_cache.invalidate()
+    return body
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_registrations(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Bulk import registrations from a CSV or NDJSON request body (Admin only)
+
+    The body is read as a stream and written chunk by chunk, each chunk in
+    its own transaction with its confirmation emails queued in the outbox.
+    The format comes from `format` or the Content-Type header. Rows that
+    fail are listed in `errors` without stopping the import.
+    """
     
-    return MessageResponse(
-        message="Registration created successfully",
-        id=db_registration.id
+    fmt = format or format_for(content_type=request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson"
+        )
+    
+    async def body_lines():
+        decoder = LineDecoder()
+        async for chunk in request.stream():
+            for line in decoder.decode(chunk):
+                yield line
+        for line in decoder.finish():
+            yield line
+    
+    run = ImportRun(fmt, chunk_size)
+    try:
+        async for line in body_lines():
+            records = run.add(line)
+            if records:
+                await db.run_sync(run.process_chunk, records)
+        records = run.finish()
+        if records:
+            await db.run_sync(run.process_chunk, records)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail=f"Body is not valid UTF-8 (after row {run.parser.row_number})")
+    finally:
+        if run.imported:
+            stats_cache.invalidate()
+    
+    return run.result()
+
+
+def registration_response_query():
+    """
+    SELECT of exactly the RegistrationResponse fields, with teacher_name joined in.
+
+    Rows come back as plain mappings that FastAPI validates once against the
+    response model, so no ORM objects are built and teachers are never
+    lazy-loaded per row.
+    """
+    columns = [
+        column for name, column in Registration.__table__.c.items()
+        if name in RegistrationResponse.model_fields
+    ]
+    return select(*columns, Teacher.name.label("teacher_name")).outerjoin(
+        Teacher, Registration.teacher_id == Teacher.id
     )
 
 
+def filtered_registrations_query(status: Optional[str] = None, search: Optional[str] = None):
+    """registration_response_query() narrowed by the list endpoint's status/search filters"""
+    query = registration_response_query()
+    
+    if status:
+        query = query.where(Registration.status == status)
+    
+    if search:
+        query = query.where(search_filter(search))
+    
+    return query
+
+
 @router.get("", response_model=List[RegistrationResponse])
 async def get_registrations(
+    response: Response,
     status: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all registrations with optional filters"""
+    """
+    Get registrations with optional filters, newest first.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next
+    page; skip/limit offsets still work but get slower on deep pages.
+    """
     
-    query = db.query(Registration)
+    query = filtered_registrations_query(status, search)
+    result = await db.execute(paginate(query, Registration, cursor, skip, limit))
+    registrations = result.mappings().all()
+    set_next_cursor(response, registrations, limit)
+    return registrations
+
+
+@router.get("/search", response_model=List[RegistrationResponse])
+async def search_registrations(
+    q: str = Query(..., min_length=1, max_length=100),
+    prefix: bool = True,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Ranked registration search for the admin type-ahead.
+
+    With prefix=true (default) matches names/emails, or words in them, that
+    start with q; otherwise matches q anywhere. Best matches come first.
+    """
     
-    if status:
-        query = query.filter(Registration.status == status)
+    query = registration_response_query().where(prefix_filter(q) if prefix else search_filter(q))
+    query = query.order_by(search_rank(q, database_backend()).desc(), Registration.created_at.desc())
     
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Registration.student_name.ilike(search_filter)) |
-            (Registration.parent_name.ilike(search_filter)) |
-            (Registration.email.ilike(search_filter))
+    result = await db.execute(query.limit(limit))
+    return result.mappings().all()
+
+
+@router.get("/changes", response_model=RegistrationChanges)
+async def get_registration_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Registrations created, updated or deleted since the `since` token.
+
+    Start without `since`, then pass `next` back on every call; keep going
+    while `has_more` is true. Each registration appears once, in its latest
+    state, and deletions are listed in `deleted` (see services/change_feed.py).
+    """
+    
+    position = decode_token(since)
+    watermark = await db.scalar(watermark_query()) or 0
+    query = registration_response_query().add_columns(Registration.change_seq)
+    # One past the page of each kind tells whether there is more
+    rows = (await db.execute(after(query, Registration, position, watermark, limit + 1))).mappings().all()
+    tombstones = (await db.execute(tombstones_query(position, watermark, limit + 1))).all()
+    return merge_page(rows, tombstones, position, limit)
+
+
+def bulk_results(ids: List[str], found: dict, check) -> dict:
+    """
+    Per-item results for a bulk operation, keyed by registration ID.
+
+    `found` maps the IDs that exist to their row; `check(row)` returns an
+    error message for rows the operation must skip, or None.
+    """
+    results = {}
+    for registration_id in ids:
+        row = found.get(registration_id)
+        if row is None:
+            results[registration_id] = BulkItemResult(id=registration_id, success=False, error="Registration not found")
+            continue
+        error = check(row)
+        if error:
+            results[registration_id] = BulkItemResult(
+                id=registration_id, success=False, status=row.status.value, error=error
+            )
+        else:
+            results[registration_id] = BulkItemResult(id=registration_id, success=True)
+    return results
+
+
+def bulk_response(results: dict) -> BulkOperationResponse:
+    succeeded = sum(1 for result in results.values() if result.success)
+    return BulkOperationResponse(
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=list(results.values())
+    )
+
+
+def check_not_completed(row) -> Optional[str]:
+    if row.status == RegistrationStatus.COMPLETED:
+        return "Registration already completed"
+    return None
+
+
+@router.post("/bulk/assign", response_model=BulkOperationResponse)
+async def bulk_assign_teacher(
+    request: BulkAssignTeacherRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Assign one teacher to many registrations (Admin only)
+
+    All registrations are looked up in one IN (...) query and moved to
+    teacher_assigned in one UPDATE. Unknown and completed registrations are
+    skipped and reported in `results`.
+    """
+    
+    teacher_id = await db.scalar(select(Teacher.id).where(Teacher.id == request.teacher_id))
+    if not teacher_id:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    
+    ids = list(dict.fromkeys(request.registration_ids))
+    rows = await db.execute(
+        select(Registration.id, Registration.status, Registration.teacher_id)
+        .where(Registration.id.in_(ids))
+        .with_for_update()
+    )
+    found = {row.id: row for row in rows}
+    results = bulk_results(ids, found, check_not_completed)
+    
+    eligible = [registration_id for registration_id, result in results.items() if result.success]
+    if eligible:
+        await db.execute(
+            update(Registration)
+            .where(Registration.id.in_(eligible))
+            .values(teacher_id=teacher_id, status=RegistrationStatus.TEACHER_ASSIGNED)
+            .execution_options(synchronize_session=False)
         )
+        delta = WorkloadDelta()
+        for registration_id in eligible:
+            row = found[registration_id]
+            delta.move(row.teacher_id, row.status, teacher_id, RegistrationStatus.TEACHER_ASSIGNED)
+        await apply_delta(db, delta)
+        await db.commit()
+        stats_cache.invalidate()
+        for registration_id in eligible:
+            results[registration_id].status = RegistrationStatus.TEACHER_ASSIGNED.value
+    
+    return bulk_response(results)
+
+
+@router.post("/bulk/send-link", response_model=BulkOperationResponse)
+async def bulk_send_demo_link(
+    request: BulkRegistrationRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Send demo class links for many registrations (Admin only)
+
+    One query loads the registrations with their teacher names, one UPDATE
+    sets the link_sent status on all of them, with each demo link (built by
+    demo_link_for, as for a single send) picked by a CASE on the id, and all
+    emails are queued in the same transaction. Registrations without a teacher, or
+    already completed, are skipped and reported in `results`.
+    """
+    
+    ids = list(dict.fromkeys(request.registration_ids))
+    rows = await db.execute(
+        select(
+            Registration.id,
+            Registration.status,
+            Registration.teacher_id,
+            Registration.email,
+            Registration.student_name,
+            Registration.parent_name,
+            Teacher.name.label("teacher_name")
+        )
+        .outerjoin(Teacher, Registration.teacher_id == Teacher.id)
+        .where(Registration.id.in_(ids))
+        .with_for_update(of=Registration)
+    )
+    found = {row.id: row for row in rows}
     
-    registrations = query.offset(skip).limit(limit).all()
-    
-    # Add teacher name to response
-    result = []
-    for reg in registrations:
-        reg_dict = {
-            "id": reg.id,
-            "student_name": reg.student_name,
-            "student_age": reg.student_age,
-            "grade": reg.grade,
-            "parent_name": reg.parent_name,
-            "email": reg.email,
-            "phone": reg.phone,
-            "preferred_time": reg.preferred_time,
-            "experience_level": reg.experience_level.value if reg.experience_level else None,
-            "interests": reg.interests,
-            "additional_notes": reg.additional_notes,
-            "status": reg.status.value,
-            "teacher_id": reg.teacher_id,
-            "teacher_name": reg.teacher.name if reg.teacher else None,
-            "demo_link": reg.demo_link,
-            "demo_scheduled_at": reg.demo_scheduled_at,
-            "created_at": reg.created_at,
-            "updated_at": reg.updated_at
-        }
-        result.append(RegistrationResponse(**reg_dict))
-    
-    return result
-
-
-@router.get("/{registration_id}", response_model=RegistrationResponse)
+    def check(row):
+        if row.teacher_name is None:
+            return "No teacher assigned yet"
+        return check_not_completed(row)
+    
+    results = bulk_results(ids, found, check)
+    
+    eligible = [registration_id for registration_id, result in results.items() if result.success]
+    if eligible:
+        sent_at = datetime.utcnow()
+        await db.execute(
+            update(Registration)
+            .where(Registration.id.in_(eligible))
+            .values(
+                # Comparisons bind the ids with the column's type, which a {value: result} mapping does not
+                demo_link=case(
+                    *((Registration.id == registration_id, demo_link_for(registration_id)) for registration_id in eligible)
+                ),
+                status=RegistrationStatus.LINK_SENT,
+                demo_scheduled_at=sent_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        delta = WorkloadDelta()
+        for registration_id in eligible:
+            row = found[registration_id]
+            delta.move(row.teacher_id, row.status, row.teacher_id, RegistrationStatus.LINK_SENT)
+            enqueue_teacher_assignment_notification(
+                db,
+                registration_id=row.id,
+                to_email=row.email,
+                student_name=row.student_name,
+                parent_name=row.parent_name,
+                teacher_name=row.teacher_name,
+                demo_link=demo_link_for(row.id)
+            )
+            results[registration_id].status = RegistrationStatus.LINK_SENT.value
+        await apply_delta(db, delta)
+        await db.commit()
+        stats_cache.invalidate()
+    
+    return bulk_response(results)
+
+
+@router.get(
+    "/{registration_id}",
+    response_model=RegistrationResponse,
+    dependencies=[Depends(conditional("registrations", "teachers"))]
+)
 async def get_registration(
-    registration_id: str,
-    db: Session = Depends(get_db)
+    registration_id: EntityId,
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific registration by ID"""
     
-    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    result = await db.execute(registration_response_query().where(Registration.id == registration_id))
+    registration = result.mappings().first()
     if not registration:
         raise HTTPException(status_code=404, detail="Registration not found")
     
-    return RegistrationResponse(
-        id=registration.id,
-        student_name=registration.student_name,
-        student_age=registration.student_age,
-        grade=registration.grade,
-        parent_name=registration.parent_name,
-        email=registration.email,
-        phone=registration.phone,
-        preferred_time=registration.preferred_time,
-        experience_level=registration.experience_level.value if registration.experience_level else None,
-        interests=registration.interests,
-        additional_notes=registration.additional_notes,
-        status=registration.status.value,
-        teacher_id=registration.teacher_id,
-        teacher_name=registration.teacher.name if registration.teacher else None,
-        demo_link=registration.demo_link,
-        demo_scheduled_at=registration.demo_scheduled_at,
-        created_at=registration.created_at,
-        updated_at=registration.updated_at
-    )
+    return registration
 
 
 @router.put("/{registration_id}", response_model=MessageResponse)
 async def update_registration(
-    registration_id: str,
+    registration_id: EntityId,
     registration_update: RegistrationUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a registration"""
     
-    db_registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    db_registration = await db.get(Registration, registration_id, with_for_update=True)
     if not db_registration:
         raise HTTPException(status_code=404, detail="Registration not found")
     
+    old_status = db_registration.status
     update_data = registration_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_registration, field, value)
     
-    db.commit()
+    delta = WorkloadDelta()
+    delta.move(db_registration.teacher_id, old_status, db_registration.teacher_id, db_registration.status)
+    await apply_delta(db, delta)
+    await db.commit()
+    stats_cache.invalidate()
     
     return MessageResponse(message="Registration updated successfully", id=registration_id)
 
 
+@router.delete("/{registration_id}", response_model=MessageResponse)
+async def delete_registration(
+    registration_id: EntityId,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """Delete a registration (Admin only); change feed clients see it in `deleted`"""
+    
+    registration = await db.get(Registration, registration_id, with_for_update=True)
+    if not registration:
+        raise HTTPException(status_code=404, detail="Registration not found")
+    
+    delta = WorkloadDelta()
+    delta.add(registration.teacher_id, registration.status, -1)
+    # Sent emails stay on record without their registration
+    await db.execute(
+        update(Notification)
+        .where(Notification.registration_id == registration_id)
+        .values(registration_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.delete(registration)
+    await apply_delta(db, delta)
+    await db.commit()
+    stats_cache.invalidate()
+    
+    return MessageResponse(message="Registration deleted successfully", id=registration_id)
+
+
 @router.post("/{registration_id}/assign", response_model=MessageResponse)
 async def assign_teacher(
-    registration_id: str,
+    registration_id: EntityId,
     request: AssignTeacherRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Assign a teacher to a registration"""
     
-    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    registration = await db.get(Registration, registration_id, with_for_update=True)
     if not registration:
         raise HTTPException(status_code=404, detail="Registration not found")
     
-    teacher = db.query(Teacher).filter(Teacher.id == request.teacher_id).first()
+    teacher = await db.get(Teacher, request.teacher_id)
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     
+    delta = WorkloadDelta()
+    delta.move(registration.teacher_id, registration.status, request.teacher_id, RegistrationStatus.TEACHER_ASSIGNED)
     registration.teacher_id = request.teacher_id
     registration.status = RegistrationStatus.TEACHER_ASSIGNED
     
-    db.commit()
+    await apply_delta(db, delta)
+    await db.commit()
+    stats_cache.invalidate()
     
     return MessageResponse(
         message="Teacher assigned successfully",
@@ -194,26 +507,39 @@ async def assign_teacher(
 
 @router.post("/{registration_id}/send-link", response_model=MessageResponse)
 async def send_demo_link(
-    registration_id: str,
-    db: Session = Depends(get_db)
+    registration_id: EntityId,
+    request: Optional[SendDemoLinkRequest] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Send demo class link to parent"""
+    """Send demo class link to parent, optionally booking the demo at `scheduled_at`"""
     
-    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    registration = await db.get(
+        Registration, registration_id, options=[selectinload(Registration.teacher)], with_for_update=True
+    )
     if not registration:
         raise HTTPException(status_code=404, detail="Registration not found")
     
     if not registration.teacher:
         raise HTTPException(status_code=400, detail="No teacher assigned yet")
     
-    # Generate demo link (in production, this would be a real video conference link)
-    demo_link = f"https://meet.ashishpatelatelier.com/demo/{registration.id}"
+    scheduled_at = datetime.utcnow()
+    if request is not None and request.scheduled_at is not None:
+        scheduled_at = as_utc(request.scheduled_at)
+        conflict = await db.run_sync(schedule_conflict, registration.teacher_id, scheduled_at, registration.id)
+        if conflict:
+            raise HTTPException(status_code=409, detail=conflict)
+    
+    delta = WorkloadDelta()
+    delta.move(registration.teacher_id, registration.status, registration.teacher_id, RegistrationStatus.LINK_SENT)
+    demo_link = demo_link_for(registration.id)
     registration.demo_link = demo_link
     registration.status = RegistrationStatus.LINK_SENT
-    registration.demo_scheduled_at = datetime.utcnow()
+    registration.demo_scheduled_at = scheduled_at
     
-    # Send email with demo link
-    email_service.send_teacher_assignment_notification(
+    # Queue email with demo link; it is sent once this transaction commits
+    enqueue_teacher_assignment_notification(
+        db,
+        registration_id=registration.id,
         to_email=registration.email,
         student_name=registration.student_name,
         parent_name=registration.parent_name,
@@ -221,7 +547,9 @@ async def send_demo_link(
         demo_link=demo_link
     )
     
-    db.commit()
+    await apply_delta(db, delta)
+    await db.commit()
+    stats_cache.invalidate()
     
     return MessageResponse(
         message="Demo link sent successfully",
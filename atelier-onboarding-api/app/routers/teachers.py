@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-import uuid
-
-from ..database import get_db
-from ..models import Teacher
-from ..schemas import TeacherCreate, TeacherResponse, TeacherUpdate, MessageResponse
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ..config import settings
+from ..database import get_db, upsert
+from ..models import Registration, Teacher, TeacherAvailability, new_id
+from ..schemas import (
+    TeacherCreate, TeacherResponse, TeacherUpdate, MessageResponse,
+    TeacherAvailabilityPayload, FreeTeacher, FreeSlot, EntityId
+)
 from ..auth import require_admin
+from ..pagination import paginate, set_next_cursor
+from ..cache import availability_cache, stats_cache
+from ..http_cache import conditional
+from ..services.scheduling import (
+    AVAILABILITY_COLUMNS, as_utc, availability_payload, availability_rows, booked_demos, cached_index, demo_duration
+)
 
 router = APIRouter()
 
@@ -14,57 +26,169 @@ router = APIRouter()
 @router.post("", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
 async def create_teacher(
     teacher: TeacherCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_admin)
 ):
     """Create a new teacher (Admin only)"""
     
-    # Check if email already exists
-    existing = db.query(Teacher).filter(Teacher.email == teacher.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Teacher with this email already exists")
-    
-    db_teacher = Teacher(
-        id=str(uuid.uuid4()),
-        name=teacher.name,
-        email=teacher.email,
-        phone=teacher.phone,
-        specialization=teacher.specialization,
-        bio=teacher.bio,
-        experience_years=teacher.experience_years,
-        availability=teacher.availability
+    # The unique index on email decides; no SELECT beforehand and no refresh after
+    created = await db.execute(
+        upsert(Teacher)
+        .values(
+            id=new_id(),
+            name=teacher.name,
+            email=teacher.email,
+            phone=teacher.phone,
+            specialization=teacher.specialization,
+            bio=teacher.bio,
+            experience_years=teacher.experience_years,
+            availability=teacher.availability,
+            capacity=teacher.capacity
+        )
+        .on_conflict_do_nothing(index_elements=[Teacher.email])
+        .returning(Teacher.id)
     )
-    
-    db.add(db_teacher)
-    db.commit()
-    db.refresh(db_teacher)
+    teacher_id = created.scalar()
+    if teacher_id is None:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Teacher with this email already exists")
+    await db.commit()
     
     return MessageResponse(
         message="Teacher created successfully",
-        id=db_teacher.id
+        id=teacher_id
     )
 
 
-@router.get("", response_model=List[TeacherResponse])
+@router.get("", response_model=List[TeacherResponse], dependencies=[Depends(conditional("teachers"))])
 async def get_teachers(
+    response: Response,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    sort: str = Query("created", pattern="^(created|load|-load)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get all teachers, newest first (pass X-Next-Cursor back as `cursor` for the next page)
+
+    `sort=load` lists the least loaded teachers first (active_load = assigned
+    plus link sent) and `sort=-load` the busiest first; those orders page
+    with skip/limit only.
+    """
+    
+    if sort == "created":
+        teachers = (await db.scalars(paginate(select(Teacher), Teacher, cursor, skip, limit))).all()
+        set_next_cursor(response, teachers, limit)
+        return teachers
+    
+    if cursor:
+        raise HTTPException(status_code=400, detail="cursor is only supported with sort=created")
+    load = Teacher.active_load.desc() if sort == "-load" else Teacher.active_load.asc()
+    query = select(Teacher).order_by(load, Teacher.name, Teacher.id).offset(skip).limit(limit)
+    return (await db.scalars(query)).all()
+
+
+def check_search_window(start: datetime, end: datetime):
+    """start and end as UTC (either may be given naive or with an offset); 400 unless a sane window"""
+    start, end = as_utc(start), as_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=settings.SLOT_SEARCH_MAX_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search window is limited to {settings.SLOT_SEARCH_MAX_DAYS} days"
+        )
+    return start, end
+
+
+def free_over(db, start: datetime, end: datetime):
+    return cached_index(db).free(start, end, booked_demos(db, start, end))
+
+
+@router.get("/free", response_model=List[FreeTeacher])
+async def get_free_teachers(
+    start: datetime,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Teachers available for all of [start, end) with no demo booked in it (end defaults to one demo long)"""
+    
+    start, end = check_search_window(start, end or start + demo_duration())
+    teacher_ids = await db.run_sync(free_over, start, end)
+    if not teacher_ids:
+        return []
+    rows = await db.execute(
+        select(Teacher.id, Teacher.name).where(Teacher.id.in_(teacher_ids)).order_by(Teacher.name)
+    )
+    return [FreeTeacher(teacher_id=teacher_id, teacher_name=name) for teacher_id, name in rows]
+
+
+@router.get("/slots", response_model=List[FreeSlot])
+async def get_free_slots(
+    start: datetime,
+    end: datetime,
+    teacher_id: Optional[EntityId] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Demo slots (DEMO_DURATION_MINUTES long, on the DEMO_SLOT_MINUTES grid) with the teachers free for each"""
+    
+    start, end = check_search_window(start, end)
+    index, bookings = await db.run_sync(
+        lambda session: (cached_index(session), booked_demos(session, start, end, teacher_id=teacher_id))
+    )
+    # Hundreds of interval queries per search; keep them off the event loop
+    slots = await run_in_threadpool(
+        index.slots, start, end, bookings, None, None, {teacher_id} if teacher_id else None
+    )
+    return [FreeSlot(start=slot_start, end=slot_end, teacher_ids=ids) for slot_start, slot_end, ids in slots]
+
+
+@router.get("/{teacher_id}/availability", response_model=TeacherAvailabilityPayload)
+async def get_teacher_availability(
+    teacher_id: EntityId,
+    db: AsyncSession = Depends(get_db)
+):
+    """A teacher's weekly windows and dated exceptions (UTC)"""
+    
+    if not await db.scalar(select(Teacher.id).where(Teacher.id == teacher_id)):
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    rows = (await db.execute(
+        select(*AVAILABILITY_COLUMNS).where(TeacherAvailability.teacher_id == teacher_id)
+    )).all()
+    return availability_payload(rows)
+
+
+@router.put("/{teacher_id}/availability", response_model=MessageResponse)
+async def set_teacher_availability(
+    teacher_id: EntityId,
+    payload: TeacherAvailabilityPayload,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin)
 ):
-    """Get all teachers"""
+    """Replace a teacher's availability (Admin only)"""
     
-    teachers = db.query(Teacher).offset(skip).limit(limit).all()
-    return teachers
+    if not await db.scalar(select(Teacher.id).where(Teacher.id == teacher_id)):
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    
+    await db.execute(delete(TeacherAvailability).where(TeacherAvailability.teacher_id == teacher_id))
+    rows = availability_rows(teacher_id, payload.weekly, payload.exceptions)
+    if rows:
+        await db.execute(insert(TeacherAvailability), rows)
+    await db.commit()
+    availability_cache.invalidate()
+    
+    return MessageResponse(message="Teacher availability updated successfully", id=teacher_id)
 
 
-@router.get("/{teacher_id}", response_model=TeacherResponse)
+@router.get("/{teacher_id}", response_model=TeacherResponse, dependencies=[Depends(conditional("teachers"))])
 async def get_teacher(
-    teacher_id: str,
-    db: Session = Depends(get_db)
+    teacher_id: EntityId,
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific teacher by ID"""
     
-    teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    teacher = await db.get(Teacher, teacher_id)
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     
@@ -73,14 +197,14 @@ async def get_teacher(
 
 @router.put("/{teacher_id}", response_model=MessageResponse)
 async def update_teacher(
-    teacher_id: str,
+    teacher_id: EntityId,
     teacher_update: TeacherUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_admin)
 ):
     """Update a teacher (Admin only)"""
     
-    db_teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    db_teacher = await db.get(Teacher, teacher_id)
     if not db_teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     
@@ -88,24 +212,35 @@ async def update_teacher(
     for field, value in update_data.items():
         setattr(db_teacher, field, value)
     
-    db.commit()
+    await db.commit()
+    stats_cache.invalidate()
     
     return MessageResponse(message="Teacher updated successfully", id=teacher_id)
 
 
 @router.delete("/{teacher_id}", response_model=MessageResponse)
 async def delete_teacher(
-    teacher_id: str,
-    db: Session = Depends(get_db),
+    teacher_id: EntityId,
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_admin)
 ):
     """Delete a teacher (Admin only)"""
     
-    db_teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    db_teacher = await db.get(Teacher, teacher_id)
     if not db_teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     
-    db.delete(db_teacher)
-    db.commit()
+    # Detach the teacher's registrations in one UPDATE rather than loading
+    # them; the workload counters go with the teacher row
+    await db.execute(
+        update(Registration)
+        .where(Registration.teacher_id == teacher_id)
+        .values(teacher_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.delete(db_teacher)
+    await db.commit()
+    stats_cache.invalidate()
+    availability_cache.invalidate()
     
     return MessageResponse(message="Teacher deleted successfully", id=teacher_id)
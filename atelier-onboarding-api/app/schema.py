@@ -0,0 +1,39 @@
+"""
+Explicit schema creation for local databases.
+
+The application no longer creates tables when it is imported; deployed
+databases are managed with `alembic upgrade head`. For a throwaway local
+database (SQLite, benchmarks) the tables can be created directly:
+
+    python -m app.schema            # create missing tables
+    python -m app.schema --drop     # drop and recreate everything
+"""
+import argparse
+import logging
+
+from .database import Base, get_engine
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+
+logger = logging.getLogger(__name__)
+
+
+def create_schema(engine=None, drop: bool = False):
+    """Create all tables (optionally dropping them first) on engine or the app engine"""
+    engine = engine or get_engine()
+    if drop:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the database tables without Alembic")
+    parser.add_argument("--drop", action="store_true", help="drop existing tables first")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_schema(drop=args.drop)
+    logger.info(f"Schema created on {get_engine().url.render_as_string(hide_password=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List
-from datetime import datetime
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, validator, model_validator
+from typing import Annotated, Optional, List, Dict
+from datetime import datetime, date
 from enum import Enum
+import uuid
+
+
+def canonical_id(value: str) -> str:
+    return str(uuid.UUID(str(value)))
+
+
+# Ids from clients (path, query and body): malformed ones get a 422 instead of
+# reaching a uuid column, and any spelling uuid.UUID accepts is normalised
+EntityId = Annotated[str, AfterValidator(canonical_id)]
 
 
 class ExperienceLevelEnum(str, Enum):
@@ -68,6 +78,15 @@ class RegistrationResponse(BaseModel):
         from_attributes = True
 
 
+class RegistrationChanges(BaseModel):
+    changes: List[RegistrationResponse]
+    # IDs of registrations deleted since the token
+    deleted: List[str]
+    # Pass back as `since` for the next page or poll
+    next: str
+    has_more: bool
+
+
 class TeacherCreate(BaseModel):
     name: str = Field(..., min_length=2, max_length=100)
     email: EmailStr
@@ -76,6 +95,7 @@ class TeacherCreate(BaseModel):
     bio: Optional[str] = None
     experience_years: Optional[int] = None
     availability: Optional[str] = None
+    capacity: Optional[int] = Field(None, ge=0)
 
 
 class TeacherUpdate(BaseModel):
@@ -86,6 +106,7 @@ class TeacherUpdate(BaseModel):
     bio: Optional[str] = None
     experience_years: Optional[int] = None
     availability: Optional[str] = None
+    capacity: Optional[int] = Field(None, ge=0)
 
 
 class TeacherResponse(BaseModel):
@@ -97,6 +118,11 @@ class TeacherResponse(BaseModel):
     bio: Optional[str]
     experience_years: Optional[int]
     availability: Optional[str]
+    capacity: Optional[int] = None
+    assigned_count: int = 0
+    link_sent_count: int = 0
+    completed_count: int = 0
+    active_load: int = 0
     created_at: datetime
     
     class Config:
@@ -104,7 +130,95 @@ class TeacherResponse(BaseModel):
 
 
 class AssignTeacherRequest(BaseModel):
+    teacher_id: EntityId
+
+
+class SendDemoLinkRequest(BaseModel):
+    # When set, the slot is checked against the teacher's availability and other demos
+    scheduled_at: Optional[datetime] = None
+
+
+class WeeklyWindow(BaseModel):
+    weekday: int = Field(..., ge=0, le=6, description="0 = Monday")
+    start: str = Field(..., pattern=r"^([01]\d|2[0-3]):[0-5]\d$", description="HH:MM, UTC")
+    end: str = Field(..., pattern=r"^(([01]\d|2[0-3]):[0-5]\d|24:00)$", description="HH:MM, UTC (24:00 = midnight)")
+    
+    @property
+    def start_minute(self) -> int:
+        hours, minutes = self.start.split(":")
+        return int(hours) * 60 + int(minutes)
+    
+    @property
+    def end_minute(self) -> int:
+        hours, minutes = self.end.split(":")
+        return int(hours) * 60 + int(minutes)
+    
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.end_minute <= self.start_minute:
+            raise ValueError("end must be after start (split windows that cross midnight)")
+        return self
+
+
+class AvailabilityException(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+    # False blocks the time off, True adds hours outside the weekly windows
+    available: bool = False
+    
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.ends_at <= self.starts_at:
+            raise ValueError("ends_at must be after starts_at")
+        return self
+
+
+class TeacherAvailabilityPayload(BaseModel):
+    weekly: List[WeeklyWindow] = []
+    exceptions: List[AvailabilityException] = []
+
+
+class FreeTeacher(BaseModel):
+    teacher_id: str
+    teacher_name: str
+
+
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+    teacher_ids: List[str]
+
+
+class BulkRegistrationRequest(BaseModel):
+    registration_ids: List[EntityId] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkAssignTeacherRequest(AssignTeacherRequest, BulkRegistrationRequest):
+    pass
+
+
+class BulkItemResult(BaseModel):
+    id: str
+    success: bool
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkOperationResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class TeacherCount(BaseModel):
     teacher_id: str
+    teacher_name: Optional[str]
+    count: int
+
+
+class DailyCount(BaseModel):
+    day: date
+    count: int
 
 
 class StatsResponse(BaseModel):
@@ -112,6 +226,82 @@ class StatsResponse(BaseModel):
     pending_assignments: int
     teachers_assigned: int
     completed_demos: int
+    by_status: Dict[str, int] = {}
+    by_teacher: List[TeacherCount] = []
+    by_day: List[DailyCount] = []
+
+
+class PoolStatsResponse(BaseModel):
+    mode: str
+    checkouts: int
+    checked_out: int
+    peak_checked_out: int
+    open_connections: int
+    peak_open_connections: int
+    connects: int
+    closes: int
+    invalidations: int
+    pings: int
+    ping_failures: int
+    checkout_wait_avg_ms: float
+    checkout_wait_p50_ms: float
+    checkout_wait_p95_ms: float
+    checkout_wait_max_ms: float
+
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ImportResult(BaseModel):
+    total: int
+    imported: int
+    failed: int
+    errors: List[ImportRowError] = []
+
+
+class AutoAssignment(BaseModel):
+    registration_id: str
+    teacher_id: str
+    teacher_name: str
+    fit: int
+
+
+class TeacherLoad(BaseModel):
+    teacher_id: str
+    teacher_name: str
+    capacity: int
+    before: int
+    after: int
+
+
+class AutoAssignResponse(BaseModel):
+    dry_run: bool
+    considered: int
+    assigned: int
+    unassigned: int
+    average_fit: float
+    assignments: List[AutoAssignment] = []
+    teacher_loads: List[TeacherLoad] = []
+
+
+class WorkloadCounts(BaseModel):
+    assigned_count: int
+    link_sent_count: int
+    completed_count: int
+
+
+class WorkloadDrift(BaseModel):
+    teacher_id: str
+    stored: WorkloadCounts
+    counted: WorkloadCounts
+
+
+class ReconcileWorkloadResponse(BaseModel):
+    dry_run: bool
+    drifted: int
+    teachers: List[WorkloadDrift] = []
 
 
 class MessageResponse(BaseModel):
@@ -0,0 +1,46 @@
+"""
+Registration search predicates and ranking.
+
+On Postgres the ILIKE predicates are served by the pg_trgm GIN indexes on
+student_name, parent_name and email (see models.Registration), and ranking
+adds trigram similarity. Other backends (SQLite test databases) get the same
+predicates as plain scans and a prefix-only ranking.
+"""
+from sqlalchemy import case, func, or_
+
+from .models import Registration
+
+SEARCH_COLUMNS = (Registration.student_name, Registration.parent_name, Registration.email)
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_filter(term: str):
+    """Substring match on any search column (the existing `search` semantics)"""
+    pattern = f"%{escape_like(term)}%"
+    return or_(*(column.ilike(pattern, escape="\\") for column in SEARCH_COLUMNS))
+
+
+def prefix_filter(term: str):
+    """Type-ahead match: a column, or any word in it, starts with term"""
+    escaped = escape_like(term)
+    return or_(*(
+        or_(column.ilike(f"{escaped}%", escape="\\"), column.ilike(f"% {escaped}%", escape="\\"))
+        for column in SEARCH_COLUMNS
+    ))
+
+
+def search_rank(term: str, backend: str):
+    """Relevance score: whole-value prefix hits first (student > parent > email), then similarity"""
+    prefix = f"{escape_like(term)}%"
+    rank = case(
+        (Registration.student_name.ilike(prefix, escape="\\"), 3),
+        (Registration.parent_name.ilike(prefix, escape="\\"), 2),
+        (Registration.email.ilike(prefix, escape="\\"), 1),
+        else_=0
+    )
+    if backend == "postgresql":
+        rank = rank + func.greatest(*(func.similarity(column, term) for column in SEARCH_COLUMNS))
+    return rank
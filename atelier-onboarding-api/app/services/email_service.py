@@ -1,12 +1,144 @@
+import base64
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from email.header import Header
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 from ..config import settings
+from ..instrumentation import span
+from .email_templates import REGISTRATION_CONFIRMATION, TEACHER_ASSIGNMENT
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# (to_email, subject, html_body, text_body)
+EmailMessage = Tuple[str, str, str, Optional[str]]
+
+# Errors that concern one message; the connection itself is still usable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+# The same boundary for every message: both parts are base64, and a base64
+# line can never start with "--", so no body can contain the delimiter
+BOUNDARY = "==atelier-alternative=="
+
+
+@lru_cache(maxsize=1024)
+def encode_header(value: str) -> bytes:
+    """A header value as wire bytes (RFC 2047 encoded if not ASCII); subjects repeat, so results are cached"""
+    if "\r" in value or "\n" in value:
+        raise ValueError(f"Line break in email header value: {value!r}")
+    if value.isascii():
+        return value.encode("ascii")
+    return Header(value, "utf-8").encode(linesep="\r\n").encode("ascii")
+
+
+def encode_body(body: str) -> bytes:
+    return base64.encodebytes(body.encode("utf-8")).replace(b"\n", b"\r\n")
+
+
+class MessageSkeleton:
+    """
+    A multipart/alternative message whose static bytes are encoded once.
+
+    The MIME headers, From, the boundary lines and the part headers are the
+    same for every message, so they are prebuilt; building a message only
+    adds To, the (cached) Subject and the base64 bodies.
+    """
+
+    def __init__(self, from_email: str):
+        self._head = (
+            f'Content-Type: multipart/alternative; boundary="{BOUNDARY}"\r\n'
+            "MIME-Version: 1.0\r\n"
+        ).encode("ascii") + b"From: " + encode_header(from_email) + b"\r\n"
+        self._text_part = self._part_header("text/plain")
+        self._html_part = self._part_header("text/html")
+        self._end = f"--{BOUNDARY}--\r\n".encode("ascii")
+
+    @staticmethod
+    def _part_header(content_type: str) -> bytes:
+        return (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Type: {content_type}; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: base64\r\n\r\n"
+        ).encode("ascii")
+
+    def build(self, to_email: str, subject: str, html_body: str, text_body: Optional[str] = None) -> bytes:
+        parts = [self._head, b"Subject: ", encode_header(subject), b"\r\nTo: ", encode_header(to_email), b"\r\n\r\n"]
+        if text_body:
+            parts += [self._text_part, encode_body(text_body)]
+        parts += [self._html_part, encode_body(html_body), self._end]
+        return b"".join(parts)
+
+
+class SMTPConnectionPool:
+    """
+    Small pool of connected, authenticated SMTP sessions.
+
+    STARTTLS and AUTH happen once per connection instead of once per email,
+    and idle connections survive between warm Lambda invocations. Connections
+    idle longer than idle_timeout are closed, ones idle longer than
+    check_after are checked with NOOP before reuse, and broken ones are
+    discarded instead of being returned to the pool.
+    """
+
+    def __init__(self, connect, max_size: int, idle_timeout: float, check_after: float = 5.0, clock=time.monotonic):
+        self._connect = connect
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._check_after = check_after
+        self._clock = clock
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            
+            idle_for = self._clock() - last_used
+            if idle_for > self._idle_timeout or (idle_for > self._check_after and not self._is_alive(server)):
+                self.discard(server)
+                continue
+            self.reused += 1
+            return server
+        
+        server = self._connect()
+        self.created += 1
+        return server
+
+    def release(self, server):
+        with self._lock:
+            if len(self._idle) < self._max_size:
+                self._idle.append((server, self._clock()))
+                return
+        self.discard(server)
+
+    def discard(self, server):
+        self.discarded += 1
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self.discard(server)
+
+    @staticmethod
+    def _is_alive(server) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
 
 class EmailService:
     def __init__(self):
@@ -15,6 +147,93 @@ class EmailService:
         self.smtp_user = settings.SMTP_USER
         self.smtp_password = settings.SMTP_PASSWORD
         self.from_email = settings.FROM_EMAIL
+        self.use_tls = settings.SMTP_USE_TLS
+        self.skeleton = MessageSkeleton(self.from_email)
+        self.pool = SMTPConnectionPool(
+            self._connect,
+            max_size=settings.SMTP_POOL_SIZE,
+            idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS
+        )
+    
+    def _connect(self):
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.smtp_user:
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def build_message(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None
+    ) -> bytes:
+        """The message as it goes on the wire (see MessageSkeleton)"""
+        return self.skeleton.build(to_email, subject, html_body, text_body)
+    
+    @span("smtp")
+    def send_many(self, messages: Iterable[EmailMessage]) -> List[Optional[Exception]]:
+        """
+        Send a batch of messages down one pooled SMTP session.
+
+        Returns one entry per message: None if it was accepted, otherwise the
+        exception. A dropped connection is replaced once per message; if no
+        connection can be opened at all, the remaining messages fail with
+        that error.
+        """
+        messages = list(messages)
+        results = []
+        server = None
+        try:
+            for to_email, subject, html_body, text_body in messages:
+                try:
+                    msg = self.build_message(to_email, subject, html_body, text_body)
+                except ValueError as e:
+                    # A header that cannot be sent (line break); only this message fails
+                    results.append(e)
+                    continue
+                for attempt in (1, 2):
+                    if server is None:
+                        try:
+                            server = self.pool.acquire()
+                        except Exception as e:
+                            results.extend([e] * (len(messages) - len(results)))
+                            return results
+                    try:
+                        server.sendmail(self.from_email, [to_email], msg)
+                        results.append(None)
+                        break
+                    except MESSAGE_ERRORS as e:
+                        results.append(e)
+                        break
+                    except (smtplib.SMTPException, OSError) as e:
+                        # Connection-level failure: drop it and retry on a fresh one
+                        self.pool.discard(server)
+                        server = None
+                        if attempt == 2:
+                            results.append(e)
+        finally:
+            if server is not None:
+                self.pool.release(server)
+        return results
+    
+    def deliver(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None
+    ):
+        """Send one email, raising on failure (see send_email for the logging variant)"""
+        error = self.send_many([(to_email, subject, html_body, text_body)])[0]
+        if error is not None:
+            raise error
     
     def send_email(
         self,
@@ -24,23 +243,7 @@ class EmailService:
         text_body: Optional[str] = None
     ) -> bool:
         try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            
-            if text_body:
-                part1 = MIMEText(text_body, 'plain')
-                msg.attach(part1)
-            
-            part2 = MIMEText(html_body, 'html')
-            msg.attach(part2)
-            
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-            
+            self.deliver(to_email, subject, html_body, text_body)
             logger.info(f"Email sent successfully to {to_email}")
             return True
         
@@ -48,66 +251,38 @@ class EmailService:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def registration_confirmation_email(
+        self,
+        student_name: str,
+        parent_name: str
+    ) -> Tuple[str, str, str]:
+        """Subject, HTML and text bodies of the registration confirmation"""
+        return REGISTRATION_CONFIRMATION.render(student_name=student_name, parent_name=parent_name)
+    
     def send_registration_confirmation(
         self,
         to_email: str,
         student_name: str,
         parent_name: str
     ) -> bool:
-        subject = "Registration Confirmed - Ashish Patel Atelier"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #d63c35;">Thank You for Registering!</h2>
-                <p>Dear {parent_name},</p>
-                <p>Thank you for registering <strong>{student_name}</strong> for a demo class at Ashish Patel Atelier.</p>
-                <p>We have received your registration and our team will review it shortly. You will receive another email once we assign a teacher and schedule your demo class.</p>
-                <div style="background-color: #f0f9ff; padding: 15px; border-left: 4px solid #0ba5e9; margin: 20px 0;">
-                    <h3 style="margin-top: 0; color: #0ba5e9;">What Happens Next?</h3>
-                    <ol>
-                        <li>Our team will review your registration</li>
-                        <li>We'll assign the best teacher for your child</li>
-                        <li>You'll receive an email with teacher details and demo class link</li>
-                        <li>Join your free demo class and start the art journey!</li>
-                    </ol>
-                </div>
-                <p>If you have any questions, please don't hesitate to contact us.</p>
-                <p style="margin-top: 30px;">
-                    Best regards,<br>
-                    <strong>Ashish Patel Atelier Team</strong><br>
-                    <a href="https://ashishpatelatelier.com" style="color: #d63c35;">ashishpatelatelier.com</a>
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_body = f"""
-        Thank You for Registering!
-        
-        Dear {parent_name},
-        
-        Thank you for registering {student_name} for a demo class at Ashish Patel Atelier.
-        
-        We have received your registration and our team will review it shortly. You will receive another email once we assign a teacher and schedule your demo class.
-        
-        What Happens Next?
-        1. Our team will review your registration
-        2. We'll assign the best teacher for your child
-        3. You'll receive an email with teacher details and demo class link
-        4. Join your free demo class and start the art journey!
-        
-        If you have any questions, please don't hesitate to contact us.
-        
-        Best regards,
-        Ashish Patel Atelier Team
-        https://ashishpatelatelier.com
-        """
-        
+        subject, html_body, text_body = self.registration_confirmation_email(student_name, parent_name)
         return self.send_email(to_email, subject, html_body, text_body)
     
+    def teacher_assignment_email(
+        self,
+        student_name: str,
+        parent_name: str,
+        teacher_name: str,
+        demo_link: str
+    ) -> Tuple[str, str, str]:
+        """Subject, HTML and text bodies of the teacher assignment / demo link email"""
+        return TEACHER_ASSIGNMENT.render(
+            student_name=student_name,
+            parent_name=parent_name,
+            teacher_name=teacher_name,
+            demo_link=demo_link
+        )
+    
     def send_teacher_assignment_notification(
         self,
         to_email: str,
@@ -116,58 +291,9 @@ class EmailService:
         teacher_name: str,
         demo_link: str
     ) -> bool:
-        subject = "Teacher Assigned - Your Demo Class is Ready!"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #d63c35;">Your Demo Class is Ready!</h2>
-                <p>Dear {parent_name},</p>
-                <p>Great news! We have assigned a teacher for <strong>{student_name}</strong>'s demo class.</p>
-                <div style="background-color: #fef3f2; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <h3 style="margin-top: 0; color: #d63c35;">Teacher Details</h3>
-                    <p><strong>Teacher:</strong> {teacher_name}</p>
-                </div>
-                <div style="background-color: #ecfdf5; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <h3 style="margin-top: 0; color: #059669;">Join Your Demo Class</h3>
-                    <p>Click the button below to join your demo class:</p>
-                    <a href="{demo_link}" style="display: inline-block; padding: 12px 24px; background-color: #d63c35; color: white; text-decoration: none; border-radius: 6px; font-weight: bold; margin-top: 10px;">Join Demo Class</a>
-                    <p style="margin-top: 15px; font-size: 14px; color: #666;">
-                        Or copy this link: {demo_link}
-                    </p>
-                </div>
-                <p>We're excited to see {student_name} explore the world of Renaissance art!</p>
-                <p style="margin-top: 30px;">
-                    Best regards,<br>
-                    <strong>Ashish Patel Atelier Team</strong><br>
-                    <a href="https://ashishpatelatelier.com" style="color: #d63c35;">ashishpatelatelier.com</a>
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_body = f"""
-        Your Demo Class is Ready!
-        
-        Dear {parent_name},
-        
-        Great news! We have assigned a teacher for {student_name}'s demo class.
-        
-        Teacher Details:
-        Teacher: {teacher_name}
-        
-        Join Your Demo Class:
-        {demo_link}
-        
-        We're excited to see {student_name} explore the world of Renaissance art!
-        
-        Best regards,
-        Ashish Patel Atelier Team
-        https://ashishpatelatelier.com
-        """
-        
+        subject, html_body, text_body = self.teacher_assignment_email(
+            student_name, parent_name, teacher_name, demo_link
+        )
         return self.send_email(to_email, subject, html_body, text_body)
 
 
@@ -0,0 +1,76 @@
+"""
+Email templates compiled once at import.
+
+Each template file under app/templates/emails is parsed for `{{ field }}`
+placeholders once, when this module loads, so rendering a message only
+substitutes the personalised values into the pre-built static text. Values
+are HTML-escaped in .html templates and inserted as-is in .txt ones.
+"""
+import html
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Tuple
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "emails"
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class CompiledTemplate:
+    """
+    A template split once into static segments and placeholder slots.
+
+    Rendering copies the segment list, drops the (escaped) values into the
+    slots and joins, so the source is never re-parsed per message.
+    """
+
+    def __init__(self, source: str, escape: bool = False):
+        self._parts = PLACEHOLDER.split(source)
+        self._slots = [(i, self._parts[i]) for i in range(1, len(self._parts), 2)]
+        self.fields = frozenset(name for _, name in self._slots)
+        self._escape = escape
+
+    @classmethod
+    def from_file(cls, path: Path, escape: bool = False) -> "CompiledTemplate":
+        return cls(path.read_text(encoding="utf-8"), escape=escape)
+
+    def render(self, values: Dict[str, object]) -> str:
+        convert = html.escape if self._escape else str
+        converted = {name: convert(str(values[name])) for name in self.fields}
+        
+        parts = self._parts[:]
+        for i, name in self._slots:
+            parts[i] = converted[name]
+        return "".join(parts)
+
+
+class EmailTemplate:
+    """Subject plus compiled HTML and text bodies loaded from <name>.html / <name>.txt"""
+
+    def __init__(self, name: str, subject: str):
+        self.name = name
+        self.subject = subject
+        self.html = CompiledTemplate.from_file(TEMPLATE_DIR / f"{name}.html", escape=True)
+        self.text = CompiledTemplate.from_file(TEMPLATE_DIR / f"{name}.txt")
+
+    def render(self, **values) -> Tuple[str, str, str]:
+        """(subject, html_body, text_body) for one message"""
+        return self.subject, self.html.render(values), self.text.render(values)
+
+    def render_many(self, rows: Iterable[Dict[str, object]]) -> Iterator[Tuple[str, str, str]]:
+        """Render a batch of messages, one dict of field values per message"""
+        html_render = self.html.render
+        text_render = self.text.render
+        for values in rows:
+            yield self.subject, html_render(values), text_render(values)
+
+
+REGISTRATION_CONFIRMATION = EmailTemplate(
+    "registration_confirmation",
+    subject="Registration Confirmed - Ashish Patel Atelier"
+)
+
+TEACHER_ASSIGNMENT = EmailTemplate(
+    "teacher_assignment",
+    subject="Teacher Assigned - Your Demo Class is Ready!"
+)
@@ -0,0 +1,172 @@
+"""
+Idempotent registration creation for POST /api/registrations.
+
+Double submits from the form and retries through API Gateway must not create
+a second registration, nor queue a second confirmation email. Two guards
+settle repeats:
+
+- Idempotency-Key header: the SHA-256 of the key is the primary key of
+  idempotency_keys, stored with a hash of the request body and the response
+  that was sent. A repeat of the same request gets that response back; the
+  same key with a different body is refused with 422.
+- Natural key: registrations.dedup_key hashes the normalised email, student
+  name and UTC day under a unique index, so a form resubmitted without a key
+  is answered with the registration it already created.
+
+Only the key is looked up ahead of the write. The natural key is left to the
+unique index: the insert uses ON CONFLICT DO NOTHING, so a duplicate gets an
+empty RETURNING rather than an error, rolls back and replays the existing
+registration. A new registration costs its INSERT ... RETURNING and the
+confirmation email row, plus the key lookup and claim when a key is sent;
+the table version is bumped after the commit (app/versioning.py).
+
+Keys expire after IDEMPOTENCY_KEY_TTL_HOURS; purge them with
+
+    python -m app.services.idempotency --purge
+"""
+import argparse
+import hashlib
+import json
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+
+from ..config import settings
+from ..database import upsert
+from ..models import IdempotencyKey, Registration
+from .outbox import enqueue_registration_confirmation
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Set on responses that were replayed rather than created
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def natural_key(email: str, student_name: str, day: date) -> str:
+    """dedup_key for a registration: case and spacing differences do not count"""
+    return digest(email.strip().lower(), " ".join(student_name.split()).casefold(), day.isoformat())
+
+
+def fingerprint(payload: dict) -> str:
+    return digest(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str))
+
+
+def key_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def stored_response(db, key_hash: str, request_hash: str) -> Optional[Dict]:
+    """The response recorded under an unexpired key (sync Session); 422 if the key was used for another body"""
+    row = db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.response)
+        .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.created_at >= key_cutoff())
+    ).first()
+    if row is None:
+        return None
+    if row.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+    return row.response
+
+
+def registration_for(db, dedup_key: str) -> Optional[str]:
+    return db.scalar(select(Registration.id).where(Registration.dedup_key == dedup_key))
+
+
+def create_once(
+    db,
+    values: Dict,
+    payload: Dict,
+    idempotency_key: Optional[str],
+    respond: Callable[[str], Dict]
+) -> Tuple[Dict, bool]:
+    """
+    Insert the registration in `values` and queue its confirmation, unless
+    this is a repeat (sync Session; commits). Returns the response body and
+    whether it was replayed. respond(registration_id) builds the body.
+    """
+    key_hash = digest(idempotency_key) if idempotency_key else None
+    request_hash = fingerprint(payload)
+
+    if key_hash:
+        replay = stored_response(db, key_hash, request_hash)
+        if replay is not None:
+            return replay, True
+
+    inserted = db.execute(
+        upsert(Registration).values(values)
+        .on_conflict_do_nothing(index_elements=[Registration.dedup_key])
+        .returning(Registration.id)
+    ).first()
+    if inserted is None:
+        # The same submission was already made: answer with its registration
+        db.rollback()
+        return respond(registration_for(db, values["dedup_key"])), True
+
+    body = respond(values["id"])
+    if key_hash:
+        # Claimed after the insert, since the key row references the registration.
+        # An expired row under the same key is taken over; a live one means a
+        # concurrent duplicate, whose registration this rollback discards.
+        record = {"key_hash": key_hash, "request_hash": request_hash, "registration_id": values["id"], "response": body}
+        statement = upsert(IdempotencyKey).values(record)
+        claimed = db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[IdempotencyKey.key_hash],
+                set_={**record, "created_at": datetime.now(timezone.utc)},
+                where=IdempotencyKey.created_at < key_cutoff()
+            ).returning(IdempotencyKey.key_hash)
+        ).first()
+        if claimed is None:
+            db.rollback()
+            replay = stored_response(db, key_hash, request_hash)
+            if replay is None:
+                raise HTTPException(status_code=409, detail=f"A request with this {IDEMPOTENCY_HEADER} is in progress")
+            return replay, True
+
+    enqueue_registration_confirmation(
+        db,
+        registration_id=values["id"],
+        to_email=values["email"],
+        student_name=values["student_name"],
+        parent_name=values["parent_name"]
+    )
+    db.commit()
+    return body, False
+
+
+def purge_expired(db) -> int:
+    """Delete idempotency keys past their TTL (sync Session; commits)"""
+    deleted = db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < key_cutoff())).rowcount
+    db.commit()
+    return deleted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain registration idempotency keys")
+    parser.add_argument("--purge", action="store_true", help="delete keys older than IDEMPOTENCY_KEY_TTL_HOURS")
+    args = parser.parse_args(argv)
+    if not args.purge:
+        parser.print_help()
+        return
+
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        deleted = purge_expired(db)
+    finally:
+        db.close()
+    logger.info("Purged %d expired idempotency keys", deleted)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
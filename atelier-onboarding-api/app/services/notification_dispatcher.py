@@ -0,0 +1,132 @@
+"""
+Background dispatcher for the notification outbox.
+
+Claims due rows with SELECT ... FOR UPDATE SKIP LOCKED (so concurrent
+dispatchers never pick the same row), pushes their next_attempt_at forward
+by a lease, commits, and only then talks to SMTP. A dispatcher that dies
+mid-batch therefore just lets the lease expire and the rows are retried.
+Failures back off exponentially until NOTIFICATION_MAX_ATTEMPTS.
+
+Run as a CLI:
+    python -m app.services.notification_dispatcher            # drain once
+    python -m app.services.notification_dispatcher --loop     # poll forever
+
+or from Lambda (e.g. on a schedule) via lambda_function.notification_handler.
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Notification, NotificationStatus
+from .email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base, 2x base, 4x base, ... capped at one hour"""
+    return timedelta(seconds=min(settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 3600))
+
+
+def claim_batch(db, batch_size: int):
+    now = datetime.now(timezone.utc)
+    notifications = db.scalars(
+        select(Notification)
+        .where(
+            Notification.status == NotificationStatus.PENDING.value,
+            Notification.next_attempt_at <= now
+        )
+        .order_by(Notification.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    
+    lease_until = now + timedelta(seconds=settings.NOTIFICATION_LEASE_SECONDS)
+    for notification in notifications:
+        notification.next_attempt_at = lease_until
+    db.commit()
+    return notifications
+
+
+def send_batch(notifications) -> dict:
+    """Send claimed notifications over one SMTP session, updating their state in place (caller commits)"""
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    errors = email_service.send_many(
+        (n.recipient_email, n.subject, n.body, n.text_body) for n in notifications
+    )
+    for notification, error in zip(notifications, errors):
+        notification.attempts += 1
+        if error is None:
+            notification.status = NotificationStatus.SENT.value
+            notification.sent_at = datetime.now(timezone.utc)
+            notification.error_message = None
+            counts["sent"] += 1
+        elif notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            notification.status = NotificationStatus.FAILED.value
+            notification.error_message = str(error)
+            counts["failed"] += 1
+            logger.error(f"Giving up on notification {notification.id} to {notification.recipient_email}: {str(error)}")
+        else:
+            notification.next_attempt_at = datetime.now(timezone.utc) + retry_delay(notification.attempts)
+            notification.error_message = str(error)
+            counts["retried"] += 1
+            logger.warning(f"Notification {notification.id} failed (attempt {notification.attempts}): {str(error)}")
+    return counts
+
+
+def dispatch_pending(batch_size: int = None, time_budget: float = None) -> dict:
+    """Send due notifications batch by batch until none are left or the time budget runs out"""
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    deadline = time.monotonic() + time_budget if time_budget else None
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+    
+    db = SessionLocal()
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            notifications = claim_batch(db, batch_size)
+            if not notifications:
+                break
+            counts = send_batch(notifications)
+            db.commit()
+            for key, value in counts.items():
+                totals[key] += value
+    finally:
+        db.close()
+    
+    return totals
+
+
+def lambda_handler(event, context):
+    """Lambda entry point: drain the outbox, leaving a margin before the function timeout"""
+    time_budget = None
+    if context is not None:
+        time_budget = max(context.get_remaining_time_in_millis() / 1000.0 - 10, 1)
+    totals = dispatch_pending(time_budget=time_budget)
+    logger.info(f"Notification dispatch finished: {totals}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send pending notifications from the outbox")
+    parser.add_argument("--loop", action="store_true", help="keep polling instead of draining once")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds to sleep when the outbox is empty")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        totals = dispatch_pending(batch_size=args.batch_size)
+        if any(totals.values()):
+            logger.info(f"Dispatched: {totals}")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Transactional email outbox.
+
+Request handlers add a Notification row in the same transaction as the
+change that triggers the email; services/notification_dispatcher.py sends
+the rows afterwards. Nothing here performs I/O, so it works with either
+session type yielded by database.get_db. Bodies are rendered from
+email_templates directly, so the API never imports the SMTP client.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from ..models import Notification, NotificationStatus, new_id
+from .email_templates import REGISTRATION_CONFIRMATION, TEACHER_ASSIGNMENT
+
+
+def enqueue_email(
+    db,
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: Optional[str] = None,
+    registration_id: Optional[str] = None
+) -> Notification:
+    notification = Notification(
+        id=new_id(),
+        registration_id=registration_id,
+        recipient_email=to_email,
+        subject=subject,
+        body=html_body,
+        text_body=text_body,
+        status=NotificationStatus.PENDING.value,
+        attempts=0,
+        next_attempt_at=datetime.now(timezone.utc)
+    )
+    db.add(notification)
+    return notification
+
+
+def enqueue_registration_confirmation(db, registration_id: str, to_email: str, student_name: str, parent_name: str):
+    subject, html_body, text_body = REGISTRATION_CONFIRMATION.render(student_name=student_name, parent_name=parent_name)
+    return enqueue_email(db, to_email, subject, html_body, text_body, registration_id=registration_id)
+
+
+def enqueue_teacher_assignment_notification(
+    db,
+    registration_id: str,
+    to_email: str,
+    student_name: str,
+    parent_name: str,
+    teacher_name: str,
+    demo_link: str
+):
+    subject, html_body, text_body = TEACHER_ASSIGNMENT.render(
+        student_name=student_name,
+        parent_name=parent_name,
+        teacher_name=teacher_name,
+        demo_link=demo_link
+    )
+    return enqueue_email(db, to_email, subject, html_body, text_body, registration_id=registration_id)
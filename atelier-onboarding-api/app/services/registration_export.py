@@ -0,0 +1,116 @@
+"""
+Streaming registration export as CSV or NDJSON.
+
+Rows are read through a server-side cursor (stream_results / yield_per) in
+batches of EXPORT_BATCH_SIZE and each batch is encoded and yielded on its
+own, optionally through a gzip stream, so memory stays flat however many
+rows match. The export opens its own connection rather than using the
+request session, since the body is still being produced after the handler
+returns.
+
+CSV output uses the columns of RegistrationResponse with `interests` joined
+by ";", the same layout the bulk import reads.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Iterator, Optional
+
+from ..config import settings
+from ..schemas import RegistrationResponse
+
+FORMATS = ("csv", "ndjson")
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+EXPORT_COLUMNS = tuple(RegistrationResponse.model_fields)
+
+
+def export_value(value):
+    """A column value as plain JSON data"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class ExportEncoder:
+    """Encodes batches of row mappings into bytes, gzip-compressed if requested"""
+
+    def __init__(self, fmt: str, compress: bool = False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        self.format = fmt
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(wbits=31) if compress else None
+        self._header_pending = fmt == "csv"
+
+    def encode(self, rows) -> bytes:
+        buffer = io.StringIO()
+        if self.format == "csv":
+            writer = csv.writer(buffer, lineterminator="\n")
+            if self._header_pending:
+                writer.writerow(EXPORT_COLUMNS)
+                self._header_pending = False
+            for row in rows:
+                writer.writerow([self._csv_value(row[column]) for column in EXPORT_COLUMNS])
+        else:
+            for row in rows:
+                buffer.write(json.dumps({column: export_value(row[column]) for column in EXPORT_COLUMNS}))
+                buffer.write("\n")
+
+        data = buffer.getvalue().encode()
+        return self._compressor.compress(data) if self._compressor else data
+
+    def finish(self) -> bytes:
+        # An empty CSV export still gets its header row
+        data = self.encode([]) if self._header_pending else b""
+        if self._compressor:
+            data += self._compressor.flush()
+        return data
+
+    @staticmethod
+    def _csv_value(value):
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return ";".join(value)
+        return export_value(value)
+
+
+def export_filename(fmt: str, compress: bool) -> str:
+    return f"registrations.{fmt}" + (".gz" if compress else "")
+
+
+def media_type(fmt: str, compress: bool) -> str:
+    return "application/gzip" if compress else MEDIA_TYPES[fmt]
+
+
+def iter_export(query, fmt: str, compress: bool = False, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    """Stream query through the sync engine (StreamingResponse iterates this in the threadpool)"""
+    from ..database import get_engine
+
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    encoder = ExportEncoder(fmt, compress)
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for rows in result.mappings().partitions():
+            yield encoder.encode(rows)
+    yield encoder.finish()
+
+
+async def aiter_export(query, fmt: str, compress: bool = False, batch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Stream query through the AsyncEngine"""
+    from ..database import get_async_engine
+
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    encoder = ExportEncoder(fmt, compress)
+    async with get_async_engine().connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.mappings().partitions():
+            yield encoder.encode(rows)
+    yield encoder.finish()
@@ -0,0 +1,415 @@
+"""
+Bulk registration import from CSV or NDJSON.
+
+Records are parsed one at a time from a stream of lines, validated with
+RegistrationCreate in chunks of IMPORT_CHUNK_SIZE, and each chunk is written
+in its own transaction together with its confirmation emails, which are
+queued in the notification outbox rather than sent inline. With psycopg2 on
+Postgres both tables are loaded with COPY; other drivers get multi-row
+INSERTs. Rows that fail validation, or that the database rejects, are
+reported by row number and the rest of the import carries on.
+
+CSV files need a header row naming RegistrationCreate fields; `interests`
+is a ";"-separated list and empty cells count as missing. NDJSON files hold
+one JSON object per line.
+
+Over HTTP: POST /api/registrations/import (admin only, body streamed).
+As a CLI:
+    python -m app.services.registration_import cohort.csv
+    python -m app.services.registration_import partners.ndjson --chunk-size 2000
+"""
+import argparse
+import codecs
+import csv
+import enum
+import io
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..config import settings
+from ..models import (
+    Registration, Notification, RegistrationStatus, NotificationStatus, ExperienceLevel, current_change_seq, new_id
+)
+from ..schemas import RegistrationCreate
+from ..versioning import mark_written
+from .email_templates import REGISTRATION_CONFIRMATION
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+REGISTRATION_COLUMNS = (
+    "id", "student_name", "student_age", "grade", "parent_name", "email", "phone", "preferred_time",
+    "experience_level", "interests", "additional_notes", "status"
+)
+
+NOTIFICATION_COLUMNS = (
+    "id", "registration_id", "recipient_email", "subject", "body", "text_body", "status",
+    "attempts", "next_attempt_at"
+)
+
+
+def format_for(filename: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    """Import format implied by a file extension or Content-Type header, if any"""
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in ("csv", "ndjson", "jsonl"):
+            return "csv" if extension == "csv" else "ndjson"
+    if content_type:
+        return CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+class RecordParser:
+    """
+    Turns lines of text into raw records, one line at a time.
+
+    feed() returns (row_number, record, error) once a line completes a data
+    row, or None; exactly one of record and error is set. Row numbers count
+    data rows from 1, not counting the CSV header.
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.format = fmt
+        self.header = None
+        self.row_number = 0
+        self._pending = []
+
+    def feed(self, line: str):
+        if self.format == "ndjson":
+            return self._feed_ndjson(line)
+        return self._feed_csv(line)
+
+    def finish(self):
+        """Result for a CSV record left open at the end of the input, or None"""
+        if not self._pending:
+            return None
+        self._pending = []
+        self.row_number += 1
+        return self.row_number, None, "unterminated quoted field"
+
+    def _feed_ndjson(self, line: str):
+        if not line.strip():
+            return None
+        self.row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            return self.row_number, None, f"invalid JSON: {exc}"
+        if not isinstance(record, dict):
+            return self.row_number, None, "expected a JSON object"
+        return self.row_number, record, None
+
+    def _feed_csv(self, line: str):
+        if not self._pending and not line.strip():
+            return None
+        self._pending.append(line)
+        text = "".join(self._pending)
+        # An odd number of quotes means a quoted field continues on the next line
+        if text.count('"') % 2:
+            return None
+        self._pending = []
+
+        try:
+            fields = next(csv.reader([text.rstrip("\r\n")]))
+        except csv.Error as exc:
+            self.row_number += 1
+            return self.row_number, None, f"malformed CSV: {exc}"
+
+        if self.header is None:
+            self.header = [name.strip() for name in fields]
+            return None
+
+        self.row_number += 1
+        if len(fields) != len(self.header):
+            return self.row_number, None, f"expected {len(self.header)} fields, got {len(fields)}"
+        record = {name: value for name, value in zip(self.header, fields) if value != ""}
+        if "interests" in record:
+            record["interests"] = [item.strip() for item in record["interests"].split(";") if item.strip()]
+        return self.row_number, record, None
+
+
+class LineDecoder:
+    """Incrementally decodes UTF-8 bytes (optional BOM) into lines, keeping line endings"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+
+    def decode(self, chunk: bytes) -> List[str]:
+        lines = (self._buffer + self._decoder.decode(chunk)).splitlines(keepends=True)
+        # A "\r" at the end may be the first half of a "\r\n" split across chunks
+        self._buffer = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        return lines
+
+    def finish(self) -> List[str]:
+        rest = self._buffer + self._decoder.decode(b"", final=True)
+        self._buffer = ""
+        return rest.splitlines(keepends=True)
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = LineDecoder()
+    for chunk in chunks:
+        yield from decoder.decode(chunk)
+    yield from decoder.finish()
+
+
+def validation_messages(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+def validate_chunk(records) -> Tuple[List[Tuple[int, RegistrationCreate]], List[Dict]]:
+    """Split (row_number, record) pairs into validated registrations and per-row errors"""
+    valid, errors = [], []
+    for row_number, record in records:
+        try:
+            valid.append((row_number, RegistrationCreate.model_validate(record)))
+        except ValidationError as exc:
+            errors.append({"row": row_number, "errors": validation_messages(exc)})
+    return valid, errors
+
+
+def build_rows(registrations: List[RegistrationCreate]) -> Tuple[List[Dict], List[Dict]]:
+    """Registration and outbox Notification column values for a validated chunk"""
+    registration_rows = [
+        {
+            "id": new_id(),
+            "student_name": registration.student_name,
+            "student_age": registration.student_age,
+            "grade": registration.grade,
+            "parent_name": registration.parent_name,
+            "email": registration.email,
+            "phone": registration.phone,
+            "preferred_time": registration.preferred_time,
+            "experience_level": ExperienceLevel(registration.experience_level.value) if registration.experience_level else None,
+            "interests": registration.interests,
+            "additional_notes": registration.additional_notes,
+            "status": RegistrationStatus.PENDING,
+        }
+        for registration in registrations
+    ]
+
+    now = datetime.now(timezone.utc)
+    rendered = REGISTRATION_CONFIRMATION.render_many(
+        {"student_name": row["student_name"], "parent_name": row["parent_name"]} for row in registration_rows
+    )
+    notification_rows = [
+        {
+            "id": new_id(),
+            "registration_id": row["id"],
+            "recipient_email": row["email"],
+            "subject": subject,
+            "body": html_body,
+            "text_body": text_body,
+            "status": NotificationStatus.PENDING.value,
+            "attempts": 0,
+            "next_attempt_at": now,
+        }
+        for row, (subject, html_body, text_body) in zip(registration_rows, rendered)
+    ]
+    return registration_rows, notification_rows
+
+
+def copy_literal(value) -> Optional[str]:
+    """A value as text for COPY ... (FORMAT csv); None becomes an unquoted empty field (NULL)"""
+    if value is None:
+        return None
+    if isinstance(value, list):
+        # Postgres array literal: {"a","b"} with quotes and backslashes escaped
+        return "{" + ",".join('"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"' for item in value) + "}"
+    if isinstance(value, enum.Enum):
+        # SQLAlchemy stores Enum columns by member name
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def copy_rows(cursor, table: str, columns, rows: List[Dict]):
+    buffer = io.StringIO()
+    for row in rows:
+        # Quote every value so empty strings stay distinct from NULL (an unquoted empty field)
+        fields = (copy_literal(row[column]) for column in columns)
+        buffer.write(",".join("" if text is None else '"' + text.replace('"', '""') + '"' for text in fields))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def supports_copy(db) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def insert_rows(db, registration_rows: List[Dict], notification_rows: List[Dict], use_copy: bool):
+    if use_copy:
+        # COPY bypasses the Session and column defaults: mark the table and stamp change_seq by hand
+        mark_written(db, Registration.__tablename__)
+        seq = db.scalar(select(current_change_seq()))
+        cursor = db.connection().connection.dbapi_connection.cursor()
+        try:
+            copy_rows(
+                cursor, Registration.__tablename__, REGISTRATION_COLUMNS + ("change_seq",),
+                [{**row, "change_seq": seq} for row in registration_rows]
+            )
+            copy_rows(cursor, Notification.__tablename__, NOTIFICATION_COLUMNS, notification_rows)
+        finally:
+            cursor.close()
+    else:
+        db.execute(insert(Registration), registration_rows)
+        db.execute(insert(Notification), notification_rows)
+
+
+def write_chunk(db, rows: List[Tuple[int, RegistrationCreate]]) -> List[Dict]:
+    """
+    Insert a validated chunk and its queued emails in one transaction.
+
+    Takes a sync Session (use AsyncSession/ThreadedSession.run_sync from a
+    handler). If the chunk as a whole is rejected, it is retried row by row
+    in savepoints so that only the offending rows are reported as errors.
+    """
+    if not rows:
+        return []
+
+    registration_rows, notification_rows = build_rows([registration for _, registration in rows])
+    use_copy = supports_copy(db)
+    try:
+        insert_rows(db, registration_rows, notification_rows, use_copy=use_copy)
+        db.commit()
+        return []
+    except Exception as exc:
+        # COPY raises psycopg2 errors directly, not wrapped by SQLAlchemy
+        if not (use_copy or isinstance(exc, SQLAlchemyError)):
+            raise
+        db.rollback()
+        logger.warning(f"Import chunk of {len(rows)} rows rejected, retrying row by row: {str(exc)}")
+
+    errors = []
+    for (row_number, _), registration_row, notification_row in zip(rows, registration_rows, notification_rows):
+        try:
+            with db.begin_nested():
+                insert_rows(db, [registration_row], [notification_row], use_copy=False)
+        except SQLAlchemyError as exc:
+            errors.append({"row": row_number, "errors": [str(getattr(exc, "orig", exc)).strip()]})
+    db.commit()
+    return errors
+
+
+class ImportRun:
+    """
+    Accumulates parsed records into chunks and tracks the import totals.
+
+    add() returns a full chunk of (row_number, record) pairs when one is
+    ready for process_chunk(); the caller decides how to run it (directly,
+    or via run_sync from an async handler).
+    """
+
+    def __init__(self, fmt: str, chunk_size: Optional[int] = None):
+        self.parser = RecordParser(fmt)
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.total = 0
+        self.imported = 0
+        self.errors = []
+        self._records = []
+
+    def add(self, line: str) -> Optional[List]:
+        return self._collect(self.parser.feed(line))
+
+    def finish(self) -> Optional[List]:
+        """The final, possibly partial, chunk"""
+        self._collect(self.parser.finish())
+        records, self._records = self._records, []
+        return records or None
+
+    def _collect(self, parsed) -> Optional[List]:
+        if parsed is None:
+            return None
+        row_number, record, error = parsed
+        self.total += 1
+        if error is not None:
+            self.errors.append({"row": row_number, "errors": [error]})
+        else:
+            self._records.append((row_number, record))
+        if len(self._records) >= self.chunk_size:
+            records, self._records = self._records, []
+            return records
+        return None
+
+    def process_chunk(self, db, records) -> None:
+        """Validate and write one chunk with a sync Session"""
+        valid, errors = validate_chunk(records)
+        rejected = write_chunk(db, valid)
+        self.imported += len(valid) - len(rejected)
+        self.errors.extend(errors + rejected)
+
+    def result(self) -> Dict:
+        errors = sorted(self.errors, key=lambda error: error["row"])
+        return {
+            "total": self.total,
+            "imported": self.imported,
+            "failed": len(errors),
+            "errors": errors,
+        }
+
+
+def import_lines(db, lines: Iterable[str], fmt: str, chunk_size: Optional[int] = None) -> Dict:
+    """Import every record in lines with a sync Session; returns the ImportResult fields"""
+    run = ImportRun(fmt, chunk_size)
+    for line in lines:
+        records = run.add(line)
+        if records:
+            run.process_chunk(db, records)
+    records = run.finish()
+    if records:
+        run.process_chunk(db, records)
+    return run.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import registrations from a CSV or NDJSON file")
+    parser.add_argument("path", help="file to import")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fmt = args.format or format_for(filename=args.path)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            result = import_lines(db, iter_lines(iter(lambda: f.read(64 * 1024), b"")), fmt, args.chunk_size)
+    finally:
+        db.close()
+
+    for error in result["errors"]:
+        logger.warning(f"Row {error['row']}: {'; '.join(error['errors'])}")
+    logger.info(f"Imported {result['imported']} of {result['total']} rows ({result['failed']} failed)")
+
+
+if __name__ == "__main__":
+    main()
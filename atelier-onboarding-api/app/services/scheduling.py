@@ -0,0 +1,328 @@
+"""
+Structured teacher availability and demo slot search.
+
+Availability lives in the teacher_availability table as recurring weekly
+windows (weekday plus start/end minute, UTC) and dated exceptions that
+either block time off or add extra hours. AvailabilityIndex keeps them in
+centered interval trees so "who is free over [start, end)" is answered with
+O(log n + k) stabbing queries instead of scanning every teacher:
+
+weekly     each teacher's windows merged on a two-week minute timeline, so a
+           window running past Sunday midnight is one interval
+extra      dated "available" exceptions, in epoch minutes
+blocked    dated "unavailable" exceptions, in epoch minutes
+
+A teacher is free over a window when one weekly window or one extra
+exception covers all of it, and no blocked exception or booked demo
+(registrations with link_sent status and a demo_scheduled_at) overlaps it.
+Bookings change constantly, so they are read fresh for every search; the
+rest of the index is cached per process (see cache.availability_cache).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from ..cache import availability_cache
+from ..config import settings
+from ..models import AvailabilityKind, Registration, RegistrationStatus, Teacher, TeacherAvailability, new_id
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+AVAILABILITY_COLUMNS = (
+    TeacherAvailability.teacher_id,
+    TeacherAvailability.kind,
+    TeacherAvailability.weekday,
+    TeacherAvailability.start_minute,
+    TeacherAvailability.end_minute,
+    TeacherAvailability.starts_at,
+    TeacherAvailability.ends_at,
+)
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over half-open (start, end, key) intervals.
+
+    Each node keeps the intervals that contain its center, sorted by start
+    and by end, so stabbing and overlap queries only walk one root-to-leaf
+    path plus the intervals they report.
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals: List[Tuple[int, int, object]]):
+        intervals = [interval for interval in intervals if interval[0] < interval[1]]
+        self.left = self.right = None
+        self.by_start = self.by_end = ()
+        if not intervals:
+            self.center = 0
+            return
+
+        # The median start: at least the interval it came from stays at this node
+        starts = sorted(interval[0] for interval in intervals)
+        self.center = starts[len(starts) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] <= self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def stab(self, point: int) -> Iterator[Tuple[int, int, object]]:
+        """Intervals with start <= point < end"""
+        node = self
+        while node is not None:
+            if point < node.center:
+                for interval in node.by_start:
+                    if interval[0] > point:
+                        break
+                    yield interval
+                node = node.left
+            else:
+                for interval in node.by_end:
+                    if interval[1] <= point:
+                        break
+                    yield interval
+                node = node.right
+
+    def overlapping(self, start: int, end: int) -> Iterator[Tuple[int, int, object]]:
+        """Intervals sharing at least one point with [start, end)"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if end <= node.center:
+                for interval in node.by_start:
+                    if interval[0] >= end:
+                        break
+                    yield interval
+                stack.append(node.left)
+            elif start > node.center:
+                for interval in node.by_end:
+                    if interval[1] <= start:
+                        break
+                    yield interval
+                stack.append(node.right)
+            else:
+                yield from node.by_start
+                stack.append(node.left)
+                stack.append(node.right)
+
+
+def merge_by_key(intervals: Iterable[Tuple[int, int, object]]) -> List[Tuple[int, int, object]]:
+    """Merge each key's touching or overlapping intervals"""
+    merged = []
+    for start, end, key in sorted(intervals, key=lambda interval: (str(interval[2]), interval[0])):
+        if merged and merged[-1][2] == key and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end), key)
+        else:
+            merged.append((start, end, key))
+    return merged
+
+
+def as_utc(value: datetime) -> datetime:
+    """Naive datetimes are taken to be UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def epoch_minute(value: datetime) -> int:
+    return int(as_utc(value).timestamp()) // 60
+
+
+def minute_of_week(value: datetime) -> int:
+    value = as_utc(value)
+    return value.weekday() * MINUTES_PER_DAY + value.hour * 60 + value.minute
+
+
+def demo_duration() -> timedelta:
+    return timedelta(minutes=settings.DEMO_DURATION_MINUTES)
+
+
+class AvailabilityIndex:
+    """Interval trees over teacher_availability rows (see module docstring)"""
+
+    def __init__(self, rows):
+        weekly, extra, blocked = [], [], []
+        for row in rows:
+            if row.kind == AvailabilityKind.WEEKLY.value:
+                start = row.weekday * MINUTES_PER_DAY + row.start_minute
+                end = row.weekday * MINUTES_PER_DAY + row.end_minute
+                # Two copies a week apart, so windows wrapping past Sunday merge into one
+                weekly.append((start, end, row.teacher_id))
+                weekly.append((start + MINUTES_PER_WEEK, end + MINUTES_PER_WEEK, row.teacher_id))
+            elif row.kind == AvailabilityKind.AVAILABLE.value:
+                extra.append((epoch_minute(row.starts_at), epoch_minute(row.ends_at), row.teacher_id))
+            else:
+                blocked.append((epoch_minute(row.starts_at), epoch_minute(row.ends_at), row.teacher_id))
+        self.weekly = IntervalTree(merge_by_key(weekly))
+        self.extra = IntervalTree(merge_by_key(extra))
+        self.blocked = IntervalTree(blocked)
+
+    def covering(self, start: datetime, end: datetime) -> Set[str]:
+        """Teachers whose availability covers all of [start, end) (ignoring time off and bookings)"""
+        length = epoch_minute(end) - epoch_minute(start)
+        if length <= 0:
+            return set()
+        covered = set()
+        if length <= MINUTES_PER_WEEK:
+            week_start = minute_of_week(start)
+            covered.update(key for _, stop, key in self.weekly.stab(week_start) if stop >= week_start + length)
+        first = epoch_minute(start)
+        covered.update(key for _, stop, key in self.extra.stab(first) if stop >= first + length)
+        return covered
+
+    def free(self, start: datetime, end: datetime, bookings: Optional[IntervalTree] = None) -> Set[str]:
+        """Teachers free for all of [start, end)"""
+        candidates = self.covering(start, end)
+        if not candidates:
+            return candidates
+        first, last = epoch_minute(start), epoch_minute(end)
+        candidates.difference_update(key for _, _, key in self.blocked.overlapping(first, last))
+        if bookings is not None:
+            candidates.difference_update(key for _, _, key in bookings.overlapping(first, last))
+        return candidates
+
+    def slots(
+        self,
+        start: datetime,
+        end: datetime,
+        bookings: Optional[IntervalTree] = None,
+        duration: Optional[timedelta] = None,
+        step: Optional[timedelta] = None,
+        teacher_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[datetime, datetime, List[str]]]:
+        """Slots of `duration` starting on the `step` grid within [start, end), with the teachers free for each"""
+        duration = duration or demo_duration()
+        step = step or timedelta(minutes=settings.DEMO_SLOT_MINUTES)
+        start = as_utc(start)
+        step_seconds = int(step.total_seconds())
+        offset = int(start.timestamp()) % step_seconds
+        slot = start + timedelta(seconds=(step_seconds - offset) % step_seconds)
+
+        found = []
+        while slot + duration <= as_utc(end):
+            free = self.free(slot, slot + duration, bookings)
+            if teacher_ids is not None:
+                free &= teacher_ids
+            if free:
+                found.append((slot, slot + duration, sorted(free)))
+            slot += step
+        return found
+
+
+def load_index(db) -> AvailabilityIndex:
+    """Build an AvailabilityIndex from every teacher_availability row (sync Session)"""
+    return AvailabilityIndex(db.execute(select(*AVAILABILITY_COLUMNS)).all())
+
+
+def cached_index(db) -> AvailabilityIndex:
+    """load_index, reused for AVAILABILITY_CACHE_TTL_SECONDS (sync Session)"""
+    index = availability_cache.get("index")
+    if index is None:
+        index = load_index(db)
+        availability_cache.set("index", index)
+    return index
+
+
+def booked_demos(db, start: datetime, end: datetime, teacher_id: Optional[str] = None,
+                 exclude_registration_id: Optional[str] = None) -> IntervalTree:
+    """Scheduled demos overlapping [start, end), as an IntervalTree keyed by teacher (sync Session)"""
+    duration = demo_duration()
+    query = select(Registration.teacher_id, Registration.demo_scheduled_at).where(
+        Registration.status == RegistrationStatus.LINK_SENT,
+        Registration.teacher_id.isnot(None),
+        Registration.demo_scheduled_at > as_utc(start) - duration,
+        Registration.demo_scheduled_at < as_utc(end)
+    )
+    if teacher_id is not None:
+        query = query.where(Registration.teacher_id == teacher_id)
+    if exclude_registration_id is not None:
+        query = query.where(Registration.id != exclude_registration_id)
+
+    bookings = []
+    for booked_teacher, scheduled_at in db.execute(query):
+        first = epoch_minute(scheduled_at)
+        bookings.append((first, first + settings.DEMO_DURATION_MINUTES, booked_teacher))
+    return IntervalTree(bookings)
+
+
+def schedule_conflict(db, teacher_id: str, scheduled_at: datetime, registration_id: str) -> Optional[str]:
+    """
+    Why teacher_id cannot take a demo at scheduled_at, or None (sync Session).
+
+    Locks the teacher row first (FOR UPDATE on Postgres) so two demos can't
+    be booked into the same slot concurrently; the caller's commit releases it.
+    Teachers with no structured availability only get the double-booking check.
+    """
+    db.execute(select(Teacher.id).where(Teacher.id == teacher_id).with_for_update())
+    start = as_utc(scheduled_at)
+    end = start + demo_duration()
+
+    rows = db.execute(
+        select(*AVAILABILITY_COLUMNS).where(TeacherAvailability.teacher_id == teacher_id)
+    ).all()
+    index = AvailabilityIndex(rows)
+    if rows and teacher_id not in index.free(start, end):
+        return "Teacher is not available at that time"
+
+    bookings = booked_demos(db, start, end, teacher_id=teacher_id, exclude_registration_id=registration_id)
+    if next(bookings.overlapping(epoch_minute(start), epoch_minute(end)), None) is not None:
+        return "Teacher already has a demo scheduled at that time"
+    return None
+
+
+def format_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def availability_payload(rows) -> Dict:
+    """teacher_availability rows back in the shape availability_rows accepts"""
+    weekly, exceptions = [], []
+    for row in rows:
+        if row.kind == AvailabilityKind.WEEKLY.value:
+            weekly.append({
+                "weekday": row.weekday,
+                "start": format_minute(row.start_minute),
+                "end": format_minute(row.end_minute),
+            })
+        else:
+            exceptions.append({
+                "starts_at": as_utc(row.starts_at),
+                "ends_at": as_utc(row.ends_at),
+                "available": row.kind == AvailabilityKind.AVAILABLE.value,
+            })
+    weekly.sort(key=lambda window: (window["weekday"], window["start"]))
+    exceptions.sort(key=lambda exception: exception["starts_at"])
+    return {"weekly": weekly, "exceptions": exceptions}
+
+
+def availability_rows(teacher_id: str, weekly, exceptions) -> List[Dict]:
+    """teacher_availability column values for an availability payload"""
+    rows = []
+    for window in weekly:
+        rows.append({
+            "id": new_id(),
+            "teacher_id": teacher_id,
+            "kind": AvailabilityKind.WEEKLY.value,
+            "weekday": window.weekday,
+            "start_minute": window.start_minute,
+            "end_minute": window.end_minute,
+        })
+    for exception in exceptions:
+        rows.append({
+            "id": new_id(),
+            "teacher_id": teacher_id,
+            "kind": (AvailabilityKind.AVAILABLE if exception.available else AvailabilityKind.UNAVAILABLE).value,
+            "starts_at": as_utc(exception.starts_at),
+            "ends_at": as_utc(exception.ends_at),
+        })
+    return rows
@@ -0,0 +1,433 @@
+"""
+Automatic teacher assignment for the PENDING backlog.
+
+Every pending registration is matched to a teacher in one optimisation run
+rather than greedily row by row. The batch is solved as a min-cost flow:
+
+    source -> registration profile -> teacher profile -> teacher load band -> sink
+
+A profile is the set of fields the fit score looks at, so thousands of
+registrations collapse into a few hundred profiles and teachers with the
+same specialization/availability/experience share a node; every unit of
+flow is one student. The profile -> profile arc costs MAX_FIT - fit. Each
+teacher's remaining capacity is split into bands of ASSIGNMENT_LOAD_BAND
+students whose cost rises by ASSIGNMENT_LOAD_WEIGHT per band of load the
+teacher already carries, which makes the load cost convex: filling an idle
+teacher is cheaper than piling onto a busy one, and a teacher is never
+given more than their capacity. Registrations that cannot be placed
+(capacity exhausted) take an expensive direct arc to the sink and stay
+pending; within a profile the oldest registrations are placed first.
+
+Fit (0-100) combines:
+    interests vs specialization   50 if any interest appears in the specialization
+    preferred_time vs availability 30 if they share a time slot (morning, weekend, ...)
+    experience_level vs years      up to 20, scaled by teacher experience for
+                                   intermediate/advanced students
+
+Run as a CLI:
+    python -m app.services.teacher_matching --dry-run
+    python -m app.services.teacher_matching --limit 500
+
+or through POST /api/admin/auto-assign.
+"""
+import argparse
+import heapq
+import json
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import select, update
+
+from ..config import settings
+from ..models import Registration, Teacher, RegistrationStatus, ExperienceLevel
+from .workload import WorkloadDelta
+
+logger = logging.getLogger(__name__)
+
+MAX_FIT = 100
+INTEREST_FIT = 50
+TIME_FIT = 30
+EXPERIENCE_FIT = 20
+
+TIME_SLOTS = ("morning", "afternoon", "evening", "weekend", "weekday")
+WORD = re.compile(r"[a-z]+")
+
+
+def time_slots(text: Optional[str]) -> frozenset:
+    """Named time slots mentioned in a free-text time preference or availability"""
+    if not text:
+        return frozenset()
+    words = set(WORD.findall(text.lower()))
+    slots = {slot for slot in TIME_SLOTS if slot in words or slot + "s" in words}
+    if words & {"mon", "tue", "wed", "thu", "fri", "monday", "friday"}:
+        slots.add("weekday")
+    if words & {"sat", "sun", "saturday", "sunday"}:
+        slots.add("weekend")
+    return frozenset(slots)
+
+
+def registration_profile(registration) -> tuple:
+    """The registration fields the fit score depends on, normalised"""
+    interests = frozenset(i.strip().lower() for i in (registration.interests or []) if i and i.strip())
+    level = registration.experience_level
+    return interests, time_slots(registration.preferred_time), level.value if level is not None else None
+
+
+def teacher_profile(teacher) -> tuple:
+    specialization = (teacher.specialization or "").strip().lower()
+    return specialization, time_slots(teacher.availability), min(teacher.experience_years or 0, 10)
+
+
+def fit_score(registration_key: tuple, teacher_key: tuple) -> int:
+    interests, preferred_slots, level = registration_key
+    specialization, available_slots, years = teacher_key
+
+    score = 0
+    if specialization and any(i in specialization or specialization in i for i in interests):
+        score += INTEREST_FIT
+    if preferred_slots & available_slots:
+        score += TIME_FIT
+    if level == ExperienceLevel.ADVANCED.value:
+        score += EXPERIENCE_FIT * years // 10
+    elif level == ExperienceLevel.INTERMEDIATE.value:
+        score += EXPERIENCE_FIT * years // 20
+    return score
+
+
+class MinCostFlow:
+    """
+    Primal-dual min-cost flow (all arc costs must be >= 0).
+
+    Each phase runs Dijkstra on reduced costs to update the node potentials,
+    then pushes a blocking flow (Dinic) through the arcs whose reduced cost
+    is zero, so there is one Dijkstra per distinct path cost rather than per
+    augmenting path.
+    """
+
+    def __init__(self, nodes: int):
+        self.graph = [[] for _ in range(nodes)]
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+    def add_arc(self, u: int, v: int, capacity: int, cost: int) -> int:
+        """Add u -> v and its residual twin; returns the arc index (flow = initial cap - cap)"""
+        arc = len(self.to)
+        self.graph[u].append(arc)
+        self.to.append(v)
+        self.cap.append(capacity)
+        self.cost.append(cost)
+        self.graph[v].append(arc + 1)
+        self.to.append(u)
+        self.cap.append(0)
+        self.cost.append(-cost)
+        return arc
+
+    def flow(self, source: int, sink: int, max_flow: int) -> int:
+        nodes = len(self.graph)
+        self.potential = [0] * nodes
+        total = 0
+        while total < max_flow and self._update_potentials(source, sink):
+            total += self._blocking_flow(source, sink, max_flow - total)
+        return total
+
+    def _update_potentials(self, source: int, sink: int) -> bool:
+        graph, to, cap, cost, potential = self.graph, self.to, self.cap, self.cost, self.potential
+        dist = [None] * len(graph)
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == sink:
+                break
+            pu = potential[u]
+            for arc in graph[u]:
+                if cap[arc] > 0:
+                    v = to[arc]
+                    nd = d + cost[arc] + pu - potential[v]
+                    if dist[v] is None or nd < dist[v]:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+        reach = dist[sink]
+        if reach is None:
+            return False
+        # Capping at the sink distance keeps every residual reduced cost >= 0
+        for v in range(len(graph)):
+            d = dist[v]
+            potential[v] += reach if d is None or d > reach else d
+        return True
+
+    def _blocking_flow(self, source: int, sink: int, limit: int) -> int:
+        graph, to, cap, cost, potential = self.graph, self.to, self.cap, self.cost, self.potential
+
+        def admissible(arc, u):
+            return cap[arc] > 0 and cost[arc] + potential[u] - potential[to[arc]] == 0
+
+        total = 0
+        while total < limit:
+            # BFS levels over zero reduced cost arcs, so the DFS below never cycles
+            level = [-1] * len(graph)
+            level[source] = 0
+            frontier = [source]
+            while frontier and level[sink] < 0:
+                following = []
+                for u in frontier:
+                    for arc in graph[u]:
+                        v = to[arc]
+                        if level[v] < 0 and admissible(arc, u):
+                            level[v] = level[u] + 1
+                            following.append(v)
+                frontier = following
+            if level[sink] < 0:
+                break
+
+            position = [0] * len(graph)
+
+            def push(u, amount):
+                if u == sink:
+                    return amount
+                arcs = graph[u]
+                while position[u] < len(arcs):
+                    arc = arcs[position[u]]
+                    v = to[arc]
+                    if level[v] == level[u] + 1 and admissible(arc, u):
+                        pushed = push(v, min(amount, cap[arc]))
+                        if pushed:
+                            cap[arc] -= pushed
+                            cap[arc ^ 1] += pushed
+                            return pushed
+                    position[u] += 1
+                return 0
+
+            while total < limit:
+                pushed = push(source, limit - total)
+                if not pushed:
+                    break
+                total += pushed
+        return total
+
+
+def solve(registrations, teachers, loads: Dict[str, int]) -> Dict[str, tuple]:
+    """
+    Optimal assignment of registrations to teachers.
+
+    `registrations` need id, interests, preferred_time, experience_level
+    (oldest first); `teachers` need id, specialization, availability,
+    experience_years and capacity. Returns {registration_id: (teacher_id, fit)}
+    for the registrations that could be placed.
+    """
+    load_band = max(settings.ASSIGNMENT_LOAD_BAND, 1)
+    load_weight = settings.ASSIGNMENT_LOAD_WEIGHT
+
+    by_profile = defaultdict(list)
+    for registration in registrations:
+        by_profile[registration_profile(registration)].append(registration.id)
+    reg_keys = list(by_profile)
+    counts = [len(by_profile[key]) for key in reg_keys]
+
+    teacher_groups = defaultdict(list)
+    for teacher in teachers:
+        capacity = teacher.capacity if teacher.capacity is not None else settings.ASSIGNMENT_DEFAULT_CAPACITY
+        if capacity - loads.get(teacher.id, 0) > 0:
+            teacher_groups[teacher_profile(teacher)].append((teacher.id, capacity))
+    teacher_keys = list(teacher_groups)
+
+    source = 0
+    first_reg = 1
+    first_group = first_reg + len(reg_keys)
+    first_teacher = first_group + len(teacher_keys)
+    teacher_nodes = [tid for key in teacher_keys for tid, _ in teacher_groups[key]]
+    sink = first_teacher + len(teacher_nodes)
+
+    mcf = MinCostFlow(sink + 1)
+    # Dearer than any real path, so the flow places as many students as capacity allows
+    unplaced_cost = MAX_FIT + load_weight * (max(
+        [capacity for group in teacher_groups.values() for _, capacity in group] or [0]
+    ) // load_band + 1) + 1
+
+    for r, count in enumerate(counts):
+        mcf.add_arc(source, first_reg + r, count, 0)
+        mcf.add_arc(first_reg + r, sink, count, unplaced_cost)
+
+    profile_arcs = {}
+    for r, reg_key in enumerate(reg_keys):
+        for g, teacher_key in enumerate(teacher_keys):
+            profile_arcs[r, g] = mcf.add_arc(
+                first_reg + r, first_group + g, counts[r], MAX_FIT - fit_score(reg_key, teacher_key)
+            )
+
+    band_arcs = defaultdict(list)
+    node = first_teacher
+    for g, teacher_key in enumerate(teacher_keys):
+        for teacher_id, capacity in teacher_groups[teacher_key]:
+            mcf.add_arc(first_group + g, node, capacity, 0)
+            load = loads.get(teacher_id, 0)
+            while load < capacity:
+                band_end = min((load // load_band + 1) * load_band, capacity)
+                arc = mcf.add_arc(node, sink, band_end - load, load_weight * (load // load_band))
+                band_arcs[teacher_id].append((arc, band_end - load))
+                load = band_end
+            node += 1
+
+    mcf.flow(source, sink, len(registrations))
+
+    placed = {}
+    for g, teacher_key in enumerate(teacher_keys):
+        # Units each teacher in the group received; every teacher in a group fits every
+        # registration profile equally well, so units can be handed out in any order
+        slots = []
+        for teacher_id, _ in teacher_groups[teacher_key]:
+            received = sum(capacity - mcf.cap[arc] for arc, capacity in band_arcs[teacher_id])
+            slots.extend([teacher_id] * received)
+        for r, reg_key in enumerate(reg_keys):
+            arc = profile_arcs[r, g]
+            units = counts[r] - mcf.cap[arc]
+            fit = fit_score(reg_key, teacher_key)
+            queue = by_profile[reg_key]
+            for registration_id in queue[:units]:
+                placed[registration_id] = (slots.pop(), fit)
+            del queue[:units]
+    return placed
+
+
+def current_loads(db) -> Dict[str, int]:
+    """Active (assigned or link sent) registrations per teacher, from the workload counters"""
+    rows = db.execute(select(Teacher.id, Teacher.active_load).where(Teacher.active_load > 0))
+    return {teacher_id: count for teacher_id, count in rows}
+
+
+def load_backlog(db, dry_run: bool = False, limit: Optional[int] = None):
+    """
+    Pending registrations (oldest first, at most `limit`), teachers and current loads.
+
+    Unless dry_run, the pending rows are locked (FOR UPDATE SKIP LOCKED on
+    Postgres) until save_assignments commits, so concurrent runs never
+    assign the same registration twice.
+    """
+    query = (
+        select(
+            Registration.id,
+            Registration.interests,
+            Registration.preferred_time,
+            Registration.experience_level
+        )
+        .where(Registration.status == RegistrationStatus.PENDING)
+        .order_by(Registration.created_at, Registration.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    if not dry_run:
+        query = query.with_for_update(skip_locked=True)
+    registrations = db.execute(query).all()
+
+    teachers = db.execute(
+        select(
+            Teacher.id,
+            Teacher.name,
+            Teacher.specialization,
+            Teacher.availability,
+            Teacher.experience_years,
+            Teacher.capacity
+        )
+    ).all()
+    return registrations, teachers, current_loads(db)
+
+
+def save_assignments(db, placed: Dict[str, tuple]):
+    """Write the assignments with one UPDATE per teacher, bump the workload counters and commit"""
+    by_teacher = defaultdict(list)
+    for registration_id, (teacher_id, _) in placed.items():
+        by_teacher[teacher_id].append(registration_id)
+
+    for teacher_id, registration_ids in by_teacher.items():
+        db.execute(
+            update(Registration)
+            .where(Registration.id.in_(registration_ids))
+            .values(teacher_id=teacher_id, status=RegistrationStatus.TEACHER_ASSIGNED)
+            .execution_options(synchronize_session=False)
+        )
+    if placed:
+        # Every placed registration was pending, so only the new teacher's counter moves
+        delta = WorkloadDelta()
+        for teacher_id, _ in placed.values():
+            delta.add(teacher_id, RegistrationStatus.TEACHER_ASSIGNED)
+        db.execute(delta.statement())
+    db.commit()
+
+
+def summarize(registrations, teachers, loads, placed, dry_run: bool) -> Dict:
+    """AutoAssignResponse fields for a solved run"""
+    added = defaultdict(int)
+    for teacher_id, _ in placed.values():
+        added[teacher_id] += 1
+
+    teacher_names = {teacher.id: teacher.name for teacher in teachers}
+    return {
+        "dry_run": dry_run,
+        "considered": len(registrations),
+        "assigned": len(placed),
+        "unassigned": len(registrations) - len(placed),
+        "average_fit": round(sum(fit for _, fit in placed.values()) / len(placed), 1) if placed else 0.0,
+        "assignments": [
+            {
+                "registration_id": registration_id,
+                "teacher_id": teacher_id,
+                "teacher_name": teacher_names[teacher_id],
+                "fit": fit
+            }
+            for registration_id, (teacher_id, fit) in placed.items()
+        ],
+        "teacher_loads": [
+            {
+                "teacher_id": teacher.id,
+                "teacher_name": teacher.name,
+                "capacity": teacher.capacity if teacher.capacity is not None else settings.ASSIGNMENT_DEFAULT_CAPACITY,
+                "before": loads.get(teacher.id, 0),
+                "after": loads.get(teacher.id, 0) + added[teacher.id]
+            }
+            for teacher in teachers
+        ]
+    }
+
+
+def auto_assign(db, dry_run: bool = False, limit: Optional[int] = None) -> Dict:
+    """Load, solve and (unless dry_run) save one run with a sync Session"""
+    registrations, teachers, loads = load_backlog(db, dry_run, limit)
+    placed = solve(registrations, teachers, loads)
+    if dry_run:
+        db.rollback()
+    else:
+        save_assignments(db, placed)
+    return summarize(registrations, teachers, loads, placed, dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign teachers to pending registrations")
+    parser.add_argument("--dry-run", action="store_true", help="compute the assignment without saving it")
+    parser.add_argument("--limit", type=int, default=None, help="only the oldest N pending registrations")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = auto_assign(db, dry_run=args.dry_run, limit=args.limit)
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(result))
+    logger.info(
+        f"{'Would assign' if args.dry_run else 'Assigned'} {result['assigned']} of {result['considered']} "
+        f"pending registrations (average fit {result['average_fit']}, {result['unassigned']} left pending)"
+    )
+
+
+if __name__ == "__main__":
+    main()
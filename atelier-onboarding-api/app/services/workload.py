@@ -0,0 +1,155 @@
+"""
+Denormalised per-teacher workload counters.
+
+teachers.assigned_count, link_sent_count and completed_count hold how many
+registrations each teacher has in that status, so load can be read (and
+sorted on) without a GROUP BY over registrations. Every write that moves a
+registration between teachers or statuses records the move in a
+WorkloadDelta and applies it in the same transaction, as one UPDATE of
+teachers however many registrations moved.
+
+The counters are a cache of registrations: reconcile() rebuilds them from
+source and reports drift, e.g. after manual SQL edits.
+
+    python -m app.services.workload --check
+    python -m app.services.workload
+
+or through POST /api/admin/workload/reconcile.
+"""
+import argparse
+import json
+import logging
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, select, update
+
+from ..models import Registration, RegistrationStatus, Teacher
+
+logger = logging.getLogger(__name__)
+
+# Registration status -> Teacher counter column
+COUNTERS = {
+    RegistrationStatus.TEACHER_ASSIGNED: "assigned_count",
+    RegistrationStatus.LINK_SENT: "link_sent_count",
+    RegistrationStatus.COMPLETED: "completed_count",
+}
+
+
+class WorkloadDelta:
+    """Counter changes accumulated over one transaction"""
+
+    def __init__(self):
+        self.changes = defaultdict(lambda: defaultdict(int))
+
+    def add(self, teacher_id: Optional[str], status, amount: int = 1):
+        column = COUNTERS.get(RegistrationStatus(status)) if status is not None else None
+        if teacher_id is not None and column is not None:
+            self.changes[teacher_id][column] += amount
+
+    def move(self, old_teacher_id: Optional[str], old_status, new_teacher_id: Optional[str], new_status):
+        """A registration went from (old teacher, old status) to (new teacher, new status)"""
+        self.add(old_teacher_id, old_status, -1)
+        self.add(new_teacher_id, new_status, 1)
+
+    def statement(self):
+        """One UPDATE applying every non-zero change, or None"""
+        values, teacher_ids = {}, set()
+        for column in COUNTERS.values():
+            by_teacher = {
+                teacher_id: counts[column]
+                for teacher_id, counts in self.changes.items() if counts.get(column)
+            }
+            if not by_teacher:
+                continue
+            teacher_ids.update(by_teacher)
+            current = getattr(Teacher, column)
+            # Comparisons rather than case(value=...), so the ids bind as uuids
+            values[column] = current + case(
+                *((Teacher.id == teacher_id, count) for teacher_id, count in by_teacher.items()), else_=0
+            )
+        if not values:
+            return None
+        return (
+            update(Teacher)
+            .where(Teacher.id.in_(sorted(teacher_ids)))
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def apply_delta(db, delta: WorkloadDelta):
+    """Execute the delta's UPDATE on a session from database.get_db (not committed)"""
+    statement = delta.statement()
+    if statement is not None:
+        await db.execute(statement)
+
+
+def counted_loads(db) -> Dict[str, Dict[str, int]]:
+    """Counter values rebuilt from registrations (sync Session)"""
+    counts = defaultdict(lambda: {column: 0 for column in COUNTERS.values()})
+    rows = db.execute(
+        select(Registration.teacher_id, Registration.status, func.count())
+        .where(Registration.teacher_id.isnot(None), Registration.status.in_(list(COUNTERS)))
+        .group_by(Registration.teacher_id, Registration.status)
+    )
+    for teacher_id, status, count in rows:
+        counts[teacher_id][COUNTERS[RegistrationStatus(status)]] = count
+    return counts
+
+
+def reconcile(db, dry_run: bool = False) -> List[Dict]:
+    """
+    Rebuild every teacher's counters from registrations (sync Session).
+
+    Returns the teachers whose stored counters had drifted, with stored and
+    counted values; unless dry_run they are corrected and committed. The
+    teacher rows are locked while counting so concurrent writes queue
+    behind the rebuild instead of being overwritten by it.
+    """
+    columns = list(COUNTERS.values())
+    stored_query = select(Teacher.id, *(getattr(Teacher, column) for column in columns))
+    if not dry_run:
+        stored_query = stored_query.with_for_update()
+    stored = {row[0]: dict(zip(columns, row[1:])) for row in db.execute(stored_query)}
+    counted = counted_loads(db)
+
+    drift = []
+    for teacher_id, values in stored.items():
+        expected = counted.get(teacher_id, {column: 0 for column in columns})
+        if values != expected:
+            drift.append({"teacher_id": teacher_id, "stored": values, "counted": expected})
+
+    if drift and not dry_run:
+        db.execute(
+            update(Teacher).execution_options(synchronize_session=False),
+            [{"id": item["teacher_id"], **item["counted"]} for item in drift]
+        )
+        logger.warning("Workload counters corrected for %d teachers", len(drift))
+    if not dry_run:
+        db.commit()
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild per-teacher workload counters")
+    parser.add_argument("--check", action="store_true",
+                        help="only report drift; exit status 1 if any counter is wrong")
+    args = parser.parse_args(argv)
+
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        drift = reconcile(db, dry_run=args.check)
+    finally:
+        db.close()
+    print(json.dumps({"drifted": len(drift), "teachers": drift}, indent=2))
+    if args.check and drift:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
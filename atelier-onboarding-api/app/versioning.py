@@ -0,0 +1,121 @@
+"""
+Per-table write counters (table_versions): the ETag source for
+app/http_cache.py. Also tombstones deleted registrations for the change
+feed (services/change_feed.py).
+
+A transaction that writes a versioned table (an ORM flush, or an
+INSERT/UPDATE/DELETE run through Session.execute) only marks it. Once the
+transaction has committed, the marked counters are bumped by one UPDATE in
+a short transaction of its own, so no writer holds a counter row locked
+while its transaction is open and writers don't queue behind each other.
+Bumping after the commit means a tag never names data that isn't visible
+yet; the cost is that a conditional GET in the moment between a commit and
+its bump can still be answered 304. Deleted registrations leave a
+RegistrationTombstone stamped with the transaction's change feed position
+(models.current_change_seq), as a column default stamps written rows.
+
+Writes that bypass the Session (COPY on the raw DBAPI connection) call
+mark_written() themselves. models.py imports this module, so every Session
+in the process (API, CLIs, background jobs) is tracked.
+"""
+import logging
+from typing import Iterable
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from .models import Registration, RegistrationTombstone, TableVersion, Teacher, current_change_seq
+
+logger = logging.getLogger(__name__)
+
+VERSIONED_TABLES = frozenset({Registration.__tablename__, Teacher.__tablename__})
+# Tables written in the open transaction, and those committed but not yet bumped
+WRITTEN_KEY = "versioning.written"
+COMMITTED_KEY = "versioning.committed"
+
+COUNTERS = TableVersion.__table__
+
+
+@event.listens_for(COUNTERS, "after_create")
+def _seed_counters(table, connection, **kw):
+    # Same rows as the 0008 migration, for schemas made with create_all
+    connection.execute(table.insert(), [{"name": name, "version": 1} for name in sorted(VERSIONED_TABLES)])
+
+
+def mark_written(session: Session, table: str):
+    """Have `table`'s counter bumped once this session's transaction commits"""
+    session.info.setdefault(WRITTEN_KEY, set()).add(table)
+
+
+def bump(engine, tables: Iterable[str]):
+    """Bump the counters of `tables` in one short transaction on `engine`"""
+    tables = set(tables)
+    with engine.begin() as connection:
+        bumped = set(connection.execute(
+            update(COUNTERS).where(COUNTERS.c.name.in_(sorted(tables)))
+            .values(version=COUNTERS.c.version + 1)
+            .returning(COUNTERS.c.name)
+        ).scalars())
+        if bumped != tables:
+            # A counter row deleted by hand is recreated rather than silently never bumped
+            connection.execute(insert(COUNTERS), [{"name": name, "version": 1} for name in sorted(tables - bumped)])
+
+
+def _tables_of(objects: Iterable) -> set:
+    return {getattr(obj, "__tablename__", None) for obj in objects} & VERSIONED_TABLES
+
+
+@event.listens_for(Session, "before_flush")
+def _mark_flushed(session, flush_context, instances):
+    dirty = (obj for obj in session.dirty if session.is_modified(obj, include_collections=False))
+    for table in _tables_of(session.new) | _tables_of(session.deleted) | _tables_of(dirty):
+        mark_written(session, table)
+
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Registration)]
+    if deleted:
+        session.connection().execute(
+            insert(RegistrationTombstone.__table__).values(change_seq=current_change_seq()),
+            [{"id": registration_id} for registration_id in deleted]
+        )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is None or table.name not in VERSIONED_TABLES:
+        return
+    session = orm_execute_state.session
+    mark_written(session, table.name)
+
+    if orm_execute_state.is_delete and table.name == Registration.__tablename__:
+        # Tombstone the rows the DELETE is about to remove
+        doomed = select(Registration.id, current_change_seq())
+        if orm_execute_state.statement.whereclause is not None:
+            doomed = doomed.where(orm_execute_state.statement.whereclause)
+        session.connection().execute(
+            insert(RegistrationTombstone.__table__).from_select(["id", "change_seq"], doomed)
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _keep_committed(session):
+    # A released savepoint is not committed yet; its marks wait for the outer transaction
+    if not session.in_nested_transaction():
+        session.info.setdefault(COMMITTED_KEY, set()).update(session.info.pop(WRITTEN_KEY, ()))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _bump_committed(session, transaction):
+    if transaction.parent is not None:
+        return
+    # Marks of a rolled back transaction are dropped; the connection is back in the pool by now
+    session.info.pop(WRITTEN_KEY, None)
+    committed = session.info.pop(COMMITTED_KEY, None)
+    if committed:
+        try:
+            bump(session.get_bind(), committed)
+        except Exception:
+            # The write itself is committed; its tag catches up with the next write to the table
+            logger.exception("Could not bump table versions %s", sorted(committed))
@@ -0,0 +1,118 @@
+"""
+Automatic teacher assignment at backlog scale.
+
+Solves --registrations pending registrations against --teachers teachers
+(default 10k x 200) with the min-cost-flow engine and compares it with a
+greedy baseline that walks the backlog oldest first and gives each
+registration the teacher with the best fit minus load penalty that still
+has capacity. Reports solve time, placed count, average fit and the spread
+of teacher loads, then times a full end-to-end run (load, solve, save)
+against the benchmark database.
+
+    python -m benchmarks.bench_assignment
+    python -m benchmarks.bench_assignment --registrations 10000 --teachers 200 --capacity 60
+"""
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+
+from .common import configure_env, registration_rows, reset_sqlite, teacher_rows
+
+
+def greedy(registrations, teachers, loads):
+    from app.config import settings
+    from app.services.teacher_matching import fit_score, registration_profile, teacher_profile
+
+    band = max(settings.ASSIGNMENT_LOAD_BAND, 1)
+    load = dict(loads)
+    profiles = [(t, teacher_profile(t)) for t in teachers]
+    placed = {}
+    for registration in registrations:
+        key = registration_profile(registration)
+        best = None
+        for teacher, teacher_key in profiles:
+            current = load.get(teacher.id, 0)
+            if current >= teacher.capacity:
+                continue
+            fit = fit_score(key, teacher_key)
+            value = fit - settings.ASSIGNMENT_LOAD_WEIGHT * (current // band)
+            if best is None or value > best[0]:
+                best = (value, teacher.id, fit)
+        if best is None:
+            continue
+        placed[registration.id] = (best[1], best[2])
+        load[best[1]] = load.get(best[1], 0) + 1
+    return placed
+
+
+def report(name, placed, teachers, loads, elapsed):
+    final = {t.id: loads.get(t.id, 0) for t in teachers}
+    for teacher_id, _ in placed.values():
+        final[teacher_id] += 1
+    values = list(final.values())
+    average_fit = sum(fit for _, fit in placed.values()) / len(placed) if placed else 0.0
+    print(f"{name:<10} {elapsed:>9.2f} {len(placed):>8} {average_fit:>9.1f} "
+          f"{min(values):>9} {max(values):>9} {statistics.pstdev(values):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registrations", type=int, default=10000)
+    parser.add_argument("--teachers", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=60)
+    parser.add_argument("--skip-db", action="store_true", help="only time the solver")
+    args = parser.parse_args()
+
+    database_url = configure_env()
+    from app.models import RegistrationStatus
+    from app.services.teacher_matching import solve
+
+    teachers = [SimpleNamespace(capacity=args.capacity, **row) for row in teacher_rows(args.teachers)]
+    registrations = []
+    for row in registration_rows(args.registrations):
+        row["status"] = RegistrationStatus.PENDING
+        row["teacher_id"] = None
+        registrations.append(SimpleNamespace(**row))
+    # Existing load: the first tenth of teachers already carry half their capacity
+    loads = {t.id: args.capacity // 2 for t in teachers[:max(args.teachers // 10, 1)]}
+
+    print(f"{'mode':<10} {'seconds':>9} {'placed':>8} {'avg fit':>9} {'min load':>9} {'max load':>9} {'stdev':>9}")
+    started = time.perf_counter()
+    placed = greedy(registrations, teachers, loads)
+    report("greedy", placed, teachers, loads, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    placed = solve(registrations, teachers, loads)
+    report("min-cost", placed, teachers, loads, time.perf_counter() - started)
+
+    if args.skip_db:
+        return
+
+    reset_sqlite(database_url)
+    from app.database import SessionLocal, get_engine
+    from app.models import Registration, Teacher
+    from app.schema import create_schema
+    from app.services.teacher_matching import auto_assign
+
+    engine = get_engine()
+    create_schema(engine, drop=True)
+    with engine.begin() as conn:
+        conn.execute(Teacher.__table__.insert(), [
+            {key: value for key, value in vars(t).items()} for t in teachers
+        ])
+        conn.execute(Registration.__table__.insert(), [vars(r) for r in registrations])
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        result = auto_assign(db)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    print(f"end-to-end: assigned {result['assigned']} of {result['considered']} in {elapsed:.2f}s "
+          f"(average fit {result['average_fit']})")
+
+
+if __name__ == "__main__":
+    main()
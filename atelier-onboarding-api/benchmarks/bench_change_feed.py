@@ -0,0 +1,182 @@
+"""
+Change feed under concurrent writers.
+
+Starts --writers concurrent clients that create, update, assign, send links
+for and delete registrations through the API (each on its own rows, so
+they race on the feed rather than on each other), a few of them also holding
+a transaction open for a while (sleeping between the write and the commit)
+so that commits land out of start order. Meanwhile a poller follows
+GET /api/registrations/changes with a small page size, applying each page
+to a local copy. Once the writers finish, the poller drains the feed.
+Reports how many rows the polls moved compared with re-fetching the list,
+and how far the copy is from the table (it should match exactly; that
+guarantee is asserted in tests/test_change_feed.py).
+
+    python -m benchmarks.bench_change_feed
+    python -m benchmarks.bench_change_feed --writers 16 --operations 60 --page-size 7
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from .common import asgi_client, configure_env, reset_sqlite, seed
+
+COMPARED_FIELDS = ("grade", "status", "teacher_id", "demo_link")
+
+
+def slow_update(registration_id, grade, hold_seconds):
+    """Update a row and keep the transaction open for a while before committing"""
+    from app.database import SessionLocal
+    from app.models import Registration
+
+    db = SessionLocal()
+    try:
+        registration = db.get(Registration, registration_id)
+        if registration is None:
+            return
+        registration.grade = grade
+        db.flush()
+        time.sleep(hold_seconds)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def writer(client, rnd, teacher_ids, known, operations):
+    loop = asyncio.get_running_loop()
+    for _ in range(operations):
+        action = rnd.random()
+        if action < 0.3 or not known:
+            response = await client.post("/api/registrations", json={
+                "student_name": "Feed Student", "student_age": rnd.randint(5, 17), "grade": "3",
+                "parent_name": "Feed Parent", "email": f"feed{rnd.randrange(10 ** 9)}@example.com",
+                "phone": "+15550000000",
+            })
+            known.append(response.json()["id"])
+            continue
+        registration_id = rnd.choice(known)
+        if action < 0.5:
+            await client.put(f"/api/registrations/{registration_id}", json={"grade": str(rnd.randint(1, 12))})
+        elif action < 0.65:
+            await client.post(f"/api/registrations/{registration_id}/assign",
+                              json={"teacher_id": rnd.choice(teacher_ids)})
+        elif action < 0.72:
+            await client.post("/api/registrations/bulk/assign", json={
+                "teacher_id": rnd.choice(teacher_ids),
+                "registration_ids": rnd.sample(known, min(len(known), 12)),
+            })
+        elif action < 0.8:
+            await client.post(f"/api/registrations/{registration_id}/send-link")
+        elif action < 0.9:
+            await loop.run_in_executor(None, slow_update, registration_id, str(rnd.randint(1, 12)), 0.02)
+        else:
+            known.remove(registration_id)
+            await client.delete(f"/api/registrations/{registration_id}")
+
+
+class Follower:
+    def __init__(self, client, page_size):
+        self.client = client
+        self.page_size = page_size
+        self.token = None
+        self.rows = {}
+        self.polls = 0
+        self.moved = 0
+
+    async def poll(self):
+        """Fetch pages until the feed is caught up; returns the rows moved"""
+        moved = 0
+        while True:
+            params = {"limit": self.page_size}
+            if self.token:
+                params["since"] = self.token
+            body = (await self.client.get("/api/registrations/changes", params=params)).json()
+            for row in body["changes"]:
+                self.rows[row["id"]] = row
+            for registration_id in body["deleted"]:
+                self.rows.pop(registration_id, None)
+            moved += len(body["changes"]) + len(body["deleted"])
+            self.token = body["next"]
+            if not body["has_more"]:
+                break
+        self.polls += 1
+        self.moved += moved
+        return moved
+
+
+def plain(value):
+    return value.value if hasattr(value, "value") else value
+
+
+def snapshot(engine):
+    from app.models import Registration
+    from sqlalchemy import select
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(Registration.id, *(getattr(Registration, f) for f in COMPARED_FIELDS)))
+        return {row.id: row for row in rows}
+
+
+async def run(app, engine, teacher_ids, registration_ids, args):
+    rnd = random.Random(5)
+    async with asgi_client(app) as client:
+        follower = Follower(client, args.page_size)
+        await follower.poll()
+        done = asyncio.Event()
+
+        async def follow():
+            while not done.is_set():
+                await follower.poll()
+                await asyncio.sleep(0)
+
+        poller = asyncio.create_task(follow())
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            writer(client, random.Random(rnd.random()), teacher_ids, registration_ids[i::args.writers], args.operations)
+            for i in range(args.writers)
+        ))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await poller
+        await follower.poll()
+    return follower, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300, help="registrations seeded before the run")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=40, help="operations per writer")
+    parser.add_argument("--page-size", type=int, default=7)
+    args = parser.parse_args()
+
+    database_url = configure_env()
+    reset_sqlite(database_url)
+    from app.database import engine
+    teachers = seed(engine, registrations=args.rows, teachers=10)
+
+    from app.main import app
+    from app.auth import require_admin
+    app.dependency_overrides[require_admin] = lambda: {"sub": "benchmark", "groups": ["Admins"]}
+
+    registration_ids = list(snapshot(engine))
+    follower, elapsed = asyncio.run(run(app, engine, [t["id"] for t in teachers], registration_ids, args))
+    table = snapshot(engine)
+    print(f"{args.writers} writers x {args.operations} operations in {elapsed:.2f}s; "
+          f"{follower.polls} polls moved {follower.moved} rows "
+          f"(re-fetching the list each poll would have moved ~{follower.polls * len(table)})")
+
+    missing = table.keys() - follower.rows.keys()
+    extra = follower.rows.keys() - table.keys()
+    stale = [
+        registration_id for registration_id in table.keys() & follower.rows.keys()
+        if any(plain(getattr(table[registration_id], f)) != follower.rows[registration_id].get(f)
+               for f in COMPARED_FIELDS)
+    ]
+    print(f"follower copy of {len(table)} rows: {len(missing)} never seen, "
+          f"{len(extra)} deletes missed, {len(stale)} stale")
+
+
+if __name__ == "__main__":
+    main()
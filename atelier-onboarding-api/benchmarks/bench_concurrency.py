@@ -0,0 +1,123 @@
+"""
+Concurrency benchmark: sync engine (threadpool) vs AsyncEngine.
+
+Each mode runs in its own subprocess because DATABASE_ASYNC is read when
+`app.database` is imported. Requests are driven through ASGI with httpx, and
+`--db-latency-ms` adds a simulated network round trip to every statement so
+SQLite behaves more like a remote RDS instance.
+
+    python -m benchmarks.bench_concurrency --requests 2000 --concurrency 50
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_concurrency
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+from .common import asgi_client, configure_env, percentile, reset_sqlite, seed
+
+
+def add_simulated_latency(mode, latency):
+    from sqlalchemy import event
+    from app import database
+    
+    if mode == "async":
+        from sqlalchemy.util import await_only
+        target = database.async_engine.sync_engine
+        
+        def delay(*args):
+            await_only(asyncio.sleep(latency))
+    else:
+        target = database.engine
+        
+        def delay(*args):
+            time.sleep(latency)
+    
+    event.listen(target, "before_cursor_execute", delay)
+
+
+async def drive(app, paths, total, concurrency):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(paths[i % len(paths)])
+    
+    async def worker(client):
+        while not queue.empty():
+            path = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+    
+    async with asgi_client(app) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_mode(args):
+    database_url = configure_env(DATABASE_ASYNC=str(args.mode == "async").lower())
+    reset_sqlite(database_url)
+    
+    from app.database import engine
+    seed(engine, registrations=args.rows, teachers=20)
+    
+    from app.main import app
+    from app.models import Registration
+    from sqlalchemy import select
+    with engine.connect() as conn:
+        ids = conn.execute(select(Registration.id).limit(200)).scalars().all()
+    
+    if args.db_latency_ms:
+        add_simulated_latency(args.mode, args.db_latency_ms / 1000.0)
+    
+    paths = ["/api/registrations?limit=20"] + [f"/api/registrations/{i}" for i in ids]
+    result = asyncio.run(drive(app, paths, args.requests, args.concurrency))
+    result["mode"] = args.mode
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["sync", "async"], help="run a single mode in-process")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    
+    if args.mode:
+        run_mode(args)
+        return
+    
+    results = []
+    for mode in ("sync", "async"):
+        cmd = [sys.executable, "-m", "benchmarks.bench_concurrency", "--mode", mode,
+               "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+               "--rows", str(args.rows), "--db-latency-ms", str(args.db_latency_ms)]
+        output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    
+    print(f"{'mode':<6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Create throughput: INSERT ... RETURNING against read, insert, re-read.
+
+POST /api/teachers writes the row with one INSERT ... ON CONFLICT DO NOTHING
+RETURNING id, letting the unique index on email refuse duplicates. For
+comparison the benchmark mounts the previous handler at POST /bench/teachers:
+SELECT the email first, add the ORM object, commit, then refresh it. Both go
+through the same middleware, session and --db-latency-ms (the simulated
+round trip to RDS per statement), at --concurrency clients, and every
+--duplicate-every'th request reuses a seeded teacher's email, which both must
+answer with 400. POST /api/registrations is measured alongside.
+
+Reports creates per second, latency percentiles and statements per create
+(tests/test_create.py pins the counts). Exits with status 1 if the
+RETURNING path's median latency is not below the old one's.
+
+    python -m benchmarks.bench_create
+    DATABASE_URL=postgresql://... DATABASE_ASYNC=1 python -m benchmarks.bench_create --concurrency 50
+"""
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+import uuid
+
+from .bench_concurrency import add_simulated_latency
+from .common import StatementCounter, asgi_client, configure_env, percentile, reset_sqlite, seed
+
+
+def mount_previous_handler(app):
+    """The create_teacher body before RETURNING, for an A/B in the same process"""
+    from fastapi import Depends, HTTPException
+    from sqlalchemy import select
+    from app.database import get_db
+    from app.models import Teacher
+    from app.schemas import MessageResponse, TeacherCreate
+
+    @app.post("/bench/teachers", response_model=MessageResponse, status_code=201)
+    async def create_teacher_previous(teacher: TeacherCreate, db=Depends(get_db)):
+        existing = await db.scalar(select(Teacher.id).where(Teacher.email == teacher.email))
+        if existing:
+            raise HTTPException(status_code=400, detail="Teacher with this email already exists")
+        db_teacher = Teacher(id=str(uuid.uuid4()), **teacher.model_dump())
+        db.add(db_teacher)
+        await db.commit()
+        await db.refresh(db_teacher)
+        return MessageResponse(message="Teacher created successfully", id=db_teacher.id)
+
+
+def teacher_bodies(prefix, duplicate_every, seeded):
+    for i in itertools.count():
+        if duplicate_every and i % duplicate_every == duplicate_every - 1:
+            # An already committed email: the old handler 500s when a duplicate races its original
+            yield {"name": "Bench Teacher", "email": f"teacher{i % seeded}@example.com"}, 400
+        else:
+            yield {"name": f"Bench Teacher {i}", "email": f"{prefix}{i}@example.com", "specialization": "Piano"}, 201
+
+
+def registration_bodies(prefix):
+    for i in itertools.count():
+        yield {
+            "student_name": f"Bench Student {i}", "student_age": 5 + i % 12, "grade": str(1 + i % 12),
+            "parent_name": "Bench Parent", "email": f"{prefix}{i}@example.com", "phone": "+15550000000",
+        }, 201
+
+
+async def drive(app, engine, path, bodies, total, concurrency):
+    latencies = []
+    pending = iter(itertools.islice(bodies, total))
+
+    async def worker(client):
+        for body, expected in pending:
+            started = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != expected:
+                raise RuntimeError(f"POST {path} returned {response.status_code}: {response.text}")
+
+    async with asgi_client(app) as client:
+        with StatementCounter(engine) as counter:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "statements": counter.count / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--creates", type=int, default=1000, help="POSTs per measured path")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="SQLite takes one writer at a time; raise this against PostgreSQL")
+    parser.add_argument("--duplicate-every", type=int, default=10, help="0 disables duplicate emails")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0,
+                        help="simulated round trip per statement, as against RDS")
+    args = parser.parse_args()
+
+    database_url = configure_env()
+    reset_sqlite(database_url)
+    from app import database
+    seeded = len(seed(database.engine, registrations=1000, teachers=20))
+
+    from app.main import app
+    from app.auth import require_admin
+    app.dependency_overrides[require_admin] = lambda: {"sub": "benchmark", "groups": ["Admins"]}
+    mount_previous_handler(app)
+    mode = "async" if database.async_engine is not None else "sync"
+    if args.db_latency_ms:
+        add_simulated_latency(mode, args.db_latency_ms / 1000.0)
+    engine = database.async_engine or database.engine
+
+    results = {}
+    for name, path, bodies in (
+        ("teachers, select + insert + refresh", "/bench/teachers", teacher_bodies("before", args.duplicate_every, seeded)),
+        ("teachers, insert returning", "/api/teachers", teacher_bodies("after", args.duplicate_every, seeded)),
+        ("registrations", "/api/registrations", registration_bodies("create")),
+    ):
+        results[name] = asyncio.run(drive(app, engine, path, bodies, args.creates, args.concurrency))
+        r = results[name]
+        print(f"{mode} {name:<38} {r['rps']:>8.1f} creates/s  p50 {r['p50_ms']:>7.2f} ms  "
+              f"p95 {r['p95_ms']:>7.2f} ms  {r['statements']:.2f} statements")
+
+    before = results["teachers, select + insert + refresh"]
+    after = results["teachers, insert returning"]
+    print(f"insert returning: {after['rps'] / before['rps']:.2f}x throughput, "
+          f"p50 {before['p50_ms'] - after['p50_ms']:.2f} ms lower, "
+          f"{before['statements'] - after['statements']:.2f} fewer statements per create")
+    if after["p50_ms"] >= before["p50_ms"]:
+        print("FAIL: INSERT ... RETURNING is not faster than select + insert + refresh")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
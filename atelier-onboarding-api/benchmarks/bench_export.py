@@ -0,0 +1,160 @@
+"""
+Peak memory of the registration export over a large table.
+
+Seeds --rows registrations once, then runs each mode in a fresh subprocess
+and reports how far its peak RSS (ru_maxrss) rose during the export:
+
+list          the query loaded into a list of RegistrationResponse objects,
+              as a client paging GET /api/registrations ends up holding
+csv / ndjson  GET /api/admin/registrations/export, with the response body
+              consumed and discarded as it is streamed
+csv-gzip      the same with gzip=true
+
+The ASGI app is called directly rather than through httpx, whose ASGI
+transport buffers the whole response body. tests/test_export.py checks that
+the export's memory stays flat; this reports the numbers at scale.
+
+    python -m benchmarks.bench_export --rows 500000
+    DATABASE_URL=postgresql://localhost/atelier_bench python -m benchmarks.bench_export
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from .common import configure_env, reset_sqlite, seed
+
+MODES = {
+    "list": None,
+    "csv": "format=csv",
+    "ndjson": "format=ndjson",
+    "csv-gzip": "format=csv&gzip=true",
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+async def stream_endpoint(app, query_string):
+    """GET the export through the raw ASGI interface, counting and discarding body bytes"""
+    path = "/api/admin/registrations/export"
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [(b"host", b"bench"), (b"authorization", b"Bearer benchmark")],
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 40000),
+    }
+    request_sent = False
+    status = None
+    size = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client never disconnects; StreamingResponse cancels this wait when it is done
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"GET {path}?{query_string} returned {status}")
+    return size
+
+
+def load_list():
+    from app.database import SessionLocal
+    from app.routers.registrations import filtered_registrations_query
+    from app.schemas import RegistrationResponse
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(filtered_registrations_query()).mappings().all()
+        registrations = [RegistrationResponse.model_validate(row) for row in rows]
+        return sum(len(r.model_dump_json()) for r in registrations)
+    finally:
+        db.close()
+
+
+def run_worker(mode):
+    configure_env()
+    from app.auth import require_admin
+    from app.main import app
+
+    app.dependency_overrides[require_admin] = lambda: {"sub": "benchmark", "groups": ["Admins"]}
+    # Warm up imports and the engine so the baseline includes them
+    asyncio.run(stream_endpoint(app, "format=csv&status=completed&search=zzzz"))
+
+    before = peak_rss_mb()
+    started = time.perf_counter()
+    if MODES[mode] is None:
+        size = load_list()
+    else:
+        size = asyncio.run(stream_endpoint(app, MODES[mode]))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "mb": round(size / 1024 / 1024, 1),
+        "rss_before_mb": round(before, 1),
+        "rss_growth_mb": round(peak_rss_mb() - before, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    database_url = configure_env()
+    reset_sqlite(database_url)
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine(database_url)
+    started = time.perf_counter()
+    seed(engine, registrations=args.rows, teachers=20)
+    engine.dispose()
+    print(f"seeded {args.rows} registrations in {time.perf_counter() - started:.1f}s")
+
+    results = []
+    for mode in args.modes.split(","):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_export", "--worker", mode],
+            check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'mode':<10} {'seconds':>8} {'output MB':>10} {'RSS before MB':>14} {'RSS growth MB':>14}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['seconds']:>8} {r['mb']:>10} {r['rss_before_mb']:>14} {r['rss_growth_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Bulk registration import throughput in rows per second.
+
+one-by-one  what POST /api/registrations does per row: insert the registration
+            and its queued email, commit, refresh
+import      app.services.registration_import over the same rows as CSV, for
+            each --chunk-sizes value (COPY on Postgres with psycopg2,
+            multi-row INSERTs elsewhere)
+http        POST /api/registrations/import through ASGI with the body streamed
+
+Every mode starts from empty tables. `--invalid-every N` makes every Nth row
+fail validation, to show the per-row error path does not slow the batch down.
+
+    python -m benchmarks.bench_import --rows 20000
+    DATABASE_URL=postgresql://localhost/atelier_bench python -m benchmarks.bench_import --rows 200000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import time
+import uuid
+
+from .common import asgi_client, configure_env, registration_rows, reset_sqlite
+
+CSV_FIELDS = (
+    "student_name", "student_age", "grade", "parent_name", "email", "phone", "preferred_time",
+    "experience_level", "interests", "additional_notes"
+)
+
+
+def build_csv(rows, invalid_every):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_FIELDS)
+    for i, row in enumerate(rows, start=1):
+        age = 99 if invalid_every and i % invalid_every == 0 else row["student_age"]
+        writer.writerow([
+            row["student_name"], age, row["grade"], row["parent_name"], row["email"], row["phone"],
+            row["preferred_time"], row["experience_level"].value, ";".join(row["interests"]), ""
+        ])
+    return buffer.getvalue()
+
+
+def reset_tables():
+    from app.schema import create_schema
+    create_schema(drop=True)
+
+
+def one_by_one(rows):
+    from app.database import SessionLocal
+    from app.models import Registration, RegistrationStatus
+    from app.schemas import RegistrationCreate
+    from app.services.outbox import enqueue_registration_confirmation
+    from pydantic import ValidationError
+
+    db = SessionLocal()
+    try:
+        for row in rows:
+            try:
+                registration = RegistrationCreate.model_validate(row)
+            except ValidationError:
+                continue
+            db_registration = Registration(
+                id=str(uuid.uuid4()),
+                status=RegistrationStatus.PENDING,
+                **registration.model_dump()
+            )
+            db.add(db_registration)
+            enqueue_registration_confirmation(
+                db,
+                registration_id=db_registration.id,
+                to_email=registration.email,
+                student_name=registration.student_name,
+                parent_name=registration.parent_name
+            )
+            db.commit()
+            db.refresh(db_registration)
+    finally:
+        db.close()
+
+
+def import_csv(text, chunk_size):
+    from app.database import SessionLocal
+    from app.services.registration_import import import_lines
+
+    db = SessionLocal()
+    try:
+        return import_lines(db, io.StringIO(text), "csv", chunk_size)
+    finally:
+        db.close()
+
+
+async def post_csv(text, chunk_size):
+    from app.main import app
+
+    async def body():
+        data = text.encode()
+        for start in range(0, len(data), 64 * 1024):
+            yield data[start:start + 64 * 1024]
+
+    async with asgi_client(app) as client:
+        response = await client.post(
+            f"/api/registrations/import?chunk_size={chunk_size}",
+            content=body(),
+            headers={"Content-Type": "text/csv", "Authorization": "Bearer benchmark"}
+        )
+    if response.status_code != 200:
+        raise RuntimeError(f"POST /api/registrations/import returned {response.status_code}: {response.text}")
+    return response.json()
+
+
+def override_auth():
+    from app.main import app
+    from app.auth import require_admin
+
+    app.dependency_overrides[require_admin] = lambda: {"sub": "benchmark", "groups": ["Admins"]}
+
+
+def timed(name, rows, fn):
+    reset_tables()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    imported = result["imported"] if result else rows
+    print(f"{name:<18} {imported:>10} {elapsed:>10.2f} {imported / elapsed:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--one-by-one-rows", type=int, default=2000, help="the per-row baseline is slow; cap it")
+    parser.add_argument("--chunk-sizes", default="100,500,2000")
+    parser.add_argument("--invalid-every", type=int, default=0)
+    args = parser.parse_args()
+
+    database_url = configure_env()
+    reset_sqlite(database_url)
+
+    rows = list(registration_rows(args.rows))
+    for row in rows:
+        row["experience_level"] = row["experience_level"].value
+    text = build_csv(registration_rows(args.rows), args.invalid_every)
+    chunk_sizes = [int(size) for size in args.chunk_sizes.split(",")]
+    baseline = rows[:args.one_by_one_rows]
+
+    override_auth()
+
+    print(f"{'mode':<18} {'rows':>10} {'seconds':>10} {'rows/s':>12}")
+    timed("one-by-one", len(baseline), lambda: one_by_one(baseline))
+    for chunk_size in chunk_sizes:
+        timed(f"import chunk={chunk_size}", args.rows, lambda: import_csv(text, chunk_size))
+    timed(f"http chunk={chunk_sizes[-1]}", args.rows, lambda: asyncio.run(post_csv(text, chunk_sizes[-1])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Cold-start import budget for lambda_function.
+
+Runs `python -X importtime -c "import lambda_function"` in fresh
+interpreters, parses the per-module timings from stderr, and prints the
+median total plus the most expensive modules. Exits non-zero when
+
+- the median cumulative import time of lambda_function exceeds --budget-ms,
+- any module in DEFERRED is imported (they must load on first use), or
+- importing the app created a database engine.
+
+    python -m benchmarks.bench_importtime
+    python -m benchmarks.bench_importtime --runs 10 --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from .common import configure_env
+
+TARGET = "lambda_function"
+
+# Modules the API handler must not load at import time
+DEFERRED = (
+    "requests",
+    "jose",
+    "smtplib",
+    "email.mime",
+    "psycopg2",
+    "asyncpg",
+    "app.services.email_service",
+    "app.services.notification_dispatcher",
+)
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+PROBE = f"import {TARGET}; import app.database as d; print('engine created' if d._engine is not None else '')"
+
+
+def run_once(api_dir):
+    """Return ({module: (self_us, cumulative_us)}, stdout) for one fresh import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=api_dir,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return timings, result.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=2000.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    
+    configure_env()
+    api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    
+    # Warm-up run so .pyc compilation isn't counted
+    run_once(api_dir)
+    runs = [run_once(api_dir) for _ in range(args.runs)]
+    
+    totals = [timings[TARGET][1] / 1000 for timings, _ in runs]
+    total = statistics.median(totals)
+    
+    timings, probe_output = runs[-1]
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for name, (self_us, cumulative_us) in sorted(timings.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {name}")
+    print(f"\n{TARGET}: median {total:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    
+    failures = []
+    if total > args.budget_ms:
+        failures.append(f"import time {total:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    eager = sorted(
+        name for name in timings
+        if any(name == module or name.startswith(module + ".") for module in DEFERRED)
+    )
+    if eager:
+        failures.append(f"modules that should load lazily were imported: {', '.join(eager)}")
+    if probe_output:
+        failures.append(f"importing {TARGET} created a database engine")
+    
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
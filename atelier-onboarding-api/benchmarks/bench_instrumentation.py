@@ -0,0 +1,190 @@
+"""
+Overhead of the request metrics (app/instrumentation.py).
+
+A throughput A/B between processes with metrics off and on swings by more
+than the 1% being measured, so the cost is measured where it is added
+instead:
+
+- the middleware (Server-Timing, histograms and an EMF line to /dev/null),
+  timed around a bare ASGI endpoint against the same endpoint unwrapped;
+- the statement hooks, timed on SELECT 1 with and without them;
+- one span, timed against an empty block;
+
+each as the best of --repeat batches (like timeit), alternating with the
+uninstrumented baseline. Their sum per request
+(hooks once per statement the request actually ran) is compared with the
+median latency of real API requests: the registration list and detail and
+the teacher list and detail, with --db-latency-ms standing in for the round
+trip to RDS. Exits with status 1 if that exceeds --max-overhead-pct, or if an
+instrumented response lacks Server-Timing or is missing from the per-route
+histograms.
+
+    python -m benchmarks.bench_instrumentation
+    python -m benchmarks.bench_instrumentation --db-latency-ms 0 --max-overhead-pct 2
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+from .bench_concurrency import add_simulated_latency
+from .common import asgi_client, configure_env, reset_sqlite, seed
+
+
+def added_cost(repeat, number, bare, metered):
+    """
+    Seconds per call that `metered(number)` adds over `bare(number)`: the
+    best batch of each, alternating them so background load hits both alike.
+    """
+    timings = {bare: [], metered: []}
+    for _ in range(repeat):
+        for run in (bare, metered):
+            started = time.perf_counter()
+            run(number)
+            timings[run].append((time.perf_counter() - started) / number)
+    return max(0.0, min(timings[metered]) - min(timings[bare]))
+
+
+def middleware_cost(args):
+    from app.instrumentation import RequestMetricsMiddleware
+
+    scope = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+    start = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+    body = {"type": "http.response.body", "body": b"{}"}
+
+    async def endpoint(scope, receive, send):
+        await send(start)
+        await send(body)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    wrapped = RequestMetricsMiddleware(endpoint)
+    wrapped.emf = True
+
+    def calls(app):
+        def run(number):
+            async def loop():
+                for _ in range(number):
+                    await app(dict(scope), receive, send)
+            asyncio.run(loop())
+        return run
+
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        return added_cost(args.repeat, args.number, calls(endpoint), calls(wrapped))
+
+
+def statement_cost(args):
+    from sqlalchemy import create_engine, text
+    from app.instrumentation import RequestStats, _current, track_statements
+
+    plain, tracked = create_engine("sqlite://"), track_statements(create_engine("sqlite://"))
+
+    def statements(engine):
+        def run(number):
+            with engine.connect() as conn:
+                for _ in range(number):
+                    conn.execute(text("SELECT 1"))
+        return run
+
+    token = _current.set(RequestStats())
+    try:
+        return added_cost(args.repeat, args.number, statements(plain), statements(tracked))
+    finally:
+        _current.reset(token)
+
+
+def span_cost(args):
+    from app.instrumentation import RequestStats, _current, registry, span
+
+    def empty(number):
+        for _ in range(number):
+            with contextlib.nullcontext():
+                pass
+
+    def spans(number):
+        for _ in range(number):
+            with span("bench"):
+                pass
+
+    token = _current.set(RequestStats())
+    try:
+        return added_cost(args.repeat, args.number, empty, spans)
+    finally:
+        _current.reset(token)
+        registry.reset()
+
+
+async def measure_requests(app, paths, rounds):
+    """Median latency of the paths, plus SQL statements per request; checks every response is instrumented"""
+    from app.instrumentation import registry
+
+    registry.reset()
+    latencies, statements = [], 0
+    async with asgi_client(app) as client:
+        for _ in range(rounds):
+            for path in paths:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                timing = response.headers.get("server-timing", "")
+                if response.status_code != 200 or "db;dur=" not in timing:
+                    raise RuntimeError(f"GET {path} returned {response.status_code}, Server-Timing {timing!r}")
+                statements += int(timing.split('desc="')[1].split()[0])
+
+    recorded = sum(sum(h.counts) for h in registry.requests.values())
+    if recorded != len(latencies) or any("unmatched" in key for key in registry.requests):
+        raise RuntimeError(f"{recorded} of {len(latencies)} requests recorded: {sorted(registry.requests)}")
+    return statistics.median(latencies), statements / len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20, help="passes over the request mix")
+    parser.add_argument("--number", type=int, default=2000, help="calls per timed batch")
+    parser.add_argument("--repeat", type=int, default=15, help="timed batches; the best is kept")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0,
+                        help="simulated round trip per statement, as against RDS")
+    parser.add_argument("--max-overhead-pct", type=float, default=1.0)
+    args = parser.parse_args()
+
+    database_url = configure_env(METRICS_ENABLED="true", METRICS_EMF_ENABLED="false")
+    reset_sqlite(database_url)
+    from app.database import engine
+    teachers = seed(engine, registrations=args.rows, teachers=20)
+
+    from app.main import app
+    from app.models import Registration
+    from sqlalchemy import select
+    with engine.connect() as conn:
+        registration_ids = conn.execute(select(Registration.id).limit(10)).scalars().all()
+    if args.db_latency_ms:
+        add_simulated_latency("sync", args.db_latency_ms / 1000.0)
+
+    paths = ["/api/registrations?limit=20", "/api/teachers"]
+    paths += [f"/api/registrations/{i}" for i in registration_ids]
+    paths += [f"/api/teachers/{t['id']}" for t in teachers[:10]]
+    latency, statements = asyncio.run(measure_requests(app, paths, args.rounds))
+
+    middleware, statement, one_span = middleware_cost(args), statement_cost(args), span_cost(args)
+    added = middleware + statements * statement + one_span
+    overhead = added / latency * 100
+    print(f"median request {latency * 1000:.2f} ms, {statements:.1f} statements")
+    print(f"middleware {middleware * 1e6:.1f} us + statement hooks {statement * 1e6:.1f} us x {statements:.1f} "
+          f"+ span {one_span * 1e6:.1f} us = {added * 1e6:.1f} us per request")
+    print(f"overhead {overhead:.2f}% (budget {args.max_overhead_pct}%)")
+    if overhead > args.max_overhead_pct:
+        print("FAIL: request metrics cost more than the budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
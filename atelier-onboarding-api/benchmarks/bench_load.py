@@ -0,0 +1,327 @@
+"""
+Reproducible load test of the registration API, for comparing builds.
+
+Seeds synthetic teachers and registrations at --scale (10k, 100k or 1m rows),
+then drives each scenario through ASGI at --concurrency:
+
+create      POST /api/registrations (public)
+list        GET /api/registrations, first page, all and pending only
+search      GET /api/registrations/search type-ahead on name prefixes
+stats       GET /api/admin/stats
+assign      POST /api/registrations/{id}/assign
+send-link   POST /api/registrations/{id}/send-link
+email       the outbox dispatcher draining the queued emails into a local
+            SMTP stand-in (benchmarks/smtp_stub.py, needs aiosmtpd); its
+            latencies are per --email-batch-size batch
+
+Authentication runs the production get_current_user path: tokens are signed
+with an RSA key generated for the run and verified against a local JWKS file
+(COGNITO_JWKS_URL=file://...). --tokens distinct admin tokens are used in
+turn, so the first request with each one pays for a full verification.
+
+Results are printed as JSON (requests, errors, throughput, p50/p95/p99
+latency and SQL statements per request for each scenario), and optionally
+written to --output. With --baseline the run is compared with a saved
+result and exits with status 1 if any scenario's p95 latency rose or its
+throughput fell by more than --max-regression-pct; any failed request also
+exits 1.
+
+    python -m benchmarks.bench_load --scale 10k --output baseline.json
+    python -m benchmarks.bench_load --scale 10k --baseline baseline.json
+    python -m benchmarks.bench_load --scale 1m --reuse-db --scenarios list,search,stats
+    DATABASE_URL=postgresql://localhost/atelier_bench python -m benchmarks.bench_load --scale 100k
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from .bench_concurrency import add_simulated_latency
+from .common import FIRST_NAMES, asgi_client, configure_env, percentile, reset_sqlite, seed
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SCENARIOS = ("create", "list", "search", "stats", "assign", "send-link", "email")
+USER_POOL_ID = "us-east-1_loadtest"
+KEY_ID = "loadtest-key"
+
+
+class LocalIssuer:
+    """An RSA key pair standing in for the Cognito user pool, with its JWKS written to a file"""
+
+    def __init__(self, directory):
+        import rsa
+        from jose import jwk
+
+        _, private_key = rsa.newkeys(2048)
+        self.private_pem = private_key.save_pkcs1().decode()
+        public = jwk.construct(self.private_pem, "RS256").public_key().to_dict()
+        self.jwks_path = os.path.join(directory, "atelier_loadtest_jwks.json")
+        with open(self.jwks_path, "w") as f:
+            json.dump({"keys": [{**public, "kid": KEY_ID, "use": "sig"}]}, f)
+
+    def token(self, username, region="us-east-1"):
+        from jose import jwt
+
+        now = int(time.time())
+        claims = {
+            "sub": username,
+            "username": username,
+            "cognito:groups": ["Admins"],
+            "token_use": "access",
+            "iss": f"https://cognito-idp.{region}.amazonaws.com/{USER_POOL_ID}",
+            "iat": now,
+            "exp": now + 3600,
+        }
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": KEY_ID})
+
+
+async def drive(client, make_request, total, concurrency):
+    """Send `total` requests built by make_request(i) from `concurrency` workers"""
+    latencies, statements, errors = [], [], []
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            method, path, kwargs = make_request(i)
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors.append(f"{method} {path}: {response.status_code} {response.text[:200]}")
+            timing = response.headers.get("server-timing", "")
+            if 'desc="' in timing:
+                statements.append(int(timing.split('desc="')[1].split()[0]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, statements, errors)
+
+
+def summarize(latencies, elapsed, statements=(), errors=()):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_samples": list(errors[:3]),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "sql_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+    }
+
+
+def request_factories(rnd, tokens, teacher_ids, pending_ids, assigned_ids):
+    """Scenario name -> make_request(i) returning (method, path, httpx kwargs)"""
+
+    def auth(i):
+        return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+    def create(i):
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(FIRST_NAMES)
+        return "POST", "/api/registrations", {"json": {
+            "student_name": f"{first} Load", "student_age": rnd.randint(5, 17), "grade": str(rnd.randint(1, 12)),
+            "parent_name": f"{last} Load", "email": f"load.{i}.{rnd.randrange(10 ** 9)}@example.com",
+            "phone": "+15550000000",
+        }}
+
+    def listing(i):
+        path = "/api/registrations?limit=20" if i % 2 else "/api/registrations?status=pending&limit=20"
+        return "GET", path, {}
+
+    def search(i):
+        name = rnd.choice(FIRST_NAMES)
+        return "GET", f"/api/registrations/search?q={name[:rnd.randint(2, len(name))]}", {}
+
+    def stats(i):
+        return "GET", "/api/admin/stats", {"headers": auth(i)}
+
+    def assign(i):
+        registration_id = pending_ids[i % len(pending_ids)]
+        return "POST", f"/api/registrations/{registration_id}/assign", {
+            "json": {"teacher_id": rnd.choice(teacher_ids)}, "headers": auth(i)
+        }
+
+    def send_link(i):
+        registration_id = assigned_ids[i % len(assigned_ids)]
+        return "POST", f"/api/registrations/{registration_id}/send-link", {"headers": auth(i)}
+
+    return {"create": create, "list": listing, "search": search, "stats": stats,
+            "assign": assign, "send-link": send_link}
+
+
+def drain_outbox(args):
+    """
+    Send every queued email through the SMTP stand-in the way the dispatcher
+    does, timing each batch; throughput is emails per second.
+    """
+    from app.database import SessionLocal
+    from app.services.email_service import email_service
+    from app.services.notification_dispatcher import claim_batch, send_batch
+    from .smtp_stub import SMTPStub
+
+    batch_seconds, errors, sent = [], [], 0
+    db = SessionLocal()
+    try:
+        with SMTPStub(port=args.smtp_port) as stub:
+            started = time.perf_counter()
+            while True:
+                batch_started = time.perf_counter()
+                notifications = claim_batch(db, args.email_batch_size)
+                if not notifications:
+                    break
+                counts = send_batch(notifications)
+                db.commit()
+                batch_seconds.append(time.perf_counter() - batch_started)
+                sent += counts["sent"]
+                if counts["retried"] or counts["failed"]:
+                    errors.append(f"{counts['retried'] + counts['failed']} emails in a batch not sent")
+            elapsed = time.perf_counter() - started
+            email_service.pool.close_all()
+            received = len(stub.messages)
+    finally:
+        db.close()
+
+    summary = summarize(batch_seconds, elapsed, errors=errors)
+    summary.update(requests=sent, rps=round(sent / elapsed, 1) if elapsed else 0.0, received=received,
+                   batch_size=args.email_batch_size)
+    return summary
+
+
+def sample_ids(engine, teachers):
+    from sqlalchemy import select
+    from app.models import Registration, RegistrationStatus
+
+    with engine.connect() as conn:
+        def ids(status):
+            query = select(Registration.id).where(Registration.status == status).limit(2000)
+            return conn.execute(query).scalars().all()
+        return ids(RegistrationStatus.PENDING), ids(RegistrationStatus.TEACHER_ASSIGNED)
+
+
+def compare(result, baseline, max_regression_pct):
+    """Scenarios whose p95 or throughput regressed beyond the allowance"""
+    allowance = max_regression_pct / 100.0
+    regressions = []
+    for name, current in result["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + allowance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if before["rps"] and current["rps"] < before["rps"] * (1 - allowance):
+            regressions.append(f"{name}: throughput {before['rps']} -> {current['rps']} rps")
+    return regressions
+
+
+async def run_scenarios(app, factories, args):
+    results = {}
+    async with asgi_client(app) as client:
+        for name in args.scenarios:
+            if name not in factories:
+                continue
+            await drive(client, factories[name], min(args.warmup, args.requests), args.concurrency)
+            results[name] = await drive(client, factories[name], args.requests, args.concurrency)
+            print(f"{name:<10} {results[name]['rps']:>9} rps  p50 {results[name]['p50_ms']:>8} ms  "
+                  f"p95 {results[name]['p95_ms']:>8} ms  p99 {results[name]['p99_ms']:>8} ms  "
+                  f"errors {results[name]['errors']}", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k", help="registrations seeded")
+    parser.add_argument("--teachers", type=int, help="teachers seeded (default: one per 500 registrations, min 20)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=20, help="distinct admin tokens used in turn")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated round trip per statement")
+    parser.add_argument("--smtp-port", type=int, default=8025)
+    parser.add_argument("--email-batch-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1, help="random seed for request parameters")
+    parser.add_argument("--reuse-db", action="store_true",
+                        help="keep an already seeded SQLite database instead of reseeding")
+    parser.add_argument("--output", help="write the JSON result here (e.g. to save a baseline)")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--max-regression-pct", type=float, default=10.0)
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    issuer = LocalIssuer(tempfile.gettempdir())
+    database_url = configure_env(
+        AWS_COGNITO_USER_POOL_ID=USER_POOL_ID,
+        COGNITO_JWKS_URL=f"file://{issuer.jwks_path}",
+        SMTP_PORT=str(args.smtp_port),
+        # The production auth path: signature, expiry, issuer and group checks
+        ENVIRONMENT="production",
+        DEBUG="false",
+        METRICS_ENABLED="true",
+    )
+    rows = SCALES[args.scale]
+    teacher_count = args.teachers or max(20, rows // 500)
+
+    from app.database import engine
+    from app.models import Teacher
+    from sqlalchemy import inspect, select
+
+    seeded = args.reuse_db and inspect(engine).has_table(Teacher.__tablename__)
+    if not seeded:
+        engine.dispose()
+        reset_sqlite(database_url)
+        print(f"seeding {rows} registrations and {teacher_count} teachers", file=sys.stderr)
+        seed(engine, registrations=rows, teachers=teacher_count)
+    with engine.connect() as conn:
+        teacher_ids = conn.execute(select(Teacher.id)).scalars().all()
+    pending_ids, assigned_ids = sample_ids(engine, teacher_ids)
+
+    from app.main import app
+    if args.db_latency_ms:
+        add_simulated_latency("sync", args.db_latency_ms / 1000.0)
+
+    rnd = random.Random(args.seed)
+    tokens = [issuer.token(f"loadtest-admin-{i}") for i in range(args.tokens)]
+    factories = request_factories(rnd, tokens, teacher_ids, pending_ids, assigned_ids)
+    scenarios = asyncio.run(run_scenarios(app, factories, args))
+    if "email" in args.scenarios:
+        scenarios["email"] = drain_outbox(args)
+
+    result = {
+        "scale": args.scale,
+        "registrations": rows,
+        "teachers": len(teacher_ids),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "database": database_url.split(":", 1)[0],
+        "async": os.environ.get("DATABASE_ASYNC", "false"),
+        "scenarios": scenarios,
+    }
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    failed = [f"{name}: {s['errors']} errors, e.g. {s['error_samples'][:1]}"
+              for name, s in scenarios.items() if s["errors"]]
+    if args.baseline:
+        with open(args.baseline) as f:
+            failed += compare(result, json.load(f), args.max_regression_pct)
+    if failed:
+        print("FAIL:\n  " + "\n  ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
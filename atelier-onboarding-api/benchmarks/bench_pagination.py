@@ -0,0 +1,75 @@
+"""
+Page-N latency: OFFSET pagination vs keyset cursors on GET /api/registrations.
+
+Seeds `--rows` registrations (1M by default; seeding is skipped when the
+table already holds that many) and times one page at increasing depths.
+Keyset latency should stay flat while OFFSET grows with depth.
+
+    python -m benchmarks.bench_pagination --rows 1000000 --limit 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from .common import asgi_client, configure_env, seed
+
+
+async def time_page(client, path, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(path)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    configure_env()
+    from sqlalchemy import func, select
+    from app.database import Base, engine
+    from app.models import Registration
+    from app.pagination import encode_cursor
+    
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count(Registration.id))).scalar()
+    if existing != args.rows:
+        Base.metadata.drop_all(bind=engine)
+        print(f"seeding {args.rows} registrations...")
+        seed(engine, registrations=args.rows, teachers=50)
+    
+    from app.main import app
+    
+    depths = [d for d in (0, 1_000, 10_000, 100_000, args.rows // 2, args.rows - args.limit) if d < args.rows]
+    
+    async def run():
+        print(f"{'depth':>10} {'offset ms':>10} {'cursor ms':>10}")
+        async with asgi_client(app) as client:
+            for depth in sorted(set(depths)):
+                offset_ms = await time_page(client, f"/api/registrations?skip={depth}&limit={args.limit}", args.repeat)
+                if depth:
+                    with engine.connect() as conn:
+                        created_at, row_id = conn.execute(
+                            select(Registration.created_at, Registration.id)
+                            .order_by(Registration.created_at.desc(), Registration.id.desc())
+                            .offset(depth - 1).limit(1)
+                        ).one()
+                    path = f"/api/registrations?cursor={encode_cursor(created_at, row_id)}&limit={args.limit}"
+                else:
+                    path = f"/api/registrations?limit={args.limit}"
+                cursor_ms = await time_page(client, path, args.repeat)
+                print(f"{depth:>10} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+    
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
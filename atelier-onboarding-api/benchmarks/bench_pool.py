@@ -0,0 +1,157 @@
+"""
+Connection count under concurrency for each DATABASE_POOL_MODE.
+
+Starts --containers worker processes per mode (each one standing in for a
+Lambda container or a uvicorn worker), drives --concurrency concurrent
+requests through each, and reports how many database connections were open
+at peak next to the latency and checkout-wait cost of each mode.
+
+Against Postgres the peak is sampled from pg_stat_activity while the workers
+run; on SQLite it is the sum of each worker's peak open connections from
+app.db_pool.pool_metrics.
+
+    # uvicorn-style: one process, 50 concurrent requests
+    python -m benchmarks.bench_pool --containers 1 --concurrency 50
+    # Lambda burst: 20 containers serving one request at a time
+    python -m benchmarks.bench_pool --containers 20 --concurrency 1
+    DATABASE_URL=postgresql://localhost/atelier_bench python -m benchmarks.bench_pool
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from .bench_concurrency import add_simulated_latency, drive
+from .common import configure_env, reset_sqlite, seed
+
+MODES = ("queue", "single", "null")
+
+
+def run_worker(args):
+    configure_env()
+    from app.database import get_engine
+    from app.db_pool import pool_metrics
+    from app.main import app
+    
+    if args.db_latency_ms:
+        add_simulated_latency("sync", args.db_latency_ms / 1000.0)
+    
+    paths = ["/api/registrations?limit=20"] + [f"/api/registrations/{i}" for i in args.ids.split(",")]
+    result = asyncio.run(drive(app, paths, args.requests, args.concurrency))
+    result["pool"] = pool_metrics.snapshot()
+    get_engine().dispose()
+    print(json.dumps(result))
+
+
+class ServerConnectionSampler(threading.Thread):
+    """Polls pg_stat_activity for the number of connections to the benchmark database"""
+
+    def __init__(self, database_url, interval=0.02):
+        super().__init__(daemon=True)
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import NullPool
+        
+        self.engine = create_engine(database_url, poolclass=NullPool)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def run(self):
+        from sqlalchemy import text
+        
+        query = text(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        )
+        with self.engine.connect() as conn:
+            while not self._stop.is_set():
+                self.peak = max(self.peak, conn.execute(query).scalar())
+                time.sleep(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        self.join()
+        self.engine.dispose()
+
+
+def run_mode(mode, ids, args, database_url):
+    env = dict(os.environ, DATABASE_POOL_MODE=mode, DATABASE_ASYNC="false")
+    cmd = [sys.executable, "-m", "benchmarks.bench_pool", "--worker",
+           "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+           "--db-latency-ms", str(args.db_latency_ms), "--ids", ",".join(ids)]
+    
+    sampler = None
+    if database_url.startswith("postgresql"):
+        sampler = ServerConnectionSampler(database_url)
+        sampler.start()
+    
+    workers = [subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, text=True) for _ in range(args.containers)]
+    results = []
+    for worker in workers:
+        output, _ = worker.communicate()
+        if worker.returncode != 0:
+            raise RuntimeError(f"{mode} worker exited with {worker.returncode}")
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    
+    if sampler is not None:
+        sampler.stop()
+    
+    pools = [r["pool"] for r in results]
+    return {
+        "mode": mode,
+        "containers": args.containers,
+        "concurrency": args.concurrency,
+        "rps": round(sum(r["requests"] for r in results) / max(r["seconds"] for r in results), 1),
+        "p95_ms": max(r["p95_ms"] for r in results),
+        "peak_connections": sum(p["peak_open_connections"] for p in pools),
+        "server_peak_connections": sampler.peak if sampler is not None else None,
+        "connects": sum(p["connects"] for p in pools),
+        "wait_p95_ms": round(max(p["checkout_wait_p95_ms"] for p in pools), 3),
+        "wait_max_ms": round(max(p["checkout_wait_max_ms"] for p in pools), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--containers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=400, help="requests per container")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--ids", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        run_worker(args)
+        return
+    
+    database_url = configure_env()
+    reset_sqlite(database_url)
+    
+    from sqlalchemy import create_engine, select
+    from app.models import Registration
+    
+    engine = create_engine(database_url)
+    seed(engine, registrations=args.rows, teachers=20)
+    with engine.connect() as conn:
+        ids = conn.execute(select(Registration.id).limit(50)).scalars().all()
+    engine.dispose()
+    
+    results = [run_mode(mode, ids, args, database_url) for mode in args.modes.split(",")]
+    
+    print(f"{'mode':<7} {'rps':>8} {'p95 ms':>8} {'peak conns':>11} {'server peak':>12} {'connects':>9} {'wait p95 ms':>12} {'wait max ms':>12}")
+    for r in results:
+        server_peak = "n/a" if r["server_peak_connections"] is None else r["server_peak_connections"]
+        print(f"{r['mode']:<7} {r['rps']:>8} {r['p95_ms']:>8} {r['peak_connections']:>11} {server_peak:>12} "
+              f"{r['connects']:>9} {r['wait_p95_ms']:>12} {r['wait_max_ms']:>12}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
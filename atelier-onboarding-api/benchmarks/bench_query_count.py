@@ -0,0 +1,135 @@
+"""
+Statement counts and latency for the registration and teacher endpoints.
+
+Lists pages of increasing size and reports the SQL statements and time each
+costs; tests/test_query_count.py asserts the count stays constant (no
+per-row teacher lookups). Bulk assign/send-link are measured at increasing
+batch sizes the same way (tests/test_bulk.py asserts their counts), and so
+are conditional GETs answered with 304 (tests/test_http_cache.py holds them
+to the one counter lookup). Teacher and registration creates, and a
+refused duplicate teacher, are reported too (tests/test_create.py pins
+their counts).
+
+    python -m benchmarks.bench_query_count
+"""
+import asyncio
+import time
+
+from .common import StatementCounter, asgi_client, configure_env, reset_sqlite, seed
+
+PAGE_SIZES = (1, 10, 100, 500)
+BULK_SIZES = (1, 10, 100)
+DUPLICATED_EMAIL = "query.count@example.com"
+
+
+async def measure(app, engine, registration_id):
+    results = {}
+    async with asgi_client(app) as client:
+        for size in PAGE_SIZES:
+            with StatementCounter(engine) as counter:
+                started = time.perf_counter()
+                response = await client.get(f"/api/registrations?limit={size}")
+                elapsed = time.perf_counter() - started
+            assert response.status_code == 200 and len(response.json()) == size
+            results[f"list limit={size}"] = (counter.count, elapsed)
+        
+        with StatementCounter(engine) as counter:
+            started = time.perf_counter()
+            response = await client.get(f"/api/registrations/{registration_id}")
+            elapsed = time.perf_counter() - started
+        assert response.status_code == 200 and response.json()["id"] == registration_id
+        results["detail"] = (counter.count, elapsed)
+    return results
+
+
+async def measure_bulk(app, engine, teacher_id, pending_ids):
+    results = {}
+    async with asgi_client(app) as client:
+        start = 0
+        for size in BULK_SIZES:
+            ids = pending_ids[start:start + size]
+            start += size
+            for operation, body in (
+                ("assign", {"teacher_id": teacher_id, "registration_ids": ids}),
+                ("send-link", {"registration_ids": ids}),
+            ):
+                with StatementCounter(engine) as counter:
+                    started = time.perf_counter()
+                    response = await client.post(f"/api/registrations/bulk/{operation}", json=body)
+                    elapsed = time.perf_counter() - started
+                assert response.status_code == 200 and response.json()["succeeded"] == size
+                results[f"bulk {operation} n={size}"] = (counter.count, elapsed)
+    return results
+
+
+async def measure_conditional(app, engine, registration_id, teacher_id):
+    results = {}
+    async with asgi_client(app) as client:
+        for name, path in (
+            ("teachers", "/api/teachers"),
+            ("teacher", f"/api/teachers/{teacher_id}"),
+            ("registration", f"/api/registrations/{registration_id}"),
+        ):
+            etag = (await client.get(path)).headers["ETag"]
+            with StatementCounter(engine) as counter:
+                started = time.perf_counter()
+                response = await client.get(path, headers={"If-None-Match": etag})
+                elapsed = time.perf_counter() - started
+            assert response.status_code == 304, response.status_code
+            results[f"304 {name}"] = (counter.count, elapsed)
+    return results
+
+
+async def measure_create(app, engine):
+    results = {}
+    teacher = {"name": "Query Count", "email": DUPLICATED_EMAIL, "specialization": "Piano"}
+    registration = {
+        "student_name": "Query Count", "student_age": 9, "grade": "4",
+        "parent_name": "Query Parent", "email": "query.parent@example.com", "phone": "+15550000000",
+    }
+    async with asgi_client(app) as client:
+        for name, path, body, expected in (
+            ("create teacher", "/api/teachers", teacher, 201),
+            ("duplicate teacher", "/api/teachers", teacher, 400),
+            ("create registration", "/api/registrations", registration, 201),
+        ):
+            with StatementCounter(engine) as counter:
+                started = time.perf_counter()
+                response = await client.post(path, json=body)
+                elapsed = time.perf_counter() - started
+            assert response.status_code == expected, (name, response.status_code, response.text)
+            results[name] = (counter.count, elapsed)
+    return results
+
+
+def main():
+    database_url = configure_env()
+    reset_sqlite(database_url)
+    
+    from app.database import engine, async_engine
+    seed(engine, registrations=max(PAGE_SIZES) * 2, teachers=50)
+    
+    from app.main import app
+    from app.auth import require_admin
+    from app.models import Registration, RegistrationStatus, Teacher
+    from sqlalchemy import select
+    with engine.connect() as conn:
+        registration_id = conn.execute(
+            select(Registration.id).where(Registration.status != RegistrationStatus.PENDING).limit(1)
+        ).scalar_one()
+        pending_ids = conn.execute(
+            select(Registration.id).where(Registration.status == RegistrationStatus.PENDING).limit(sum(BULK_SIZES))
+        ).scalars().all()
+        teacher_id = conn.execute(select(Teacher.id).limit(1)).scalar_one()
+    
+    app.dependency_overrides[require_admin] = lambda: {"sub": "benchmark", "groups": ["Admins"]}
+    results = asyncio.run(measure(app, async_engine or engine, registration_id))
+    results.update(asyncio.run(measure_bulk(app, async_engine or engine, teacher_id, pending_ids)))
+    results.update(asyncio.run(measure_conditional(app, async_engine or engine, registration_id, teacher_id)))
+    results.update(asyncio.run(measure_create(app, async_engine or engine)))
+    for name, (count, elapsed) in results.items():
+        print(f"{name:<24} {count:>3} statements {elapsed * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Registration search: legacy ILIKE scan vs the indexed / ranked search paths.
+
+Times the original unescaped three-way ILIKE query, the `search` filter of
+GET /api/registrations and the ranked prefix search at
+GET /api/registrations/search. Point DATABASE_URL at Postgres (with the
+Alembic migrations applied) to see the pg_trgm indexes at work; on SQLite
+all paths are scans and only the ranking overhead shows.
+
+    python -m benchmarks.bench_search --rows 200000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from .common import asgi_client, configure_env, seed
+
+TERMS = ("patel", "maya", "gar", "walker.1", "zz-no-match")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    configure_env()
+    from sqlalchemy import func, select
+    from app.database import Base, engine
+    from app.models import Registration
+    
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count(Registration.id))).scalar()
+    if existing != args.rows:
+        Base.metadata.drop_all(bind=engine)
+        print(f"seeding {args.rows} registrations...")
+        seed(engine, registrations=args.rows, teachers=50)
+    
+    from app.main import app
+    
+    def legacy_scan(term):
+        pattern = f"%{term}%"
+        with engine.connect() as conn:
+            conn.execute(
+                select(Registration).where(
+                    Registration.student_name.ilike(pattern) |
+                    Registration.parent_name.ilike(pattern) |
+                    Registration.email.ilike(pattern)
+                ).limit(100)
+            ).all()
+    
+    async def run():
+        print(f"{'term':<14} {'legacy ms':>10} {'filter ms':>10} {'ranked ms':>10}")
+        async with asgi_client(app) as client:
+            for term in TERMS:
+                timings = []
+                for fn in (
+                    lambda: asyncio.to_thread(legacy_scan, term),
+                    lambda: client.get("/api/registrations", params={"search": term, "limit": 100}),
+                    lambda: client.get("/api/registrations/search", params={"q": term, "limit": 10}),
+                ):
+                    samples = []
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        await fn()
+                        samples.append(time.perf_counter() - started)
+                    timings.append(statistics.median(samples) * 1000)
+                print(f"{term:<14} {timings[0]:>10.2f} {timings[1]:>10.2f} {timings[2]:>10.2f}")
+    
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
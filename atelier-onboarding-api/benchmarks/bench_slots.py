@@ -0,0 +1,199 @@
+"""
+Free-teacher and demo slot search across hundreds of teachers.
+
+Generates --teachers teachers (default 500) with a few weekly windows, some
+time off, some extra hours and a handful of booked demos each, then answers
+the same questions two ways:
+
+index     AvailabilityIndex (interval trees, services/scheduling.py)
+scan      a linear scan over every teacher's windows, exceptions and demos
+
+for --queries random "who is free for a demo starting at T" lookups and a
+full week of slot search. Fails (exit status 1) if the answers ever differ.
+Finally times GET /api/teachers/slots for one week against the benchmark
+database.
+
+    python -m benchmarks.bench_slots
+    python -m benchmarks.bench_slots --teachers 1000 --queries 5000 --skip-db
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from .common import asgi_client, configure_env, reset_sqlite, seed
+
+WEEK_START = datetime(2026, 10, 19, tzinfo=timezone.utc)  # a Monday
+
+
+def availability(teacher_ids, seed=11):
+    """teacher_availability-shaped rows and (teacher_id, scheduled_at) bookings"""
+    from app.models import AvailabilityKind
+
+    rnd = random.Random(seed)
+    rows, bookings = [], []
+    for teacher_id in teacher_ids:
+        for weekday in rnd.sample(range(7), rnd.randint(3, 6)):
+            start = rnd.randrange(6 * 60, 18 * 60, 30)
+            rows.append(SimpleNamespace(
+                teacher_id=teacher_id, kind=AvailabilityKind.WEEKLY.value, weekday=weekday,
+                start_minute=start, end_minute=min(start + rnd.choice((120, 180, 240, 360)), 24 * 60),
+                starts_at=None, ends_at=None
+            ))
+        for kind in (AvailabilityKind.UNAVAILABLE, AvailabilityKind.AVAILABLE):
+            if rnd.random() < 0.3:
+                starts_at = WEEK_START + timedelta(minutes=rnd.randrange(0, 7 * 24 * 60, 30))
+                rows.append(SimpleNamespace(
+                    teacher_id=teacher_id, kind=kind.value, weekday=None, start_minute=None, end_minute=None,
+                    starts_at=starts_at, ends_at=starts_at + timedelta(hours=rnd.randint(1, 8))
+                ))
+        for _ in range(rnd.randint(0, 4)):
+            bookings.append((teacher_id, WEEK_START + timedelta(minutes=rnd.randrange(0, 7 * 24 * 60, 30))))
+    return rows, bookings
+
+
+class LinearScan:
+    """The obvious implementation: check every teacher for every question"""
+
+    def __init__(self, rows, bookings, duration):
+        self.duration = duration
+        self.teachers = {}
+        for row in rows:
+            self.teachers.setdefault(row.teacher_id, {"weekly": [], "extra": [], "blocked": [], "booked": []})
+            entry = self.teachers[row.teacher_id]
+            if row.weekday is not None:
+                entry["weekly"].append((row.weekday, row.start_minute, row.end_minute))
+            elif row.kind == "available":
+                entry["extra"].append((row.starts_at, row.ends_at))
+            else:
+                entry["blocked"].append((row.starts_at, row.ends_at))
+        for teacher_id, scheduled_at in bookings:
+            if teacher_id in self.teachers:
+                self.teachers[teacher_id]["booked"].append((scheduled_at, scheduled_at + duration))
+
+    @staticmethod
+    def weekly_covers(windows, start, end):
+        # Walk the windows day by day so ones that touch across midnight chain together
+        minute = start
+        while minute < end:
+            day_start = minute.replace(hour=0, minute=0, second=0, microsecond=0)
+            offset = (minute - day_start).seconds // 60
+            reach = None
+            for weekday, first, last in windows:
+                if weekday == minute.weekday() and first <= offset < last:
+                    reach = max(reach or 0, last)
+            if reach is None:
+                return False
+            minute = day_start + timedelta(minutes=reach)
+        return True
+
+    def free(self, start, end):
+        found = set()
+        for teacher_id, entry in self.teachers.items():
+            covered = self.weekly_covers(entry["weekly"], start, end) or any(
+                first <= start and end <= last for first, last in entry["extra"]
+            )
+            if not covered:
+                continue
+            if any(first < end and start < last for first, last in entry["blocked"] + entry["booked"]):
+                continue
+            found.add(teacher_id)
+        return found
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+async def time_api(app, params):
+    async with asgi_client(app) as client:
+        started = time.perf_counter()
+        response = await client.get("/api/teachers/slots", params=params)
+        elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.text
+    return response.json(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--skip-db", action="store_true", help="only compare the in-memory searches")
+    args = parser.parse_args()
+
+    database_url = configure_env()
+    from app.services.scheduling import AvailabilityIndex, IntervalTree, demo_duration, epoch_minute
+
+    duration = demo_duration()
+    teacher_ids = [f"teacher-{i}" for i in range(args.teachers)]
+    rows, bookings = availability(teacher_ids)
+    scan = LinearScan(rows, bookings, duration)
+
+    index, build = timed(AvailabilityIndex, rows)
+    booked = IntervalTree([
+        (epoch_minute(at), epoch_minute(at + duration), teacher_id) for teacher_id, at in bookings
+    ])
+    print(f"{len(rows)} availability rows, {len(bookings)} booked demos; index built in {build * 1000:.1f} ms")
+
+    rnd = random.Random(3)
+    starts = [WEEK_START + timedelta(minutes=rnd.randrange(0, 7 * 24 * 60, 30)) for _ in range(args.queries)]
+    expected, scan_elapsed = timed(lambda: [scan.free(start, start + duration) for start in starts])
+    actual, index_elapsed = timed(lambda: [index.free(start, start + duration, booked) for start in starts])
+
+    week_end = WEEK_START + timedelta(days=7)
+    slots, slot_elapsed = timed(index.slots, WEEK_START, week_end, booked)
+    print(f"{'search':<26} {'index ms':>10} {'scan ms':>10} {'speedup':>8}")
+    print(f"{'free at T (per query)':<26} {index_elapsed / args.queries * 1000:>10.3f} "
+          f"{scan_elapsed / args.queries * 1000:>10.3f} {scan_elapsed / index_elapsed:>7.1f}x")
+
+    step = timedelta(minutes=30)
+    slot_starts = [WEEK_START + step * i for i in range(int((week_end - duration - WEEK_START) / step) + 1)]
+    scan_slots, scan_slot_elapsed = timed(lambda: [
+        (start, free) for start in slot_starts for free in [scan.free(start, start + duration)] if free
+    ])
+    print(f"{'slots over a week':<26} {slot_elapsed * 1000:>10.1f} {scan_slot_elapsed * 1000:>10.1f} "
+          f"{scan_slot_elapsed / slot_elapsed:>7.1f}x")
+
+    if actual != expected or [(start, set(ids)) for start, _, ids in slots] != scan_slots:
+        print("FAIL: index and linear scan disagree")
+        sys.exit(1)
+    print("OK: index matches linear scan")
+
+    if args.skip_db:
+        return
+
+    reset_sqlite(database_url)
+    from app.database import engine
+    from app.main import app
+    from app.models import Registration, RegistrationStatus, TeacherAvailability
+
+    teachers = seed(engine, registrations=0, teachers=args.teachers)
+    renamed = dict(zip(teacher_ids, (t["id"] for t in teachers)))
+    with engine.begin() as conn:
+        conn.execute(TeacherAvailability.__table__.insert(), [
+            {**vars(row), "id": f"availability-{i}", "teacher_id": renamed[row.teacher_id]}
+            for i, row in enumerate(rows)
+        ])
+        conn.execute(Registration.__table__.insert(), [
+            {
+                "id": f"booking-{i}", "student_name": "Booked", "student_age": 10, "grade": "5",
+                "parent_name": "Parent", "email": f"booking{i}@example.com", "phone": "0",
+                "status": RegistrationStatus.LINK_SENT, "teacher_id": renamed[teacher_id],
+                "demo_scheduled_at": at
+            }
+            for i, (teacher_id, at) in enumerate(bookings)
+        ])
+
+    params = {"start": WEEK_START.isoformat(), "end": week_end.isoformat()}
+    for label in ("cold", "cached"):
+        body, elapsed = asyncio.run(time_api(app, params))
+        print(f"GET /api/teachers/slots (one week, {label} index): {len(body)} slots in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
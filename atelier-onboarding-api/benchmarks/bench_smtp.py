@@ -0,0 +1,64 @@
+"""
+SMTP throughput against the local stand-in: single-shot vs pooled vs batched.
+
+single-shot  a new connection per message (the previous EmailService behaviour)
+pooled       EmailService.deliver() per message over the connection pool
+send_many    EmailService.send_many() in batches of --batch-size
+
+The stand-in has no TLS or AUTH, so real providers widen the gap further:
+each single-shot message there also pays for STARTTLS and login.
+
+    python -m benchmarks.bench_smtp --messages 2000
+"""
+import argparse
+import smtplib
+import time
+
+from .common import configure_env
+from .smtp_stub import SMTPStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    
+    configure_env(SMTP_PORT=str(args.port))
+    from app.services.email_service import EmailService
+    
+    service = EmailService()
+    messages = [
+        (f"parent{i}@example.com", "Registration Confirmed", f"<p>Hello {i}</p>", f"Hello {i}")
+        for i in range(args.messages)
+    ]
+    
+    def single_shot():
+        for message in messages:
+            with smtplib.SMTP(service.smtp_host, service.smtp_port) as server:
+                server.sendmail(service.from_email, [message[0]], service.build_message(*message))
+    
+    def pooled():
+        for message in messages:
+            service.deliver(*message)
+    
+    def batched():
+        for i in range(0, len(messages), args.batch_size):
+            errors = service.send_many(messages[i:i + args.batch_size])
+            assert not any(errors), errors
+    
+    with SMTPStub(port=args.port) as stub:
+        print(f"{'mode':<12} {'msgs/s':>10}")
+        for name, fn in (("single-shot", single_shot), ("pooled", pooled), ("send_many", batched)):
+            received = len(stub.messages)
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            assert len(stub.messages) - received == len(messages)
+            print(f"{name:<12} {len(messages) / elapsed:>10.1f}")
+        service.pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Email render throughput: inline f-strings vs compiled templates.
+
+f-string     the previous EmailService behaviour, formatting the whole body inline
+render       EmailTemplate.render() per message
+render_many  EmailTemplate.render_many() over the whole batch
+mime         render_many() plus the wire bytes of the message, built on the
+             prebuilt MIME skeleton (EmailService.build_message)
+
+Both template modes also HTML-escape the personalised values, which the
+f-string baseline never did, so CPython's compiled f-strings stay ahead on
+raw string building.
+
+    python -m benchmarks.bench_templates --messages 20000
+"""
+import argparse
+import time
+
+from .common import configure_env
+
+
+def fstring_registration_confirmation(student_name, parent_name):
+    subject = "Registration Confirmed - Ashish Patel Atelier"
+    
+    html_body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <h2 style="color: #d63c35;">Thank You for Registering!</h2>
+            <p>Dear {parent_name},</p>
+            <p>Thank you for registering <strong>{student_name}</strong> for a demo class at Ashish Patel Atelier.</p>
+            <p>We have received your registration and our team will review it shortly. You will receive another email once we assign a teacher and schedule your demo class.</p>
+            <div style="background-color: #f0f9ff; padding: 15px; border-left: 4px solid #0ba5e9; margin: 20px 0;">
+                <h3 style="margin-top: 0; color: #0ba5e9;">What Happens Next?</h3>
+                <ol>
+                    <li>Our team will review your registration</li>
+                    <li>We'll assign the best teacher for your child</li>
+                    <li>You'll receive an email with teacher details and demo class link</li>
+                    <li>Join your free demo class and start the art journey!</li>
+                </ol>
+            </div>
+            <p>If you have any questions, please don't hesitate to contact us.</p>
+            <p style="margin-top: 30px;">
+                Best regards,<br>
+                <strong>Ashish Patel Atelier Team</strong><br>
+                <a href="https://ashishpatelatelier.com" style="color: #d63c35;">ashishpatelatelier.com</a>
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    text_body = f"""
+    Thank You for Registering!
+    
+    Dear {parent_name},
+    
+    Thank you for registering {student_name} for a demo class at Ashish Patel Atelier.
+    
+    We have received your registration and our team will review it shortly. You will receive another email once we assign a teacher and schedule your demo class.
+    
+    What Happens Next?
+    1. Our team will review your registration
+    2. We'll assign the best teacher for your child
+    3. You'll receive an email with teacher details and demo class link
+    4. Join your free demo class and start the art journey!
+    
+    If you have any questions, please don't hesitate to contact us.
+    
+    Best regards,
+    Ashish Patel Atelier Team
+    https://ashishpatelatelier.com
+    """
+    
+    return subject, html_body, text_body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    
+    configure_env()
+    from app.services.email_service import EmailService
+    from app.services.email_templates import REGISTRATION_CONFIRMATION
+    
+    service = EmailService()
+    
+    rows = [
+        {"student_name": f"Student {i}", "parent_name": f"Parent {i} & Family"}
+        for i in range(args.messages)
+    ]
+    
+    def fstring():
+        for row in rows:
+            fstring_registration_confirmation(**row)
+    
+    def render():
+        for row in rows:
+            REGISTRATION_CONFIRMATION.render(**row)
+    
+    def render_many():
+        for _ in REGISTRATION_CONFIRMATION.render_many(rows):
+            pass
+    
+    def mime():
+        for subject, html_body, text_body in REGISTRATION_CONFIRMATION.render_many(rows):
+            service.build_message("parent@example.com", subject, html_body, text_body)
+    
+    _, html_body, _ = REGISTRATION_CONFIRMATION.render(student_name="<b>x</b>", parent_name="A & B")
+    assert "&lt;b&gt;x&lt;/b&gt;" in html_body and "A &amp; B" in html_body, "values must be HTML-escaped"
+    
+    print(f"{'mode':<12} {'msgs/s':>12}")
+    for name, fn in (("f-string", fstring), ("render", render), ("render_many", render_many), ("mime", mime)):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<12} {len(rows) / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Id storage: text UUIDv4 (before) against native UUIDv4 and UUIDv7 (after).
+
+Builds one registrations-shaped table per variant (id primary key, indexed
+teacher_id, (created_at, id) index) and inserts --rows rows into each in
+--batch sized transactions, then reports:
+
+- insert throughput (rows/s over the whole load, so page splits late in the
+  load count);
+- the size of each index (pg_relation_size on Postgres, dbstat on SQLite);
+- primary key and teacher_id lookup throughput over --lookups random ids.
+
+Postgres is the backend that matters (native uuid is 16 bytes against 37 for
+the text); SQLite stores sqlalchemy.Uuid as 32 hex characters, so its gain
+is small. Exits with status 1 if the UUIDv7 primary key index is not smaller
+than the text one.
+
+    python -m benchmarks.bench_uuid --rows 1000000
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_uuid --rows 1000000
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def variants():
+    from sqlalchemy import String
+    from app.models import UUIDText, new_id
+
+    return (
+        ("text uuid4", String(), lambda: str(uuid.uuid4())),
+        ("uuid uuid4", UUIDText, lambda: str(uuid.uuid4())),
+        ("uuid uuid7", UUIDText, new_id),
+    )
+
+
+def build_table(metadata, name, id_type):
+    from sqlalchemy import Column, DateTime, Index, String, Table
+
+    return Table(
+        name, metadata,
+        Column("id", id_type, primary_key=True),
+        Column("teacher_id", id_type),
+        Column("student_name", String, nullable=False),
+        Column("created_at", DateTime(timezone=True), nullable=False),
+        Index(f"ix_{name}_teacher_id", "teacher_id"),
+        Index(f"ix_{name}_created_at_id", "created_at", "id"),
+    )
+
+
+def index_sizes(conn, table):
+    from sqlalchemy import text
+
+    if conn.dialect.name == "postgresql":
+        rows = conn.execute(text(
+            "SELECT indexrelid::regclass::text, pg_relation_size(indexrelid) FROM pg_index "
+            "WHERE indrelid = CAST(:table AS regclass)"
+        ), {"table": table.name})
+    else:
+        rows = conn.execute(text(
+            "SELECT d.name, SUM(d.pgsize) FROM dbstat d JOIN sqlite_master m ON m.name = d.name "
+            "WHERE m.type = 'index' AND m.tbl_name = :table GROUP BY d.name"
+        ), {"table": table.name})
+    sizes = {}
+    for name, size in rows:
+        # Postgres names the key index <table>_pkey, SQLite sqlite_autoindex_<table>_1
+        sizes["primary key" if "pkey" in name or "autoindex" in name else name.split(table.name + "_")[-1]] = size
+    return sizes
+
+
+def load(engine, table, make_id, rows, batch, teacher_ids):
+    rnd = random.Random(11)
+    start = datetime(2024, 1, 1)
+    ids = []
+    started = time.perf_counter()
+    for offset in range(0, rows, batch):
+        chunk = [
+            {
+                "id": make_id(),
+                "teacher_id": rnd.choice(teacher_ids),
+                "student_name": f"Student {offset + i}",
+                "created_at": start + timedelta(seconds=offset + i),
+            }
+            for i in range(min(batch, rows - offset))
+        ]
+        with engine.begin() as conn:
+            conn.execute(table.insert(), chunk)
+        ids.extend(row["id"] for row in chunk)
+    return rows / (time.perf_counter() - started), ids
+
+
+def lookups(engine, table, ids, teacher_ids, count):
+    from sqlalchemy import bindparam, select
+
+    rnd = random.Random(13)
+    by_id = select(table.c.id, table.c.student_name).where(table.c.id == bindparam("id"))
+    by_teacher = select(table.c.id).where(table.c.teacher_id == bindparam("teacher_id")).limit(20)
+    rates = {}
+    with engine.connect() as conn:
+        for name, statement, key, values in (
+            ("id", by_id, "id", ids), ("teacher_id", by_teacher, "teacher_id", teacher_ids),
+        ):
+            sample = [rnd.choice(values) for _ in range(count)]
+            started = time.perf_counter()
+            for value in sample:
+                if not conn.execute(statement, {key: value}).first():
+                    raise RuntimeError(f"{table.name}: no row for {key} {value}")
+            rates[name] = count / (time.perf_counter() - started)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=5000, help="rows per insert transaction")
+    parser.add_argument("--teachers", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=20000, help="point queries per lookup kind")
+    args = parser.parse_args()
+
+    from .common import configure_env, reset_sqlite
+    database_url = configure_env()
+    reset_sqlite(database_url)
+    from sqlalchemy import MetaData
+    from app.database import engine
+
+    metadata = MetaData()
+    results = {}
+    for name, id_type, make_id in variants():
+        table = build_table(metadata, "bench_ids_" + name.replace(" ", "_"), id_type)
+        table.drop(engine, checkfirst=True)
+        table.create(engine)
+        teacher_ids = [make_id() for _ in range(args.teachers)]
+        insert_rate, ids = load(engine, table, make_id, args.rows, args.batch, teacher_ids)
+        with engine.connect() as conn:
+            sizes = index_sizes(conn, table)
+        rates = lookups(engine, table, ids, teacher_ids, args.lookups)
+        results[name] = sizes
+        print(f"{name:<11} insert {insert_rate:>9.0f} rows/s  lookup by id {rates['id']:>8.0f}/s  "
+              f"by teacher_id {rates['teacher_id']:>8.0f}/s")
+        for index, size in sorted(sizes.items()):
+            print(f"{'':<11} {index:<16} {size / 2 ** 20:>8.1f} MiB")
+        table.drop(engine)
+
+    before, after = results["text uuid4"]["primary key"], results["uuid uuid7"]["primary key"]
+    print(f"primary key index: {before / 2 ** 20:.1f} MiB as text, {after / 2 ** 20:.1f} MiB as uuid7 "
+          f"({(1 - after / before) * 100:.0f}% smaller)")
+    if after >= before:
+        print("FAIL: the native uuid primary key index is not smaller than the text one")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
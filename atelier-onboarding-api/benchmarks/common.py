@@ -0,0 +1,160 @@
+"""
+Shared setup for the local benchmarks.
+
+Benchmarks run against a throwaway database (SQLite by default, or any
+DATABASE_URL) and must configure the environment before `app` is imported,
+since settings are read at import time.
+"""
+import os
+import random
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+BENCH_ENV = {
+    "AWS_COGNITO_USER_POOL_ID": "us-east-1_benchmark",
+    "AWS_COGNITO_CLIENT_ID": "benchmark",
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": "8025",
+    "SMTP_USER": "",
+    "SMTP_PASSWORD": "",
+    "SMTP_USE_TLS": "false",
+    "FROM_EMAIL": "noreply@example.com",
+    "ENVIRONMENT": "development",
+    "DEBUG": "true",
+}
+
+FIRST_NAMES = ["Aarav", "Maya", "Liam", "Zara", "Noah", "Isla", "Arjun", "Emma", "Leo", "Sofia"]
+LAST_NAMES = ["Patel", "Smith", "Garcia", "Khan", "Rossi", "Nguyen", "Brown", "Silva", "Kim", "Walker"]
+INTERESTS = ["Drawing", "Painting", "Sculpture", "Portraits", "Landscapes", "Still Life"]
+TIMES = ["Morning (8 AM - 12 PM)", "Afternoon (12 PM - 4 PM)", "Evening (4 PM - 8 PM)", "Weekend"]
+
+
+def configure_env(database_url=None, **overrides):
+    """Populate settings env vars and put the API package on sys.path"""
+    if database_url is None:
+        database_url = os.environ.get("DATABASE_URL") or \
+            f"sqlite:///{os.path.join(tempfile.gettempdir(), 'atelier_bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    for key, value in {**BENCH_ENV, **overrides}.items():
+        os.environ.setdefault(key, str(value))
+    
+    api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    return database_url
+
+
+def reset_sqlite(database_url):
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def registration_rows(count, teacher_ids=(), seed=42):
+    """Yield plain dicts of synthetic registrations, oldest first"""
+    from app.models import RegistrationStatus, ExperienceLevel
+    
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    statuses = list(RegistrationStatus)
+    levels = list(ExperienceLevel)
+    for i in range(count):
+        student = f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+        parent = f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+        status = rnd.choice(statuses)
+        teacher_id = rnd.choice(teacher_ids) if teacher_ids and status != RegistrationStatus.PENDING else None
+        yield {
+            "id": str(uuid.uuid4()),
+            "student_name": student,
+            "student_age": rnd.randint(4, 18),
+            "grade": str(rnd.randint(1, 12)),
+            "parent_name": parent,
+            "email": f"{parent.split()[0].lower()}.{i}@example.com",
+            "phone": f"+1555{i:07d}",
+            "preferred_time": rnd.choice(TIMES),
+            "experience_level": rnd.choice(levels),
+            "interests": rnd.sample(INTERESTS, 2),
+            "additional_notes": None,
+            "status": status if teacher_id or status == RegistrationStatus.PENDING else RegistrationStatus.PENDING,
+            "teacher_id": teacher_id,
+            "created_at": start + timedelta(seconds=i * 30),
+        }
+
+
+def teacher_rows(count, seed=7):
+    rnd = random.Random(seed)
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+            "email": f"teacher{i}@example.com",
+            "specialization": rnd.choice(INTERESTS),
+            "experience_years": rnd.randint(1, 30),
+            "availability": rnd.choice(TIMES),
+        }
+
+
+def seed(engine, registrations=1000, teachers=20, batch_size=5000):
+    """Create the schema and bulk insert synthetic teachers and registrations"""
+    from app.database import Base
+    from app.models import Registration, Teacher
+    
+    Base.metadata.create_all(bind=engine)
+    teacher_list = list(teacher_rows(teachers))
+    with engine.begin() as conn:
+        if teacher_list:
+            conn.execute(Teacher.__table__.insert(), teacher_list)
+        batch = []
+        for row in registration_rows(registrations, [t["id"] for t in teacher_list]):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.execute(Registration.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(Registration.__table__.insert(), batch)
+    
+    # Bring the per-teacher workload counters in line with the seeded rows
+    from sqlalchemy.orm import Session
+    from app.services.workload import reconcile
+    with Session(engine) as session:
+        reconcile(session)
+    return teacher_list
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class StatementCounter:
+    """Count SQL statements executed on an engine (sync or async) while active"""
+
+    def __init__(self, engine):
+        self.engine = getattr(engine, "sync_engine", engine)
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def asgi_client(app):
+    import httpx
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
@@ -0,0 +1,73 @@
+"""
+Local SMTP stand-in built on aiosmtpd (pip install aiosmtpd).
+
+Accepts everything without TLS or AUTH (except recipients listed in
+`rejected`, refused with 550) and keeps the received envelopes in memory. Point the app at it with SMTP_HOST/SMTP_PORT, SMTP_USE_TLS=false and
+an empty SMTP_USER.
+
+    python -m benchmarks.smtp_stub --port 8025     # run standalone
+"""
+import argparse
+import threading
+import time
+
+
+class RecordingHandler:
+    def __init__(self, rejected=()):
+        self.messages = []
+        self.rejected = set(rejected)
+        self._lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejected:
+            return "550 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+class SMTPStub:
+    """Context manager running an aiosmtpd server in a background thread"""
+
+    def __init__(self, host="127.0.0.1", port=8025, rejected=()):
+        self.host = host
+        self.port = port
+        self.handler = RecordingHandler(rejected)
+        self._controller = None
+
+    @property
+    def messages(self):
+        return self.handler.messages
+
+    def __enter__(self):
+        from aiosmtpd.controller import Controller
+        self._controller = Controller(self.handler, hostname=self.host, port=self.port)
+        self._controller.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._controller.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SMTP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    
+    with SMTPStub(args.host, args.port) as stub:
+        print(f"SMTP stub listening on {args.host}:{args.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"{len(stub.messages)} messages received")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
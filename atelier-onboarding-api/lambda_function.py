@@ -2,3 +2,10 @@ from app.main import handler
 
 # AWS Lambda entry point
 lambda_handler = handler
+
+
+def notification_handler(event, context):
+    """Scheduled Lambda entry point that drains the notification outbox"""
+    # Imported on first call so the API function never loads the dispatcher or SMTP code
+    from app.services.notification_dispatcher import lambda_handler as dispatch_notifications
+    return dispatch_notifications(event, context)
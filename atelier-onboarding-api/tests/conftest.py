@@ -0,0 +1,106 @@
+"""
+Test setup: settings are read when `app` is imported, so the environment is
+configured here first.
+
+Tests run against a throwaway SQLite file with foreign keys enforced, or
+against TEST_DATABASE_URL (e.g. a local PostgreSQL) when it is set. The
+schema is dropped and recreated for every test that uses the `database`
+fixture.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import StatementCounter, configure_env, seed  # noqa: E402
+
+DATABASE_URL = configure_env(
+    os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'atelier_test.db')}"
+)
+
+from sqlalchemy import event  # noqa: E402
+
+from app import database  # noqa: E402
+from app.schema import create_schema  # noqa: E402
+
+ADMIN = {"sub": "test-admin", "groups": ["Admins"]}
+
+
+def enforce_foreign_keys(engine):
+    # SQLite ignores REFERENCES unless asked, which hides FK ordering bugs that fail on Postgres
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _foreign_keys_on(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+
+enforce_foreign_keys(database.get_engine())
+if database.get_async_engine() is not None:
+    enforce_foreign_keys(database.get_async_engine().sync_engine)
+
+
+def count_statements() -> StatementCounter:
+    """Counts the statements the app runs for requests made while it is active"""
+    return StatementCounter(database.get_async_engine() or database.get_engine())
+
+
+class FakeClock:
+    """A clock for the auth caches that only moves when a test moves it"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+requires_postgres = pytest.mark.skipif(
+    database.database_backend() != "postgresql", reason="needs TEST_DATABASE_URL pointing at PostgreSQL"
+)
+
+
+@pytest.fixture
+def engine():
+    """The app's sync engine on a freshly created schema"""
+    from app.cache import stats_cache
+
+    create_schema(database.get_engine(), drop=True)
+    stats_cache.invalidate()
+    return database.get_engine()
+
+
+@pytest.fixture
+def teachers(engine):
+    """Seeded teachers (and 200 registrations) as plain dicts"""
+    return seed(engine, registrations=200, teachers=5)
+
+
+@pytest.fixture
+def client(engine):
+    from fastapi.testclient import TestClient
+    from app.auth import require_admin
+    from app.main import app
+
+    app.dependency_overrides[require_admin] = lambda: ADMIN
+    # One event loop for the whole test, so pooled asyncpg connections stay usable
+    with TestClient(app) as client:
+        yield client
+        if database.get_async_engine() is not None:
+            client.portal.call(database.get_async_engine().dispose)
+    app.dependency_overrides.pop(require_admin, None)
+
+
+
+@pytest.fixture(scope="session")
+def issuer(tmp_path_factory):
+    """An RSA key pair standing in for the Cognito user pool (needs jose and rsa)"""
+    pytest.importorskip("jose")
+    pytest.importorskip("rsa")
+    from benchmarks.bench_load import LocalIssuer
+
+    return LocalIssuer(str(tmp_path_factory.mktemp("jwks")))
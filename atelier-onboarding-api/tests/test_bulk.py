@@ -0,0 +1,46 @@
+from sqlalchemy import select
+
+from app.models import Registration, RegistrationStatus
+from app.routers.registrations import demo_link_for
+from conftest import count_statements
+
+
+def pending_ids(engine, limit):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(Registration.id).where(Registration.status == RegistrationStatus.PENDING).limit(limit)
+        ).scalars().all()
+
+
+def test_bulk_send_link_matches_single_send(client, engine, teachers):
+    ids = pending_ids(engine, 4)
+    assigned = client.post("/api/registrations/bulk/assign", json={"teacher_id": teachers[0]["id"], "registration_ids": ids})
+    assert assigned.json()["succeeded"] == len(ids)
+
+    sent = client.post("/api/registrations/bulk/send-link", json={"registration_ids": ids[1:]})
+    assert sent.json()["succeeded"] == len(ids) - 1
+    assert client.post(f"/api/registrations/{ids[0]}/send-link").status_code == 200
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(Registration.id, Registration.demo_link, Registration.status).where(Registration.id.in_(ids))
+        ).all()
+    # Dashed ids in every link, whatever the backend stores
+    assert {row.id: row.demo_link for row in rows} == {registration_id: demo_link_for(registration_id) for registration_id in ids}
+    assert {row.status for row in rows} == {RegistrationStatus.LINK_SENT}
+
+
+def test_bulk_statements_do_not_grow_with_the_batch(client, engine, teachers):
+    ids = pending_ids(engine, 1 + 10 + 50)
+    batches = [ids[:1], ids[1:11], ids[11:]]
+    for path, body in (
+        ("/api/registrations/bulk/assign", {"teacher_id": teachers[0]["id"]}),
+        ("/api/registrations/bulk/send-link", {}),
+    ):
+        counts = set()
+        for batch in batches:
+            with count_statements() as counter:
+                response = client.post(path, json={**body, "registration_ids": batch})
+            assert response.json()["succeeded"] == len(batch), response.text
+            counts.add(counter.count)
+        assert len(counts) == 1, (path, counts)
@@ -0,0 +1,91 @@
+from sqlalchemy import insert, select
+
+from app.models import Registration, RegistrationStatus
+from conftest import requires_postgres
+
+FIELDS = ("grade", "status", "teacher_id")
+
+
+def follow(client, token, copy, page_size=3):
+    """Apply every page of the feed after `token` to `copy`; returns the next token"""
+    while True:
+        params = {"limit": page_size, **({"since": token} if token else {})}
+        body = client.get("/api/registrations/changes", params=params).json()
+        for row in body["changes"]:
+            copy[row["id"]] = {field: row[field] for field in FIELDS}
+        for registration_id in body["deleted"]:
+            copy.pop(registration_id, None)
+        token = body["next"]
+        if not body["has_more"]:
+            return token
+
+
+def table(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(select(Registration.id, *(getattr(Registration, field) for field in FIELDS)))
+        return {
+            row.id: {field: getattr(row, field).value if field == "status" else getattr(row, field) for field in FIELDS}
+            for row in rows
+        }
+
+
+def registration_row(registration_id, name):
+    return {
+        "id": registration_id, "student_name": name, "student_age": 8, "grade": "3",
+        "parent_name": "Feed Parent", "email": f"{name.lower()}@example.com", "phone": "+15550000000",
+        "status": RegistrationStatus.PENDING,
+    }
+
+
+def test_follower_copy_matches_table(client, engine, teachers):
+    copy = {}
+    token = follow(client, None, copy)
+    assert copy == table(engine)
+
+    # Pending rows, so the assign is allowed (completed ones are refused)
+    ids = [registration_id for registration_id, row in copy.items() if row["status"] == RegistrationStatus.PENDING.value]
+    assert client.put(f"/api/registrations/{ids[0]}", json={"grade": "12"}).status_code == 200
+    assert client.post(f"/api/registrations/{ids[1]}/assign", json={"teacher_id": teachers[0]["id"]}).status_code == 200
+    assert client.delete(f"/api/registrations/{ids[2]}").status_code == 200
+    created = client.post("/api/registrations", json={
+        "student_name": "Feed Student", "student_age": 7, "grade": "2",
+        "parent_name": "Feed Parent", "email": "feed@example.com", "phone": "+15550000000",
+    }).json()["id"]
+
+    moved = {}
+    token = follow(client, token, moved)
+
+    assert set(moved) == {ids[0], ids[1], created}
+    copy.update(moved)
+    copy.pop(ids[2])
+    assert copy == table(engine)
+
+    # Caught up: the same token yields nothing new
+    assert follow(client, token, {}) == token
+
+
+@requires_postgres
+def test_commit_out_of_position_order_is_not_skipped(client, engine):
+    """
+    A transaction that started writing first (lower position) commits after
+    a later one: the feed must hold the later row back rather than move its
+    token past the earlier one.
+    """
+    first, second = "0190a1b2-0000-7000-8000-000000000001", "0190a1b2-0000-7000-8000-000000000002"
+    copy = {}
+    token = follow(client, None, copy)
+
+    with engine.connect() as early, engine.connect() as late:
+        early.execute(insert(Registration).values(registration_row(first, "Early")))
+        # Would wait on the early writer if positions were handed out under a lock
+        late.exec_driver_sql("SET LOCAL lock_timeout = '2s'")
+        late.execute(insert(Registration).values(registration_row(second, "Late")))
+        late.commit()
+
+        token = follow(client, token, copy)
+        assert second not in copy
+        early.commit()
+
+    follow(client, token, copy)
+    assert {first, second} <= set(copy)
+    assert copy == table(engine)
@@ -0,0 +1,41 @@
+from sqlalchemy import func, select
+
+from app.models import Teacher
+from app.services.idempotency import IDEMPOTENCY_HEADER
+from conftest import count_statements
+
+TEACHER = {"name": "Create Teacher", "email": "create.teacher@example.com", "specialization": "Piano"}
+REGISTRATION = {
+    "student_name": "Create Student", "student_age": 9, "grade": "4",
+    "parent_name": "Create Parent", "email": "create.parent@example.com", "phone": "+15550000000",
+}
+
+
+def post(client, path, body, expected, headers=None):
+    with count_statements() as counter:
+        response = client.post(path, json=body, headers=headers or {})
+    assert response.status_code == expected, response.text
+    return counter.count
+
+
+def test_teacher_create_is_one_insert_and_the_bump(client, engine):
+    assert post(client, "/api/teachers", TEACHER, 201) == 2
+    # Refused by the unique index: nothing committed, so nothing bumped
+    assert post(client, "/api/teachers", TEACHER, 400) == 1
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).where(Teacher.email == TEACHER["email"])) == 1
+
+
+def test_registration_create_statements(client, engine):
+    # The row, its confirmation email and the bump
+    assert post(client, "/api/registrations", REGISTRATION, 201) == 3
+    # The insert hits the natural key and the existing row is read back
+    assert post(client, "/api/registrations", REGISTRATION, 201) == 2
+
+
+def test_keyed_registration_create_statements(client, engine):
+    headers = {IDEMPOTENCY_HEADER: "create-statements"}
+    # Plus the key lookup and the key claim
+    assert post(client, "/api/registrations", REGISTRATION, 201, headers) == 5
+    # A replay is the key lookup alone
+    assert post(client, "/api/registrations", REGISTRATION, 201, headers) == 1
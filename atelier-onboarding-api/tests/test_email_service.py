@@ -0,0 +1,33 @@
+from email import message_from_bytes, policy
+
+import pytest
+
+from app.services.email_service import EmailService
+
+
+def parse(raw: bytes):
+    return message_from_bytes(raw, policy=policy.default)
+
+
+def test_built_message_round_trips():
+    service = EmailService()
+    raw = service.build_message("parent@example.com", "Démo prête", "<p>Olá &amp; bem-vindo</p>", "Olá & bem-vindo")
+
+    message = parse(raw)
+    assert message["From"] == service.from_email
+    assert message["To"] == "parent@example.com"
+    assert message["Subject"] == "Démo prête"
+    assert message.get_content_type() == "multipart/alternative"
+    text, html = message.iter_parts()
+    assert (text.get_content_type(), text.get_content()) == ("text/plain", "Olá & bem-vindo")
+    assert (html.get_content_type(), html.get_content()) == ("text/html", "<p>Olá &amp; bem-vindo</p>")
+
+
+def test_html_only_message():
+    message = parse(EmailService().build_message("parent@example.com", "Hello", "<p>Hello</p>"))
+    assert [part.get_content_type() for part in message.iter_parts()] == ["text/html"]
+
+
+def test_header_line_breaks_are_refused():
+    with pytest.raises(ValueError):
+        EmailService().build_message("parent@example.com\r\nBcc: someone@example.com", "Hello", "<p>Hello</p>")
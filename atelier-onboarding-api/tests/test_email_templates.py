@@ -0,0 +1,33 @@
+import pytest
+
+from app.services.email_templates import REGISTRATION_CONFIRMATION, TEACHER_ASSIGNMENT
+
+HOSTILE = {"parent_name": "<script>", "student_name": "A & B"}
+ASSIGNMENT = {**HOSTILE, "teacher_name": "Teacher <T>", "demo_link": "https://example.com/demo/1?a=1&b=2"}
+
+
+@pytest.mark.parametrize("template, values", [
+    (REGISTRATION_CONFIRMATION, HOSTILE),
+    (TEACHER_ASSIGNMENT, ASSIGNMENT),
+])
+def test_html_is_escaped_and_text_is_not(template, values):
+    _, html_body, text_body = template.render(**values)
+
+    assert "&lt;script&gt;" in html_body and "<script>" not in html_body
+    assert "A &amp; B" in html_body and "A & B" not in html_body
+    assert "<script>" in text_body and "A & B" in text_body
+    assert "&lt;" not in text_body and "&amp;" not in text_body
+
+
+@pytest.mark.parametrize("template, values", [
+    (REGISTRATION_CONFIRMATION, HOSTILE),
+    (TEACHER_ASSIGNMENT, ASSIGNMENT),
+])
+def test_render_many_matches_render(template, values):
+    rows = [{**values, "student_name": f"{values['student_name']} {i}"} for i in range(5)]
+    assert list(template.render_many(rows)) == [template.render(**row) for row in rows]
+
+
+def test_every_placeholder_is_required():
+    with pytest.raises(KeyError):
+        TEACHER_ASSIGNMENT.render(**HOSTILE)
@@ -0,0 +1,53 @@
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models import Registration, Teacher
+from conftest import count_statements, requires_postgres
+
+
+def test_etag_moves_after_a_committed_write(client, teachers):
+    first = client.get("/api/teachers")
+    etag = first.headers["ETag"]
+    assert client.get("/api/teachers", headers={"If-None-Match": etag}).status_code == 304
+
+    teacher_id = teachers[0]["id"]
+    assert client.put(f"/api/teachers/{teacher_id}", json={"name": "Renamed Teacher"}).status_code == 200
+
+    second = client.get("/api/teachers", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
+
+
+def test_not_modified_is_one_counter_lookup(client, teachers):
+    registration_id = client.get("/api/registrations", params={"limit": 1}).json()[0]["id"]
+    for path in ("/api/teachers", f"/api/teachers/{teachers[0]['id']}", f"/api/registrations/{registration_id}"):
+        etag = client.get(path).headers["ETag"]
+        with count_statements() as counter:
+            response = client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert counter.count == 1, path
+
+
+def test_rolled_back_write_keeps_the_etag(client, teachers):
+    etag = client.get("/api/teachers").headers["ETag"]
+    with SessionLocal() as db:
+        db.execute(update(Teacher).where(Teacher.id == teachers[0]["id"]).values(name="Never Committed"))
+        db.rollback()
+    assert client.get("/api/teachers", headers={"If-None-Match": etag}).status_code == 304
+
+
+@requires_postgres
+def test_open_writers_do_not_queue_on_the_counters(client, teachers):
+    """Two transactions writing the same versioned tables stay open side by side"""
+    with SessionLocal() as early, SessionLocal() as late:
+        late.connection().exec_driver_sql("SET LOCAL lock_timeout = '2s'")
+        early.execute(update(Teacher).where(Teacher.id == teachers[0]["id"]).values(name="Early"))
+        early.execute(update(Registration).where(Registration.teacher_id == teachers[0]["id"]).values(grade="11"))
+        # Would time out if the open early transaction held the counter rows
+        late.execute(update(Teacher).where(Teacher.id == teachers[1]["id"]).values(name="Late"))
+        late.execute(update(Registration).where(Registration.teacher_id == teachers[1]["id"]).values(grade="12"))
+        etag = client.get("/api/teachers").headers["ETag"]
+        late.commit()
+        early.commit()
+
+    assert client.get("/api/teachers", headers={"If-None-Match": etag}).status_code == 200
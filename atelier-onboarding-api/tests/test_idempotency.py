@@ -0,0 +1,60 @@
+from sqlalchemy import func, select
+
+from app.models import IdempotencyKey, Notification, Registration
+from app.services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+
+BODY = {
+    "student_name": "Maya Patel", "student_age": 9, "grade": "4",
+    "parent_name": "Arjun Patel", "email": "arjun.patel@example.com", "phone": "+15550000001",
+}
+
+
+def count(engine, model):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(model))
+
+
+def test_keyed_post_creates_once_and_replays(client, engine):
+    headers = {IDEMPOTENCY_HEADER: "form-submit-1"}
+
+    created = client.post("/api/registrations", json=BODY, headers=headers)
+    assert created.status_code == 201, created.text
+    assert REPLAYED_HEADER not in created.headers
+
+    replayed = client.post("/api/registrations", json=BODY, headers=headers)
+    assert replayed.status_code == 201, replayed.text
+    assert replayed.headers[REPLAYED_HEADER] == "true"
+    assert replayed.json() == created.json()
+
+    assert count(engine, Registration) == 1
+    assert count(engine, Notification) == 1
+    with engine.connect() as conn:
+        assert conn.scalar(select(IdempotencyKey.registration_id)) == created.json()["id"]
+
+
+def test_key_reused_for_another_body_is_refused(client, engine):
+    headers = {IDEMPOTENCY_HEADER: "form-submit-2"}
+    assert client.post("/api/registrations", json=BODY, headers=headers).status_code == 201
+
+    refused = client.post("/api/registrations", json={**BODY, "student_name": "Leo Patel"}, headers=headers)
+    assert refused.status_code == 422
+    assert count(engine, Registration) == 1
+
+
+def test_resubmitted_form_without_key_replays(client, engine):
+    created = client.post("/api/registrations", json=BODY)
+    replayed = client.post("/api/registrations", json={**BODY, "email": BODY["email"].upper()})
+
+    assert replayed.headers[REPLAYED_HEADER] == "true"
+    assert replayed.json()["id"] == created.json()["id"]
+    assert count(engine, Registration) == 1
+    assert count(engine, Notification) == 1
+
+
+def test_natural_duplicate_under_a_new_key_replays(client, engine):
+    created = client.post("/api/registrations", json=BODY, headers={IDEMPOTENCY_HEADER: "first"})
+    replayed = client.post("/api/registrations", json=BODY, headers={IDEMPOTENCY_HEADER: "second"})
+
+    assert replayed.headers[REPLAYED_HEADER] == "true"
+    assert replayed.json()["id"] == created.json()["id"]
+    assert count(engine, Registration) == 1
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import Notification, NotificationStatus, new_id
+
+
+def test_one_flush_inserts_several_rows(engine):
+    ids = [new_id() for _ in range(3)]
+    with SessionLocal() as db:
+        for notification_id in ids:
+            db.add(Notification(
+                id=notification_id, recipient_email="ids@example.com", subject="Ids", body="<p>Ids</p>",
+                status=NotificationStatus.PENDING.value, attempts=0, next_attempt_at=datetime.now(timezone.utc)
+            ))
+        db.commit()
+        # Server defaults come back matched to their rows, ids still plain dashed strings
+        assert all(notification.created_at is not None for notification in db.identity_map.values())
+
+    with engine.connect() as conn:
+        assert sorted(conn.execute(select(Notification.id)).scalars()) == sorted(ids)
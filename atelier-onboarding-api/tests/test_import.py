@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Notification, NotificationStatus, Registration, RegistrationStatus
+
+CSV = (
+    "student_name,student_age,grade,parent_name,email,phone,interests,additional_notes\r\n"
+    "Csv One,9,4,Parent One,csv.one@example.com,+15550000101,piano;drawing,\r\n"
+    "Csv Too Old,40,4,Parent Two,csv.two@example.com,+15550000102,,\r\n"
+    "Csv Short,9,4,Parent Three\r\n"
+    'Csv Three,11,6,Parent Four,csv.three@example.com,+15550000103,,"Prefers\nweekends"\r\n'
+    "Csv Bad Email,10,5,Parent Five,not-an-email,+15550000104,,\r\n"
+    "Csv Four,12,7,Parent Six,csv.four@example.com,+15550000105,guitar,\r\n"
+)
+
+NDJSON = "\n".join([
+    json.dumps({"student_name": "Nd One", "student_age": 8, "grade": "3", "parent_name": "Nd Parent",
+                "email": "nd.one@example.com", "phone": "+15550000201", "interests": ["violin"]}),
+    '{"student_name": "Nd Broken",',
+    "",
+    json.dumps(["not", "an", "object"]),
+    json.dumps({"student_name": "Nd Missing", "student_age": 8, "grade": "3"}),
+    json.dumps({"student_name": "Nd Two", "student_age": 15, "grade": "10", "parent_name": "Nd Parent",
+                "email": "nd.two@example.com", "phone": "+15550000202"}),
+]) + "\n"
+
+
+@pytest.mark.parametrize("content_type, body, imported, failed_rows", [
+    ("text/csv", CSV, ["csv.four@example.com", "csv.one@example.com", "csv.three@example.com"], [2, 3, 5]),
+    ("application/x-ndjson", NDJSON, ["nd.one@example.com", "nd.two@example.com"], [2, 3, 4]),
+])
+def test_import_writes_valid_rows_and_reports_the_rest(client, engine, content_type, body, imported, failed_rows):
+    response = client.post(
+        "/api/registrations/import",
+        params={"chunk_size": 2},
+        content=body.encode(),
+        headers={"Content-Type": content_type}
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["total"] == len(imported) + len(failed_rows)
+    assert result["imported"] == len(imported)
+    assert result["failed"] == len(failed_rows)
+    assert [error["row"] for error in result["errors"]] == failed_rows
+    assert all(error["errors"] for error in result["errors"])
+
+    with engine.connect() as conn:
+        registrations = conn.execute(select(Registration.id, Registration.email, Registration.status)).all()
+        notifications = conn.execute(select(Notification.registration_id, Notification.recipient_email, Notification.status)).all()
+    assert sorted(row.email for row in registrations) == imported
+    assert {row.status for row in registrations} == {RegistrationStatus.PENDING}
+
+    # One queued confirmation per imported row, none sent inline
+    assert sorted((row.registration_id, row.recipient_email) for row in notifications) == sorted(
+        (row.id, row.email) for row in registrations
+    )
+    assert {row.status for row in notifications} == {NotificationStatus.PENDING.value}
+
+
+def test_import_needs_a_known_format(client):
+    response = client.post("/api/registrations/import", content=b"{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 415
+    assert client.post("/api/registrations/import?format=ndjson", content=b"").json() == {
+        "total": 0, "imported": 0, "failed": 0, "errors": []
+    }
@@ -0,0 +1,81 @@
+import json
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.instrumentation import RequestMetricsMiddleware, registry, span
+from conftest import count_statements
+
+TIMING_ENTRY = re.compile(r'^(\w+);dur=(\d+\.\d\d)(?:;desc="(\d+) queries")?$')
+
+
+def timings(response):
+    entries = {}
+    for entry in response.headers["Server-Timing"].split(", "):
+        match = TIMING_ENTRY.match(entry)
+        assert match, entry
+        entries[match[1]] = (float(match[2]), match[3] and int(match[3]))
+    return entries
+
+
+def test_server_timing_splits_app_and_db(client, teachers):
+    registration_id = client.get("/api/registrations", params={"limit": 1}).json()[0]["id"]
+    with count_statements() as counter:
+        response = client.get(f"/api/registrations/{registration_id}")
+    assert response.status_code == 200
+
+    entries = timings(response)
+    assert list(entries)[:3] == ["total", "app", "db"]
+    (total, _), (app, _), (db, queries) = entries["total"], entries["app"], entries["db"]
+    assert queries == counter.count > 0
+    assert abs(total - (app + db)) <= 0.02
+
+
+def test_metrics_are_labelled_by_route_template(client, teachers):
+    ids = [row["id"] for row in client.get("/api/registrations", params={"limit": 2}).json()]
+    registry.reset()
+    for registration_id in ids:
+        assert client.get(f"/api/registrations/{registration_id}").status_code == 200
+    assert client.get("/api/no-such-route").status_code == 404
+
+    text = client.get("/api/admin/metrics").text
+    route = 'method="GET",route="/api/registrations/{registration_id}"'
+    assert f'http_request_duration_seconds_count{{{route},status="200"}} 2' in text
+    assert f'http_request_duration_seconds_bucket{{{route},status="200",le="+Inf"}} 2' in text
+    assert re.search(rf'^http_request_sql_statements_total\{{{re.escape(route)}\}} [1-9]\d*$', text, re.M)
+    assert 'route="unmatched",status="404"' in text
+    for registration_id in ids:
+        assert registration_id not in text
+
+
+def test_one_emf_line_per_request(monkeypatch, capsys):
+    monkeypatch.setattr(settings, "METRICS_EMF_ENABLED", True)
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        with span("lookup"):
+            return {"id": item_id}
+
+    capsys.readouterr()
+    with TestClient(app) as client:
+        for item_id in (1, 2, 3):
+            assert client.get(f"/items/{item_id}").status_code == 200
+        assert client.get("/items/not-a-number").status_code == 422
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 4
+    events = [json.loads(line) for line in lines]
+    assert [(event["Route"], event["Method"], event["Status"]) for event in events] == (
+        [("/items/{item_id}", "GET", 200)] * 3 + [("/items/{item_id}", "GET", 422)]
+    )
+    directive = events[0]["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == settings.METRICS_NAMESPACE
+    assert directive["Dimensions"] == [["Route", "Method"]]
+    assert [metric["Name"] for metric in directive["Metrics"]] == ["Latency", "SqlCount", "SqlTime", "lookup"]
+    for event in events[:3]:
+        assert event["SqlCount"] == 0
+        assert event["Latency"] >= event["lookup"] >= 0
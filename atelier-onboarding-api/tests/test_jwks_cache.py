@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from app.auth import JWKSCache, get_cognito_public_keys
+from app.config import settings
+from benchmarks.bench_load import KEY_ID
+from conftest import FakeClock
+
+
+class KeySource:
+    """Injected fetch_keys: serves the issuer's JWKS, counts fetches, fails on demand"""
+
+    def __init__(self, issuer):
+        with open(issuer.jwks_path) as f:
+            self.keys = json.load(f)["keys"]
+        self.fetches = 0
+        self.failing = False
+
+    def __call__(self):
+        self.fetches += 1
+        if self.failing:
+            raise ConnectionError("JWKS endpoint unreachable")
+        return self.keys
+
+
+@pytest.fixture
+def source(issuer):
+    return KeySource(issuer)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(source, clock):
+    return JWKSCache(source, ttl_seconds=60, min_refresh_interval=10, clock=clock)
+
+
+def test_keys_are_reused_within_the_ttl(cache, source, clock):
+    assert cache.lookup(KEY_ID) is None
+    key = cache.get_key(KEY_ID)
+    assert key is not None
+
+    clock.now += 59
+    assert cache.lookup(KEY_ID) is key
+    assert cache.get_key(KEY_ID) is key
+    assert source.fetches == 1
+
+
+def test_keys_refresh_after_the_ttl(cache, source, clock):
+    cache.get_key(KEY_ID)
+    clock.now += 60
+    # Stale: lookup does no I/O, get_key fetches again
+    assert cache.lookup(KEY_ID) is None
+    assert cache.get_key(KEY_ID) is not None
+    assert source.fetches == 2
+
+
+def test_unknown_kid_refreshes_once_per_interval(cache, source, clock):
+    cache.get_key(KEY_ID)
+    # The first fetch counts towards the interval too
+    clock.now += 9
+    assert cache.get_key("rotated-key") is None
+    assert source.fetches == 1
+    clock.now += 1
+    assert cache.get_key("rotated-key") is None
+    assert source.fetches == 2
+
+    # Bogus kids within the interval do not reach the endpoint
+    for _ in range(5):
+        assert cache.get_key("rotated-key") is None
+    clock.now += 9
+    assert cache.get_key("another-key") is None
+    assert source.fetches == 2
+    assert cache.get_key(KEY_ID) is not None
+
+    clock.now += 1
+    cache.get_key("rotated-key")
+    assert source.fetches == 3
+
+
+def test_failed_refresh_keeps_the_stale_keys(cache, source, clock):
+    key = cache.get_key(KEY_ID)
+    source.failing = True
+    clock.now += 61
+    assert cache.get_key(KEY_ID) is key
+    assert source.fetches == 2
+
+    # The failed attempt is rate-limited like any other
+    assert cache.get_key(KEY_ID) is key
+    assert source.fetches == 2
+
+    source.failing = False
+    clock.now += 10
+    assert cache.get_key(KEY_ID) is not None
+    assert source.fetches == 3
+    # Fresh again after the successful refresh
+    assert cache.lookup(KEY_ID) is not None
+
+
+def test_jwks_from_a_file_url(issuer, monkeypatch):
+    monkeypatch.setattr(settings, "COGNITO_JWKS_URL", f"file://{issuer.jwks_path}")
+    assert [key["kid"] for key in get_cognito_public_keys()] == [KEY_ID]
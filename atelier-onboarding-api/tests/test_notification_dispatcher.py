@@ -0,0 +1,90 @@
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Notification, NotificationStatus
+from app.services.email_service import email_service
+from app.services.notification_dispatcher import dispatch_pending, retry_delay
+from app.services.outbox import enqueue_email
+from app.services.scheduling import as_utc
+
+pytest.importorskip("aiosmtpd")
+
+from benchmarks.smtp_stub import SMTPStub  # noqa: E402
+
+BOUNCING = "bounce@example.com"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(engine, monkeypatch):
+    """The SMTP stand-in, refusing BOUNCING, with the app's email service pointed at it"""
+    with SMTPStub(port=free_port(), rejected={BOUNCING}) as stub:
+        monkeypatch.setattr(email_service, "smtp_host", stub.host)
+        monkeypatch.setattr(email_service, "smtp_port", stub.port)
+        monkeypatch.setattr(email_service, "use_tls", False)
+        monkeypatch.setattr(email_service, "smtp_user", "")
+        email_service.pool.close_all()
+        yield stub
+        email_service.pool.close_all()
+
+
+def queue(*recipients):
+    with SessionLocal() as db:
+        ids = [enqueue_email(db, to, "Hello", "<p>Hello</p>", "Hello").id for to in recipients]
+        db.commit()
+    return ids
+
+
+def notifications(engine):
+    with engine.connect() as conn:
+        return {row.recipient_email: row for row in conn.execute(select(Notification.__table__))}
+
+
+def test_dispatch_sends_and_backs_off(smtp, engine, monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_MAX_ATTEMPTS", 2)
+    queue("one@example.com", "two@example.com", BOUNCING)
+
+    started = datetime.now(timezone.utc)
+    assert dispatch_pending() == {"sent": 2, "retried": 1, "failed": 0}
+    assert sorted(rcpt for message in smtp.messages for rcpt in message.rcpt_tos) == ["one@example.com", "two@example.com"]
+
+    rows = notifications(engine)
+    for recipient in ("one@example.com", "two@example.com"):
+        assert rows[recipient].status == NotificationStatus.SENT.value
+        assert rows[recipient].sent_at is not None
+        assert rows[recipient].attempts == 1
+    bounced = rows[BOUNCING]
+    assert bounced.status == NotificationStatus.PENDING.value
+    assert bounced.attempts == 1
+    assert bounced.sent_at is None
+    assert "550" in bounced.error_message
+    retry_at = as_utc(bounced.next_attempt_at)
+    assert started + retry_delay(1) <= retry_at <= datetime.now(timezone.utc) + retry_delay(1)
+
+    # Not due yet: nothing to do
+    assert dispatch_pending() == {"sent": 0, "retried": 0, "failed": 0}
+
+    with engine.begin() as conn:
+        conn.execute(update(Notification).values(next_attempt_at=started - timedelta(seconds=1)))
+    assert dispatch_pending() == {"sent": 0, "retried": 0, "failed": 1}
+    bounced = notifications(engine)[BOUNCING]
+    assert bounced.status == NotificationStatus.FAILED.value
+    assert bounced.attempts == 2
+    assert "550" in bounced.error_message
+    assert len(smtp.messages) == 2
+
+
+def test_retry_delay_doubles_up_to_an_hour():
+    base = timedelta(seconds=settings.NOTIFICATION_RETRY_BASE_SECONDS)
+    assert [retry_delay(attempts) for attempts in (1, 2, 3)] == [base, 2 * base, 4 * base]
+    assert retry_delay(30) == timedelta(hours=1)
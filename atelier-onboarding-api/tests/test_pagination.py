@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from app.models import Registration, RegistrationStatus, new_id
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+def walk(client, path, limit, max_pages=100):
+    ids, cursor = [], None
+    for _ in range(max_pages):
+        response = client.get(path, params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        ids.extend(row["id"] for row in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+    raise AssertionError(f"{path} still had a next cursor after {max_pages} pages")
+
+
+def test_cursor_pages_cover_every_row_once(client, teachers):
+    ids = walk(client, "/api/registrations", limit=7)
+    assert len(ids) == len(set(ids)) == 200
+
+
+def test_cursor_breaks_created_at_ties_by_id(client, engine):
+    created_at = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            "id": new_id(), "student_name": f"Student {i}", "student_age": 8, "grade": "3",
+            "parent_name": "Parent", "email": f"tie{i}@example.com", "phone": "+15550000000",
+            "status": RegistrationStatus.PENDING, "created_at": created_at,
+        }
+        for i in range(10)
+    ]
+    with engine.begin() as conn:
+        conn.execute(Registration.__table__.insert(), rows)
+
+    ids = walk(client, "/api/registrations", limit=3)
+    assert sorted(ids) == sorted(row["id"] for row in rows)
@@ -0,0 +1,26 @@
+from conftest import count_statements
+
+
+def statements(client, path, **params):
+    with count_statements() as counter:
+        response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return counter.count, response.json()
+
+
+def test_list_costs_the_same_at_every_page_size(client, teachers):
+    counts = set()
+    for limit in (1, 10, 100):
+        count, rows = statements(client, "/api/registrations", limit=limit)
+        assert len(rows) == limit
+        # Teacher names come with the page, not one lookup per row
+        assert all("teacher_name" in row for row in rows)
+        counts.add(count)
+    assert len(counts) == 1
+
+
+def test_detail_is_the_etag_lookup_and_the_row(client, teachers):
+    _, rows = statements(client, "/api/registrations", limit=1)
+    count, row = statements(client, f"/api/registrations/{rows[0]['id']}")
+    assert row["id"] == rows[0]["id"]
+    assert count == 2
@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/api/teachers/free", "/api/teachers/slots"])
+@pytest.mark.parametrize("start, end", [
+    ("2030-01-07T15:00:00Z", "2030-01-07T17:00:00"),
+    ("2030-01-07T15:00:00", "2030-01-07T17:00:00+00:00"),
+    ("2030-01-07T15:00:00+05:30", "2030-01-07T17:00:00"),
+])
+def test_search_window_mixes_naive_and_offset_times(client, teachers, path, start, end):
+    assert client.get(path, params={"start": start, "end": end}).status_code == 200
+
+
+def test_window_is_compared_in_utc(client, teachers):
+    # 15:00+05:30 is 09:30 UTC, so a naive (UTC) 09:00 end comes before it
+    response = client.get("/api/teachers/free", params={"start": "2030-01-07T15:00:00+05:30", "end": "2030-01-07T09:00:00"})
+    assert response.status_code == 400
+
+
+def test_free_defaults_end_from_an_offset_start(client, teachers):
+    assert client.get("/api/teachers/free", params={"start": "2030-01-07T15:00:00-08:00"}).status_code == 200
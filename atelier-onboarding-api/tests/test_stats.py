@@ -0,0 +1,74 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.cache import stats_cache
+from app.models import Registration, RegistrationStatus
+from app.services.scheduling import as_utc
+from conftest import count_statements
+
+
+def expected_stats(engine, days=30):
+    with engine.connect() as conn:
+        rows = conn.execute(select(Registration.status, Registration.teacher_id, Registration.created_at)).all()
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    by_status = Counter({s.value: 0 for s in RegistrationStatus})
+    by_status.update(row.status.value for row in rows)
+    by_teacher = Counter(row.teacher_id for row in rows if row.teacher_id is not None)
+    by_day = Counter(as_utc(row.created_at).date() for row in rows if as_utc(row.created_at).date() >= since)
+    return {
+        "total_registrations": len(rows),
+        "pending_assignments": by_status[RegistrationStatus.PENDING.value],
+        "teachers_assigned": sum(by_teacher.values()),
+        "completed_demos": by_status[RegistrationStatus.COMPLETED.value],
+        "by_status": dict(by_status),
+        "by_teacher": dict(by_teacher),
+        "by_day": {day.isoformat(): count for day, count in by_day.items()},
+    }
+
+
+def get_stats(client):
+    response = client.get("/api/admin/stats")
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    stats["by_teacher"] = {row["teacher_id"]: row["count"] for row in stats["by_teacher"]}
+    stats["by_day"] = {row["day"]: row["count"] for row in stats["by_day"]}
+    return stats
+
+
+def test_stats_are_one_statement_and_match_the_rows(client, engine, teachers):
+    with count_statements() as counter:
+        stats = get_stats(client)
+    assert counter.count == 1
+    assert stats == expected_stats(engine)
+
+    # Then served from the cache
+    with count_statements() as counter:
+        assert get_stats(client) == stats
+    assert counter.count == 0
+
+
+def pending_id(engine):
+    with engine.connect() as conn:
+        return conn.scalar(select(Registration.id).where(Registration.status == RegistrationStatus.PENDING).limit(1))
+
+
+def test_registration_writes_invalidate_the_stats(client, engine, teachers):
+    registration_id = pending_id(engine)
+    writes = [
+        ("post", "/api/registrations", {
+            "student_name": "Stats Student", "student_age": 9, "grade": "4", "parent_name": "Stats Parent",
+            "email": "stats.parent@example.com", "phone": "+15550000001",
+        }),
+        ("post", f"/api/registrations/{registration_id}/assign", {"teacher_id": teachers[0]["id"]}),
+        ("post", f"/api/registrations/{registration_id}/send-link", None),
+        ("put", f"/api/registrations/{registration_id}", {"status": RegistrationStatus.COMPLETED.value}),
+    ]
+    for method, path, body in writes:
+        get_stats(client)
+        assert stats_cache.get(30) is not None
+        response = client.request(method, path, json=body)
+        assert response.status_code in (200, 201), (path, response.text)
+        assert stats_cache.get(30) is None, path
+        assert get_stats(client) == expected_stats(engine), path
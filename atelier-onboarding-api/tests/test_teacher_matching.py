@@ -0,0 +1,88 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+
+from app.database import database_backend
+from app.models import ExperienceLevel, Registration, RegistrationStatus, Teacher
+from app.services.teacher_matching import solve
+from conftest import count_statements
+
+
+def registrations(count, interest="piano", preferred_time="Weekday evenings"):
+    return [
+        SimpleNamespace(
+            id=f"r{i}", interests=[interest], preferred_time=preferred_time, experience_level=ExperienceLevel.BEGINNER
+        )
+        for i in range(count)
+    ]
+
+
+def teacher(teacher_id, capacity, specialization="Piano", availability="Evenings"):
+    return SimpleNamespace(
+        id=teacher_id, specialization=specialization, availability=availability, experience_years=5, capacity=capacity
+    )
+
+
+def test_capacity_is_never_exceeded():
+    teachers = [teacher("a", 5), teacher("b", 10), teacher("c", 4)]
+    loads = {"a": 3, "c": 4}
+    placed = solve(registrations(30), teachers, loads)
+
+    per_teacher = Counter(teacher_id for teacher_id, _ in placed.values())
+    assert per_teacher == {"a": 2, "b": 10}
+    assert len(placed) == 12
+
+
+def test_load_is_balanced_across_equal_fit_teachers():
+    teachers = [teacher("a", 50), teacher("b", 50), teacher("c", 50)]
+    placed = solve(registrations(30), teachers, {})
+    assert Counter(teacher_id for teacher_id, _ in placed.values()) == {"a": 10, "b": 10, "c": 10}
+
+    # A teacher who is already busy is filled last
+    placed = solve(registrations(10), teachers, {"a": 10})
+    assert Counter(teacher_id for teacher_id, _ in placed.values()) == {"b": 5, "c": 5}
+
+
+def test_better_fit_wins_over_balance():
+    teachers = [teacher("piano", 50), teacher("drawing", 50, specialization="Drawing")]
+    placed = solve(registrations(4), teachers, {})
+    assert {teacher_id for teacher_id, _ in placed.values()} == {"piano"}
+    assert {fit for _, fit in placed.values()} == {80}
+
+
+def pending(engine):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).where(Registration.status == RegistrationStatus.PENDING))
+
+
+def test_dry_run_writes_nothing_and_locks_nothing(client, engine, teachers):
+    before = pending(engine)
+    with count_statements() as counter:
+        response = client.post("/api/admin/auto-assign", params={"dry_run": "true"})
+    assert response.status_code == 200, response.text
+    assert response.json()["assigned"] > 0
+
+    assert pending(engine) == before
+    assert not [statement for statement in counter.statements if "FOR UPDATE" in statement.upper()]
+    assert [statement.split()[0].upper() for statement in counter.statements] == ["SELECT"] * counter.count
+
+
+def test_run_saves_one_update_per_teacher(client, engine, teachers):
+    before = pending(engine)
+    with count_statements() as counter:
+        result = client.post("/api/admin/auto-assign").json()
+
+    assert result["assigned"] > 0
+    assigned_to = Counter(assignment["teacher_id"] for assignment in result["assignments"])
+    updates = [statement for statement in counter.statements if statement.upper().startswith("UPDATE REGISTRATIONS")]
+    assert len(updates) == len(assigned_to)
+    assert pending(engine) == before - result["assigned"]
+    if database_backend() == "postgresql":
+        # The saving run does lock the backlog it read
+        assert any("FOR UPDATE SKIP LOCKED" in statement for statement in counter.statements)
+
+    with engine.connect() as conn:
+        loads = dict(conn.execute(select(Teacher.id, Teacher.active_load)).all())
+    for row in result["teacher_loads"]:
+        assert loads[row["teacher_id"]] == row["after"] <= row["capacity"]
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from fastapi import Depends, FastAPI
+
+from app import auth
+from app.auth import JWKSCache, VerifiedTokenCache, require_admin, require_role
+from app.config import settings
+from benchmarks.bench_load import KEY_ID
+from conftest import FakeClock
+
+USER = {"username": "cached-admin", "groups": ["Admins"], "role": "admin"}
+
+
+def test_entries_drop_once_the_token_expires():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(max_size=4, clock=clock)
+    cache.put("token", USER, exp=clock.now + 30)
+
+    clock.now += 29
+    assert cache.get("token") == USER
+    clock.now += 1
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "max_size": 4, "hits": 1, "misses": 1, "evictions": 0, "expirations": 1}
+
+
+def test_least_recently_used_entry_is_evicted_at_max_size():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(max_size=2, clock=clock)
+    cache.put("first", {**USER, "username": "first"}, exp=clock.now + 60)
+    cache.put("second", {**USER, "username": "second"}, exp=clock.now + 60)
+    # Touching first makes second the oldest
+    assert cache.get("first")["username"] == "first"
+    cache.put("third", {**USER, "username": "third"}, exp=clock.now + 60)
+
+    assert cache.get("second") is None
+    assert [cache.get(token)["username"] for token in ("first", "third")] == ["first", "third"]
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1, "evictions": 1, "expirations": 0}
+
+
+def test_cached_user_info_is_a_copy():
+    cache = VerifiedTokenCache(max_size=2)
+    cache.put("token", USER, exp=float("inf"))
+    cache.get("token")["groups"] = []
+    cache.get("token")["role"] = "viewer"
+    assert cache.get("token")["role"] == "admin"
+
+
+@pytest.fixture
+def production_auth(issuer, monkeypatch):
+    """Full verification against the issuer's keys, with fresh process-wide caches"""
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(settings, "DEBUG", False)
+    with open(issuer.jwks_path) as f:
+        keys = json.load(f)["keys"]
+    monkeypatch.setattr(auth, "jwks_cache", JWKSCache(lambda: keys, ttl_seconds=3600, min_refresh_interval=30))
+    monkeypatch.setattr(auth, "token_cache", VerifiedTokenCache(max_size=8))
+    return auth.token_cache
+
+
+def test_stacked_dependencies_verify_the_token_once(issuer, production_auth, monkeypatch):
+    from fastapi.testclient import TestClient
+    from jose import jwt
+
+    verifications = []
+    decode = jwt.decode
+
+    def counting_decode(token, *args, **kwargs):
+        verifications.append(token)
+        return decode(token, *args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+
+    app = FastAPI()
+
+    @app.get("/stacked", dependencies=[Depends(require_admin), Depends(require_role("admin"))])
+    def stacked():
+        return {"ok": True}
+
+    claims = {
+        "sub": "stacked-admin",
+        "username": "stacked-admin",
+        "cognito:groups": ["Admins"],
+        "custom:role": "admin",
+        "token_use": "access",
+        "iss": f"https://cognito-idp.{settings.AWS_COGNITO_REGION}.amazonaws.com/{settings.AWS_COGNITO_USER_POOL_ID}",
+        "exp": 2 ** 31 - 1,
+    }
+    token = jwt.encode(claims, issuer.private_pem, algorithm="RS256", headers={"kid": KEY_ID})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        assert client.get("/stacked", headers=headers).status_code == 200
+        assert len(verifications) == 1
+        assert production_auth.stats()["misses"] == 1
+
+        # Served from the token cache: no verification at all
+        assert client.get("/stacked", headers=headers).status_code == 200
+        assert len(verifications) == 1
+        assert production_auth.stats()["hits"] == 1
+
+        forged = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+        assert client.get("/stacked", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+        assert production_auth.stats()["size"] == 1
@@ -0,0 +1,29 @@
+from sqlalchemy import select
+
+from app.models import Registration, RegistrationStatus, Teacher, new_id
+
+
+def counters(engine, teacher_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(Teacher.assigned_count, Teacher.link_sent_count).where(Teacher.id == teacher_id)
+        ).one()._tuple()
+
+
+def test_assignment_moves_the_counters(client, engine, teachers):
+    registration_id = new_id()
+    with engine.begin() as conn:
+        conn.execute(Registration.__table__.insert().values(
+            id=registration_id, student_name="Load Student", student_age=9, grade="4",
+            parent_name="Load Parent", email="load@example.com", phone="+15550000000",
+            status=RegistrationStatus.PENDING,
+        ))
+    first, second = teachers[0]["id"], teachers[1]["id"]
+    before = {teacher_id: counters(engine, teacher_id) for teacher_id in (first, second)}
+
+    assert client.post(f"/api/registrations/{registration_id}/assign", json={"teacher_id": first}).status_code == 200
+    assert counters(engine, first) == (before[first][0] + 1, before[first][1])
+
+    assert client.post(f"/api/registrations/{registration_id}/assign", json={"teacher_id": second}).status_code == 200
+    assert counters(engine, first) == before[first]
+    assert counters(engine, second) == (before[second][0] + 1, before[second][1])